@@ -1,9 +1,26 @@
 """
 A quick script to convert various dicts describing iRobot Open Interface commands into a json config.
 
+It also writes create2config.py, the same config as a python module plus integer indexed lookup
+tables, so create2api can import it instead of parsing the json every time a Create2 is made.
+Keep both files next to create2api.py.
+
+The sensor packet schema is defined here too, and create2api compiles its packet decoders from it.
+To check the schema against the hand written decoder in this directory's create2api.py:
+
+    python configGenerator.py --check
+
+That decodes every packet with both and prints the fields they decode differently.
+
 """
 
+import imp
 import json
+import os
+import pprint
+import random
+import struct
+import sys
 
 OPCODES = dict(
     start = 128,
@@ -71,71 +88,100 @@ ASCII_TABLE = {' ': 32, '!': 33,
               '{': 123, '|': 124,
               '}': 125, '~': 126}
 
-#SENSOR_GROUP_PACKET_LENGTHS = (26, 10, 6, 10, 14, 12, 52, 80, 28, 12, 9)
-SENSOR_GROUP_PACKET_LENGTHS = {
-    0: 26,
-    1: 10,
-    2: 6,
-    3: 10,
-    4: 14,
-    5: 12,
-    6: 52,
-    7: 1,
-    8: 1,
-    9: 1,
-    10: 1,
-    11: 1,
-    12: 1,
-    13: 1,
-    14: 1,
-    15: 1,
-    16: 1,
-    17: 1,
-    18: 1,
-    19: 2,
-    20: 2,
-    21: 1,
-    22: 2,
-    23: 2,
-    24: 1,
-    25: 2,
-    26: 2,
-    27: 2,
-    28: 2,
-    29: 2,
-    30: 2,
-    31: 2,
-    32: 1,
-    33: 2,
-    34: 1,
-    35: 1,
-    36: 1,
-    37: 1,
-    38: 1,
-    39: 2,
-    40: 2,
-    41: 2,
-    42: 2,
-    43: 2,
-    44: 2,
-    45: 1,
-    46: 2,
-    47: 2,
-    48: 2,
-    49: 2,
-    50: 2,
-    51: 2,
-    52: 1,
-    53: 1,
-    54: 2,
-    55: 2,
-    56: 2,
-    57: 2,
-    58: 1,
-    100: 80,
-    101: 28,
-    102: 12,
-    103: 9 }
+# Sensor packet schema, the one definition of the sensor packets. create2api compiles its decoders
+# from it and --check decodes every packet with it and with the older hand written decoder.
+#
+# Each single packet (7-58) maps to the sensor data key it fills and its struct format (big endian,
+# as sent by the Create 2):
+#   '?' is a bool byte, 'B'/'b' an unsigned/signed byte, 'H'/'h' an unsigned/signed short
+#   and 'x' an unused byte that is skipped.
+SENSOR_PACKETS = {
+    7: ('wheel drop and bumps', 'B'),
+    8: ('wall seen', '?'),
+    9: ('cliff left', '?'),
+    10: ('cliff front left', '?'),
+    11: ('cliff front right', '?'),
+    12: ('cliff right', '?'),
+    13: ('virtual wall', '?'),
+    14: ('wheel overcurrents', 'B'),
+    15: ('dirt detect', 'B'),
+    16: (None, 'x'),                            # unused
+    17: ('infared char omni', 'B'),
+    18: ('buttons', 'B'),
+    19: ('distance', 'h'),                      # mm
+    20: ('angle', 'h'),                         # difference between distance two wheels travelled
+    21: ('charging state', 'B'),
+    22: ('voltage', 'H'),                       # mV
+    23: ('current', 'h'),                       # mA, positive is charging
+    24: ('temperature', 'b'),                   # Celsius
+    25: ('battery charge', 'H'),                # mAh
+    26: ('battery capacity', 'H'),              # mAh
+    27: ('wall signal', 'H'),
+    28: ('cliff left signal', 'H'),
+    29: ('cliff front left signal', 'H'),
+    30: ('cliff front right signal', 'H'),
+    31: ('cliff right signal', 'H'),
+    32: (None, 'x'),                            # unused
+    33: (None, '2x'),                           # unused
+    34: ('charging sources available', 'B'),
+    35: ('oi mode', 'B'),
+    36: ('song number', 'B'),
+    37: ('song playing', '?'),
+    38: ('number of stream packets', 'B'),
+    39: ('requested velocity', 'H'),
+    40: ('requested radius', 'H'),
+    41: ('requested right velocity', 'H'),
+    42: ('requested left velocity', 'H'),
+    43: ('left encoder counts', 'H'),
+    44: ('right encoder counts', 'H'),
+    45: ('light bumper', 'B'),
+    46: ('light bump left signal', 'H'),
+    47: ('light bump front left signal', 'H'),
+    48: ('light bump center left signal', 'H'),
+    49: ('light bump center right signal', 'H'),
+    50: ('light bump front right signal', 'H'),
+    51: ('light bump right signal', 'H'),
+    52: ('infared char left', 'B'),
+    53: ('infared char right', 'B'),
+    54: ('left motor current', 'h'),            # mA
+    55: ('right motor current', 'h'),           # mA
+    56: ('main brush motor current', 'h'),      # mA
+    57: ('side brush motor current', 'h'),      # mA
+    58: ('stasis', '?')                         # True if the robot is making forward progress
+    }
+
+# Flag bytes are decoded into a dict of bools
+SENSOR_BITFIELDS = {
+    'wheel drop and bumps': (('drop left', 0x08), ('drop right', 0x04), ('bump left', 0x02), ('bump right', 0x01)),
+    'wheel overcurrents': (('left wheel', 0x10), ('right wheel', 0x08), ('main brush', 0x04), ('side brush', 0x01)),
+    'buttons': (('clock', 0x80), ('schedule', 0x40), ('day', 0x20), ('hour', 0x10),
+                ('minute', 0x08), ('dock', 0x04), ('spot', 0x02), ('clean', 0x01)),
+    'charging sources available': (('home base', 0x02), ('internal charger', 0x01)),
+    'light bumper': (('right', 0x20), ('front right', 0x10), ('center right', 0x08),
+                     ('center left', 0x04), ('front left', 0x02), ('left', 0x01))
+    }
+
+# Group packets are the single packets they contain, sent back to back
+SENSOR_GROUP_PACKETS = {
+    0: tuple(range(7, 27)),
+    1: tuple(range(7, 17)),
+    2: tuple(range(17, 21)),
+    3: tuple(range(21, 27)),
+    4: tuple(range(27, 35)),
+    5: tuple(range(35, 43)),
+    6: tuple(range(7, 43)),
+    100: tuple(range(7, 59)),
+    101: tuple(range(43, 59)),
+    106: tuple(range(46, 52)),
+    107: tuple(range(54, 59))
+    }
+
+# Number of data bytes in every packet, worked out from the schema
+SENSOR_GROUP_PACKET_LENGTHS = {}
+for packet_id, (name, code) in SENSOR_PACKETS.items():
+    SENSOR_GROUP_PACKET_LENGTHS[packet_id] = struct.calcsize('>' + code)
+for packet_id, contents in SENSOR_GROUP_PACKETS.items():
+    SENSOR_GROUP_PACKET_LENGTHS[packet_id] = sum(SENSOR_GROUP_PACKET_LENGTHS[i] for i in contents)
 
 SENSOR_DATA = {
     'wheel drop and bumps' : {'drop left' : False, 'drop right' : False, 'bump left' : False, 'bump right' : False},
@@ -292,7 +338,8 @@ REMOTE_OPCODES = {
     162: 'virtual-wall'
     }              
 
-data = {'opcodes': {}, 'ascii table': {}, 'sensor group packet lengths': {}, 'sensor data': {}, 'charging states': {}, 'oi modes': {}, 'midi table': {}, 'remote opcodes': {}}
+data = {'opcodes': {}, 'ascii table': {}, 'sensor group packet lengths': {}, 'sensor data': {}, 'charging states': {}, 'oi modes': {}, 'midi table': {}, 'remote opcodes': {},
+        'sensor packets': {}, 'sensor bitfields': {}, 'sensor groups': {}}
 
 data['opcodes']  = OPCODES
 data['ascii table'] = ASCII_TABLE
@@ -302,10 +349,106 @@ data['charging states'] = CHARGING_STATES
 data['oi modes'] = OI_MODES
 data['midi table'] = MIDI_TABLE
 data['remote opcodes'] = REMOTE_OPCODES
+data['sensor packets'] = SENSOR_PACKETS
+data['sensor bitfields'] = SENSOR_BITFIELDS
+data['sensor groups'] = SENSOR_GROUP_PACKETS
               
 with open("config.json", 'w') as outfile:
     try:
         json.dump(data, outfile, sort_keys = False, indent = 4)
         print 'saved config'
     except ValueError, e:
-        print 'shits fucked up yo'
\ No newline at end of file
+        print 'shits fucked up yo'
+
+# Lookup tables indexed by opcode, packet id, character code and midi note number.
+# Anything that isn't valid is None.
+opcode_names = [None] * 256
+for name, opcode in OPCODES.items():
+    opcode_names[opcode] = name
+
+packet_lengths = [None] * 256
+for packet_id, length in SENSOR_GROUP_PACKET_LENGTHS.items():
+    packet_lengths[packet_id] = length
+
+ascii_codes = [None] * 256
+for char, code in ASCII_TABLE.items():
+    ascii_codes[ord(char)] = code
+
+midi_names = [None] * 128
+for name, note in sorted(MIDI_TABLE.items(), reverse = True):
+    midi_names[note] = name
+
+def as_json(value):
+    """ The value as it comes back out of config.json: string keys and lists instead of tuples
+    """
+    if isinstance(value, dict):
+        return dict((str(key), as_json(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [as_json(item) for item in value]
+    return value
+
+with open("create2config.py", 'w') as outfile:
+    outfile.write('"""\nGenerated by configGenerator.py from the same dicts as config.json. Don\'t edit by hand.\n\n"""\n\n')
+    outfile.write('CONFIG = %s\n\n' % pprint.pformat(as_json(data)))
+    outfile.write('# Opcode -> command name\nOPCODE_NAMES = %s\n\n' % pprint.pformat(tuple(opcode_names)))
+    outfile.write('# Packet id -> number of data bytes\nPACKET_LENGTHS = %s\n\n' % pprint.pformat(tuple(packet_lengths)))
+    outfile.write('# Character code -> 7 segment display code\nASCII_CODES = %s\n\n' % pprint.pformat(tuple(ascii_codes)))
+    outfile.write('# Midi note number -> note name\nMIDI_NAMES = %s\n\n' % pprint.pformat(tuple(midi_names)))
+    outfile.write('# Sensor packet schema: packet id -> (sensor data key, struct format)\nSENSOR_PACKETS = %s\n\n' % pprint.pformat(SENSOR_PACKETS))
+    outfile.write('# Flag byte -> (flag, bit) pairs\nSENSOR_BITFIELDS = %s\n\n' % pprint.pformat(SENSOR_BITFIELDS))
+    outfile.write('# Group packet id -> the single packet ids it contains\nSENSOR_GROUP_PACKETS = %s\n' % pprint.pformat(SENSOR_GROUP_PACKETS))
+    print 'saved config module'
+
+
+def load_decoders():
+    """ The schema compiled by the top level create2api, and the hand written decoder in this
+        directory's create2api
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    # Made for the create2config.py that has just been written, not one left over from before
+    sys.path.insert(0, os.getcwd())
+    schema_api = imp.load_source('create2api_schema', os.path.join(here, '..', '..', 'create2api.py'))
+    legacy_api = imp.load_source('create2api_legacy', os.path.join(here, 'create2api.py'))
+    return (schema_api.sensorPacketDecoder(SENSOR_GROUP_PACKET_LENGTHS),
+            legacy_api.sensorPacketDecoder(SENSOR_GROUP_PACKET_LENGTHS))
+
+# Fields the hand written decoder is known to get wrong: its group packet 2 puts packet 17
+# (infrared character omni) into 'infared char left'
+KNOWN_DIFFERENCES = {2: set(['infared char left', 'infared char omni'])}
+
+def cross_check(rounds = 50):
+    """ Decodes every packet with both decoders, from all zero bytes, all 0xff bytes and some
+        random ones, and prints each field they don't agree on. Differences listed in
+        KNOWN_DIFFERENCES are printed but not counted.
+        
+        Returns: The number of packets that were decoded differently
+    """
+    schema_decoder, legacy_decoder = load_decoders()
+    rand = random.Random(148)
+    differences = 0
+    for packet_id in sorted(SENSOR_GROUP_PACKET_LENGTHS):
+        size = SENSOR_GROUP_PACKET_LENGTHS[packet_id]
+        tests = [[0] * size, [0xff] * size]
+        tests += [[rand.randint(0, 255) for i in range(size)] for j in range(rounds)]
+        fields = set()
+        for values in tests:
+            data = ''.join(chr(value) for value in values)
+            schema_data = dict(SENSOR_DATA)
+            legacy_data = dict(SENSOR_DATA)
+            schema_decoder.decode_packet(packet_id, data, schema_data)
+            legacy_decoder.decode_packet(packet_id, list(data), legacy_data)
+            for name in SENSOR_DATA:
+                if schema_data[name] != legacy_data[name]:
+                    fields.add(name)
+        known = fields & KNOWN_DIFFERENCES.get(packet_id, set())
+        if known:
+            print 'packet %d: %s (known)' % (packet_id, ', '.join(sorted(known)))
+        fields -= known
+        if fields:
+            differences += 1
+            print 'packet %d: %s' % (packet_id, ', '.join(sorted(fields)))
+    print '%d packets checked, %d decoded differently' % (len(SENSOR_GROUP_PACKET_LENGTHS), differences)
+    return differences
+
+if '--check' in sys.argv:
+    sys.exit(1 if cross_check() else 0)
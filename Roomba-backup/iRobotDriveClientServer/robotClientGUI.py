@@ -50,6 +50,7 @@ TRANSMAX = 300 # max translational rate (mm/s)
 
 DEADZONE = 0.1 # percent of the screen to go straight 
 RATELIMIT = 0.2 # number of seconds between each drive command 
+RATELIMIT_MS = int(RATELIMIT * 1000)
 
 HOST = '192.168.0.120' # your robot IP or hostname  
 PORT = 9999 
@@ -59,6 +60,7 @@ print ">P<assive, >S<afe, >F<ull, >C<lean, >D<ock, space = beep"
 print "If nothing happens, try pressing 'P' and then 'S' to get into safe mode." 
 
 mutex = Lock()
+pending = [None] # latest drive command waiting to be sent, older ones are dropped
  
 root = Tk()
 
@@ -74,35 +76,46 @@ def serCmd(data):
             tmp += hex(ord(c)).rsplit('x')[1]
         print tmp
 
-# Decides on a motion command based on the location of the mouse when a button is pressed, and then sends 
-# it to the robot.
+# Sends the latest drive command, if there is one, every RATELIMIT seconds. Mouse events in between
+# just replace the pending command, so the robot always gets the newest one and the GUI never blocks.
+def flushDrive():
+    with mutex:
+        data = pending[0]
+        pending[0] = None
+    if data is not None:
+        serCmd(data)
+    root.after(RATELIMIT_MS, flushDrive)
+
+# Decides on a motion command based on the location of the mouse when a button is pressed, and queues
+# it for the robot.
 def callbackMouseDown(event):
-    if (mutex.acquire(False)):
-        trans = float((HEIGHT / 2) - event.y) / (HEIGHT / 2)
-        rot = float((WIDTH / 2) - event.x) / (WIDTH / 2)
-
-        if rot > 1.0:
-            rot = 1.0
-        if rot < -1.0:
-            rot = -1.0
-        if abs(rot) < DEADZONE:
-            rot = 0
-            
-        if trans > 1.0:
-            trans = 1.0
-        if trans < -1.0:
-            trans = -1.0
-
-        vl = int(trans * TRANSMAX + rot * ROTMAX);
-        vr = int(trans * TRANSMAX - rot * ROTMAX);
-
-        x = struct.pack(">Bhh", 0x91, vl, vr)
-        serCmd(x)
-        sleep(RATELIMIT) # rate limiting
-        mutex.release()
+    trans = float((HEIGHT / 2) - event.y) / (HEIGHT / 2)
+    rot = float((WIDTH / 2) - event.x) / (WIDTH / 2)
+
+    if rot > 1.0:
+        rot = 1.0
+    if rot < -1.0:
+        rot = -1.0
+    if abs(rot) < DEADZONE:
+        rot = 0
+        
+    if trans > 1.0:
+        trans = 1.0
+    if trans < -1.0:
+        trans = -1.0
+
+    vl = int(trans * TRANSMAX + rot * ROTMAX);
+    vr = int(trans * TRANSMAX - rot * ROTMAX);
+
+    x = struct.pack(">Bhh", 0x91, vl, vr)
+    with mutex:
+        pending[0] = x # latest wins
     
-# Stops the robot when the mouse button is released.
+# Stops the robot when the mouse button is released. Skips the queue, and drops any drive command still
+# waiting so it can't restart the robot.
 def callbackMouseUp(event):
+    with mutex:
+        pending[0] = None
     serCmd("\x89\x00\x00\x00\x00") # stop
 
 # A small handler for keyboard events. Feel free to add more!
@@ -128,5 +141,6 @@ frame.bind("<B1-Motion>", callbackMouseDown)
 frame.bind("<ButtonRelease-1>", callbackMouseUp) 
 root.bind("<Key>", callbackKey) 
 frame.pack()
+root.after(RATELIMIT_MS, flushDrive)
 
 root.mainloop()
@@ -7,20 +7,36 @@ try:
     import numpy
 except:
     print "The numpy math library is not installed."
+    numpy = None
 
 import time
 
 ############################################################################
 class waveFrontPlanner:
     
-    def __init__(self, map, slow=False):
+    def __init__(self, map, slow=False, vectorized=None):
+        """
+        map is a list of lists or a numpy array. vectorized propagates the wavefront
+        with numpy array operations, a whole frontier at a time, instead of sweeping
+        the map cell by cell. It defaults to on for numpy maps. A list map is copied
+        into a numpy array for it.
+        """
         self.__slow = slow
+        if vectorized is None:
+            vectorized = str(type(map)).find("numpy") != -1
+        if vectorized:
+            if numpy is None:
+                raise ImportError("The vectorized wavefront needs numpy")
+            map = numpy.asarray(map)
+        self.__vectorized = vectorized
         self.__map = map
         if str(type(map)).find("numpy") != -1:
             #If its a numpy array
             self.__height, self.__width = self.__map.shape
         else:
             self.__height, self.__width = len(self.__map), len(self.__map[0])
+        self.__distance = None #distance field of the last vectorized propagation
+        self.expansions = 0 #cells expanded by the last vectorized propagation
         self.__nothing = 0
         self.__wall = 999
         self.__goal = 1
@@ -76,6 +92,20 @@ class waveFrontPlanner:
         The entry point for the robot algorithm to use wavefront propagation.
         """
         path = []
+        if self.__vectorized and \
+           self.__map[self.__robot_x][self.__robot_y] != self.__goal:
+            #one propagation, then follow the distances down to the goal
+            self.propagateWavefront(prnt)
+            path = self.extractPath()
+            if path is None:
+                print "Cannot find a path."
+                return
+            self.__steps += self.expansions
+            if prnt:
+                for x, y in path:
+                    print "Move to x=%d y=%d\n\n" % (x, y)
+            if path:
+                self.__robot_x, self.__robot_y = path[-1]
         while self.__map[self.__robot_x][self.__robot_y] != self.__goal:
             if self.__steps > 20000:
                 print "Cannot find a path."
@@ -120,6 +150,8 @@ class waveFrontPlanner:
     def propagateWavefront(self, prnt=False):
         """
         """
+        if self.__vectorized:
+            return self.propagateVectorized(prnt)
         self.unpropagate()
         #Old robot location was deleted, store new robot location in map
         self.__map[self.__robot_x][self.__robot_y] = self.__robot
@@ -162,12 +194,115 @@ class waveFrontPlanner:
             counter += 1
         return 0
 
+    ###########################################################################
+    def propagateVectorized(self, prnt=False):
+        """
+        Breadth first propagation with numpy. Each pass takes the whole frontier as an
+        array of cell indices, shifts it one cell down, up, right and left, and masks
+        out walls, robot cells and cells already reached. It stops at the pass that
+        reaches the robot. Returns the robot's next move as propagateWavefront() does.
+        """
+        self.unpropagate()
+        #Old robot location was deleted, store new robot location in map
+        self.__map[self.__robot_x][self.__robot_y] = self.__robot
+        self.__path = self.__robot
+        #start location to begin scan at goal location
+        self.__map[self.__goal_x][self.__goal_y] = self.__goal
+        #a border of walls all round, so every neighbour of a map cell is in range
+        stride = self.__width + 2
+        open_cells = numpy.zeros((self.__height + 2, stride), bool)
+        open_cells[1:-1, 1:-1] = self.__map == self.__nothing
+        open_cells = open_cells.ravel()
+        shifts = numpy.array([stride, -stride, 1, -1]) #down, up, right, left
+        distance = numpy.zeros(open_cells.size, numpy.int32)
+        goal = (self.__goal_x + 1) * stride + self.__goal_y + 1
+        robot = (self.__robot_x + 1) * stride + self.__robot_y + 1
+        distance[goal] = self.__goal
+        #where each cell last turned up in a list of neighbours, to drop repeats
+        seen = numpy.zeros(open_cells.size, numpy.int32)
+        frontier = numpy.array([goal])
+        value = self.__goal
+        self.expansions = 0
+        while frontier.size and goal != robot:
+            self.expansions += frontier.size
+            neighbours = (frontier[:, None] + shifts).ravel()
+            if (neighbours == robot).any():
+                break
+            neighbours = neighbours[open_cells[neighbours]]
+            open_cells[neighbours] = False
+            #a cell next to two frontier cells is listed twice, keep the last listing
+            order = numpy.arange(neighbours.size, dtype=numpy.int32)
+            seen[neighbours] = order
+            frontier = neighbours[seen[neighbours] == order]
+            value += 1
+            distance[frontier] = value
+        self.__distance = distance.reshape(self.__height + 2, stride)
+        #record the distances in the map, as the sweeps do
+        inner = self.__distance[1:-1, 1:-1]
+        record = (inner > self.__goal) & (inner < self.__reset_min)
+        self.__map[record] = inner[record]
+        if prnt:
+            print "Finished Wavefront, %i cells expanded:\n" % self.expansions
+            self.printMap()
+        #the lowest neighbour, ties going down, up, right then left as in the sweeps
+        neighbours = distance[robot + shifts]
+        if goal == robot or not neighbours.any():
+            return 0
+        neighbours[neighbours == 0] = numpy.iinfo(distance.dtype).max
+        return (3, 1, 2, 4)[neighbours.argmin()]
+
+    ###########################################################################
+    def nextMoves(self):
+        """
+        The move towards the goal from every cell, out of the distance field of the
+        last vectorized propagation: 1 up, 2 right, 3 down, 4 left, 0 if none. It is
+        the argmin over four views of the field, each shifted by one cell, so ties
+        go down, up, right, left as in minSurroundingNodeValue().
+        """
+        far = numpy.iinfo(self.__distance.dtype).max
+        distance = numpy.where(self.__distance > 0, self.__distance, far)
+        neighbours = numpy.dstack((distance[2:, 1:-1], distance[:-2, 1:-1],
+                                   distance[1:-1, 2:], distance[1:-1, :-2]))
+        moves = numpy.array([3, 1, 2, 4])[neighbours.argmin(axis=2)]
+        moves[neighbours.min(axis=2) == far] = 0
+        return moves
+
+    ###########################################################################
+    def extractPath(self):
+        """
+        The cells from the robot to the goal, following the distance field of the
+        last vectorized propagation down. Returns None if the goal can't be reached.
+        """
+        moves = self.nextMoves()
+        x, y = self.__robot_x, self.__robot_y
+        path = []
+        while (x, y) != (self.__goal_x, self.__goal_y):
+            move = moves.item(x, y)
+            if move == 1:
+                x -= 1
+            elif move == 2:
+                y += 1
+            elif move == 3:
+                x += 1
+            elif move == 4:
+                y -= 1
+            else:
+                return None
+            path.append((x, y))
+        return path
+
     ###########################################################################
     def unpropagate(self):
         """
         clears old path to determine new path
         stay within boundary
         """
+        if self.__vectorized:
+            clear = (self.__map != self.__wall) & (self.__map != self.__goal)
+            if self.__path == self.__robot:
+                clear &= self.__map != self.__robot
+            self.__map[clear] = self.__nothing
+            return
         for x in range(0, self.__height):
             for y in range(0, self.__width):
                 if self.__map[x][y] != self.__wall and \
@@ -263,3 +398,24 @@ if __name__ == "__main__":
     planner.run(True)
     end = time.time()
     print "Took %f seconds to run wavefront simulation" % (end - start)
+
+    if numpy is not None:
+        start = time.time()
+        planner = waveFrontPlanner([row[:] for row in floormap], False, vectorized=True)
+        planner.run(False)
+        end = time.time()
+        print "Took %f seconds to run the vectorized wavefront" % (end - start)
+
+        #a 500x500 occupancy grid, a quarter of it walls
+        grid = numpy.zeros((500, 500), int)
+        grid[numpy.random.RandomState(0).rand(500, 500) < .25] = 999
+        grid[0, 0] = grid[499, 499] = 0
+        planner = waveFrontPlanner(grid)
+        planner.setRobotPosition(0, 0)
+        planner.setGoalPosition(499, 499)
+        start = time.time()
+        planner.propagateWavefront()
+        path = planner.extractPath()
+        end = time.time()
+        print "Planned %s moves across a 500x500 grid in %f seconds, %i cells expanded" % \
+            (path and len(path), end - start, planner.expansions)
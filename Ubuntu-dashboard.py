@@ -77,25 +77,27 @@ Tkinter reference:
 #                    format='(%(threadName)-10s) %(message)s')
 
 
-try:  # Python 3  # create2api library is not compatible in it's current form
+import sys, traceback  # trap exceptions
+import os  # switch off auto key repeat
+import json  # Create2API JSON file
+import create2api  # change serial port to '/dev/ttyAMA0'
+import datetime  # time comparison for Create2 sleep prevention routine
+import time  # sleep function
+import threading  # used to timeout Create2 function calls if iRobot has gone to sleep
+import math  # direction indicator (polygon) rotation
+import csv
+
+HEADLESS = '--headless' in sys.argv  # telemetry and logging only, see create2headless.py
+
+if not HEADLESS:  # Tk, GPIO and monitoring are only imported for the GUI
     import Tkinter
     import ttk
     from tkinter import ttk
     from tkinter import *  # causes tk widgets to be upgraded by ttk widgets
-    import datetime
     from Tkinter import font
-    import sys, traceback  # trap exceptions
-    import os  # switch off auto key repeat
     from Tkinter import *  # causes tk widgets to be upgraded by ttk widgets
     import tkFont as font  # button font sizing
-    import json  # Create2API JSON file
-    import create2api  # change serial port to '/dev/ttyAMA0'
-    import datetime  # time comparison for Create2 sleep prevention routine
-    import time  # sleep function
-    import threading  # used to timeout Create2 function calls if iRobot has gone to sleep
-    import math  # direction indicator (polygon) rotation
     import RPi.GPIO as GPIO  # BRC pin pulse
-    import csv
     from auklet.monitoring import Monitoring
 
 
@@ -819,25 +821,10 @@ class Dashboard():
 
 
 def timelimit(timeout, func, args=(), kwargs={}):
-    """ Run func with the given timeout. If func didn't finish running
-        within the timeout, raise TimeLimitExpired
+    """ Run func on the Create2's serial worker thread with the given timeout.
+        Returns False if func didn't finish running within the timeout
     """
-
-    class FuncThread(threading.Thread):
-        def __init__(self):
-            threading.Thread.__init__(self)
-            self.result = None
-
-        def run(self):
-            self.result = func(*args, **kwargs)
-
-    it = FuncThread()
-    it.start()
-    it.join(timeout)
-    if it.isAlive():
-        return False
-    else:
-        return True
+    return create2api.timelimit(timeout, func, args, kwargs)
 
 
 def RetrieveCreateTelemetrySensors(dashboard):
@@ -885,6 +872,7 @@ def RetrieveCreateTelemetrySensors(dashboard):
             dashboard.master.update()
 
             bot = create2api.Create2()
+            bot.start_scheduler()       # only the latest drive/display command goes out, one write per flush
             bot.digit_led_ascii('    ')  # clear DSEG before Passive mode
             # print "Issuing a Start()"
             bot.start()  # issue passive mode command
@@ -1194,6 +1182,10 @@ def RetrieveCreateTelemetrySensors(dashboard):
 
 
 def main():
+    if HEADLESS:
+        import create2headless
+        sys.exit(create2headless.main())
+
     # declare objects
     root = Tk()
 
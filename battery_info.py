@@ -77,26 +77,29 @@ Tkinter reference:
 #                    format='(%(threadName)-10s) %(message)s')
 
 
-try:                        # Python 3  # create2api library is not compatible in it's current form
-    from tkinter import ttk
-    from tkinter import *   # causes tk widgets to be upgraded by ttk widgets
-    import datetime
-    
-except ImportError:         # Python 2
-    import sys, traceback   # trap exceptions
-    import os               # switch off auto key repeat
-    import Tkinter
-    import ttk
-    from Tkinter import *   # causes tk widgets to be upgraded by ttk widgets
-    import tkFont as font   # button font sizing
-    import json             # Create2API JSON file
-    import create2api       # change serial port to '/dev/ttyAMA0'
-    import datetime         # time comparison for Create2 sleep prevention routine
-    import time             # sleep function
-    import threading        # used to timeout Create2 function calls if iRobot has gone to sleep
-    import math             # direction indicator (polygon) rotation
-    import RPi.GPIO as GPIO # BRC pin pulse
-    import csv
+import sys, traceback   # trap exceptions
+import os               # switch off auto key repeat
+import json             # Create2API JSON file
+import create2api       # change serial port to '/dev/ttyAMA0'
+import datetime         # time comparison for Create2 sleep prevention routine
+import time             # sleep function
+import threading        # used to timeout Create2 function calls if iRobot has gone to sleep
+import math             # direction indicator (polygon) rotation
+import csv
+
+HEADLESS = '--headless' in sys.argv  # telemetry and logging only, see create2headless.py
+
+if not HEADLESS:                # Tk and GPIO are only imported for the GUI
+    try:                        # Python 3  # create2api library is not compatible in it's current form
+        from tkinter import ttk
+        from tkinter import *   # causes tk widgets to be upgraded by ttk widgets
+
+    except ImportError:         # Python 2
+        import Tkinter
+        import ttk
+        from Tkinter import *   # causes tk widgets to be upgraded by ttk widgets
+        import tkFont as font   # button font sizing
+        import RPi.GPIO as GPIO # BRC pin pulse
 #    from battery_pull import bigbatts
 
 
@@ -755,24 +758,21 @@ class Dashboard():
 
 
 def timelimit(timeout, func, args=(), kwargs={}):
-    """ Run func with the given timeout. If func didn't finish running
-        within the timeout, raise TimeLimitExpired
+    """ Run func on the Create2's serial worker thread with the given timeout.
+        Returns False if func didn't finish running within the timeout
     """
-    class FuncThread(threading.Thread):
-        def __init__(self):
-            threading.Thread.__init__(self)
-            self.result = None
-            
-        def run(self):
-            self.result = func(*args, **kwargs)
+    return create2api.timelimit(timeout, func, args, kwargs)
 
-    it = FuncThread()
-    it.start()
-    it.join(timeout)
-    if it.isAlive():
-        return False
-    else:
-        return True
+
+def log_battery(changes):
+    """ Appends the battery charge to battery.csv. The bot only calls this when it changes.
+    """
+    # csvfile = "</home/pi/roomba/IDLE>"
+    with open('battery.csv', "a") as output:
+        fieldnames = ['var1']
+        writer = csv.DictWriter(output, fieldnames=fieldnames, lineterminator='\n')
+        # writer.writeheader()
+        writer.writerow({'var1': str(changes['battery charge'])})
 
        
 def RetrieveCreateTelemetrySensors(dashboard):
@@ -821,6 +821,12 @@ def RetrieveCreateTelemetrySensors(dashboard):
             dashboard.master.update()
             
             bot = create2api.Create2()
+            bot.start_scheduler()       # only the latest drive/display command goes out, one write per flush
+            bot.sensor_events.subscribe(log_battery, 'battery charge')  # logged when it changes, not every packet
+            battery = create2api.ChangedFields(bot.sensor_events, ['voltage', 'current', 'battery charge', 'temperature', 'charging state'])
+            lights = create2api.ChangedFields(bot.sensor_events, ['light bumper', 'light bump left signal', 'light bump front left signal',
+                                                                  'light bump center left signal', 'light bump center right signal',
+                                                                  'light bump front right signal', 'light bump right signal'])
             bot.digit_led_ascii('    ') # clear DSEG before Passive mode
             print "Issuing a Start()"
             bot.start()                 # issue passive mode command
@@ -921,52 +927,44 @@ def RetrieveCreateTelemetrySensors(dashboard):
 
 
                         # BATTERY
-                        dashboard.voltage.set(str(round(bot.sensor_state['voltage']/1000,1)))
-                        dashboard.current.set(str(abs(bot.sensor_state['current'])))
-                        dashboard.capacity.set(str(bot.sensor_state['battery charge']))
-                        dashboard.temp.set(str(bot.sensor_state['temperature']))
-                        # Below outputs the value of battery charge
-                        # csvfile = "</home/pi/roomba/IDLE>"
-                        with open('battery.csv', "a") as output:
-                            bat = str(bot.sensor_state['battery charge'])
-                            fieldnames = ['var1']
-                            writer = csv.DictWriter(output, fieldnames=fieldnames, lineterminator='\n')
-                            # writer.writeheader()
-                            writer.writerow({'var1': bat})
-                        # print(str(bot.sensor_state['battery charge']))
+                        if battery.take():  # only redrawn when a battery reading has changed
+                            dashboard.voltage.set(str(round(bot.sensor_state['voltage']/1000,1)))
+                            dashboard.current.set(str(abs(bot.sensor_state['current'])))
+                            dashboard.capacity.set(str(bot.sensor_state['battery charge']))
+                            dashboard.temp.set(str(bot.sensor_state['temperature']))
                                 
-                        if bot.sensor_state['charging state'] == create_dict["NOT CHARGING"]:
-                            dashboard.pbCurrent.configure(style="orange.Horizontal.TProgressbar")
-                            dashboard.lblCurrent.configure(text="mA Load")
-                            battcharging = False
-                        elif bot.sensor_state['charging state'] == create_dict["RECONDITIONING"]:
-                            dashboard.pbCurrent.configure(style="blue.Horizontal.TProgressbar")
-                            dashboard.lblCurrent.configure(text="mA Recond")
-                            #docked = True
-                            battcharging = True
-                        elif bot.sensor_state['charging state'] == create_dict["FULL CHARGING"]:
-                            dashboard.pbCurrent.configure(style="green.Horizontal.TProgressbar")
-                            dashboard.lblCurrent.configure(text="mA Charging")
-                            #docked = True
-                            battcharging = True
-                        elif bot.sensor_state['charging state'] == create_dict["TRICKLE CHARGING"]:
-                            dashboard.pbCurrent.configure(style="green.Horizontal.TProgressbar")
-                            dashboard.lblCurrent.configure(text="mA Charging")
-                            #docked = True
-                            battcharging = True
-                        elif bot.sensor_state['charging state'] == create_dict["WAITING"]:
-                            dashboard.pbCurrent.configure(style="blue.Horizontal.TProgressbar")
-                            dashboard.lblCurrent.configure(text="mA Waiting")
-                            battcharging = False
-                        elif bot.sensor_state['charging state'] == create_dict["CHARGE FAULT"]:
-                            dashboard.pbCurrent.configure(style="red.Horizontal.TProgressbar")
-                            dashboard.lblCurrent.configure(text="mA Fault")
-                            battcharging = False
-
-                        if bot.sensor_state['battery charge'] < 1000:
-                            dashboard.pbCapacity.configure(style="red.Horizontal.TProgressbar")
-                        else:
-                            dashboard.pbCapacity.configure(style="orange.Horizontal.TProgressbar")
+                            if bot.sensor_state['charging state'] == create_dict["NOT CHARGING"]:
+                                dashboard.pbCurrent.configure(style="orange.Horizontal.TProgressbar")
+                                dashboard.lblCurrent.configure(text="mA Load")
+                                battcharging = False
+                            elif bot.sensor_state['charging state'] == create_dict["RECONDITIONING"]:
+                                dashboard.pbCurrent.configure(style="blue.Horizontal.TProgressbar")
+                                dashboard.lblCurrent.configure(text="mA Recond")
+                                #docked = True
+                                battcharging = True
+                            elif bot.sensor_state['charging state'] == create_dict["FULL CHARGING"]:
+                                dashboard.pbCurrent.configure(style="green.Horizontal.TProgressbar")
+                                dashboard.lblCurrent.configure(text="mA Charging")
+                                #docked = True
+                                battcharging = True
+                            elif bot.sensor_state['charging state'] == create_dict["TRICKLE CHARGING"]:
+                                dashboard.pbCurrent.configure(style="green.Horizontal.TProgressbar")
+                                dashboard.lblCurrent.configure(text="mA Charging")
+                                #docked = True
+                                battcharging = True
+                            elif bot.sensor_state['charging state'] == create_dict["WAITING"]:
+                                dashboard.pbCurrent.configure(style="blue.Horizontal.TProgressbar")
+                                dashboard.lblCurrent.configure(text="mA Waiting")
+                                battcharging = False
+                            elif bot.sensor_state['charging state'] == create_dict["CHARGE FAULT"]:
+                                dashboard.pbCurrent.configure(style="red.Horizontal.TProgressbar")
+                                dashboard.lblCurrent.configure(text="mA Fault")
+                                battcharging = False
+
+                            if bot.sensor_state['battery charge'] < 1000:
+                                dashboard.pbCapacity.configure(style="red.Horizontal.TProgressbar")
+                            else:
+                                dashboard.pbCapacity.configure(style="orange.Horizontal.TProgressbar")
 
                         if bot.sensor_state['charging sources available']['home base']:
                             docked = True
@@ -1091,26 +1089,27 @@ def RetrieveCreateTelemetrySensors(dashboard):
 
 
                         # LIGHT BUMPERS
-                        b = 0
-                        if bot.sensor_state['light bumper']['right'] == True:
-                            b = b + 1
-                        if bot.sensor_state['light bumper']['front right'] == True:
-                            b = b + 2
-                        if bot.sensor_state['light bumper']['center right'] == True:
-                            b = b + 4
-                        if bot.sensor_state['light bumper']['center left'] == True:
-                            b = b + 8
-                        if bot.sensor_state['light bumper']['front left'] == True:
-                            b = b + 16
-                        if bot.sensor_state['light bumper']['left'] == True:
-                            b = b + 32
-                        dashboard.lightbump.set(format(b, '06b'))
-                        dashboard.lightbumpleft.set(str(bot.sensor_state['light bump left signal']))
-                        dashboard.lightbumpfleft.set(str(bot.sensor_state['light bump front left signal']))
-                        dashboard.lightbumpcleft.set(str(bot.sensor_state['light bump center left signal']))
-                        dashboard.lightbumpcright.set(str(bot.sensor_state['light bump center right signal']))
-                        dashboard.lightbumpfright.set(str(bot.sensor_state['light bump front right signal']))
-                        dashboard.lightbumpright.set(str(bot.sensor_state['light bump right signal']))
+                        if lights.take():
+                            b = 0
+                            if bot.sensor_state['light bumper']['right'] == True:
+                                b = b + 1
+                            if bot.sensor_state['light bumper']['front right'] == True:
+                                b = b + 2
+                            if bot.sensor_state['light bumper']['center right'] == True:
+                                b = b + 4
+                            if bot.sensor_state['light bumper']['center left'] == True:
+                                b = b + 8
+                            if bot.sensor_state['light bumper']['front left'] == True:
+                                b = b + 16
+                            if bot.sensor_state['light bumper']['left'] == True:
+                                b = b + 32
+                            dashboard.lightbump.set(format(b, '06b'))
+                            dashboard.lightbumpleft.set(str(bot.sensor_state['light bump left signal']))
+                            dashboard.lightbumpfleft.set(str(bot.sensor_state['light bump front left signal']))
+                            dashboard.lightbumpcleft.set(str(bot.sensor_state['light bump center left signal']))
+                            dashboard.lightbumpcright.set(str(bot.sensor_state['light bump center right signal']))
+                            dashboard.lightbumpfright.set(str(bot.sensor_state['light bump front right signal']))
+                            dashboard.lightbumpright.set(str(bot.sensor_state['light bump right signal']))
 
 
                         # 7 SEGMENT DISPLAY
@@ -1145,6 +1144,10 @@ def RetrieveCreateTelemetrySensors(dashboard):
 
 def main():
 
+    if HEADLESS:
+        import create2headless
+        sys.exit(create2headless.main(subscribers=[(log_battery, 'battery charge')]))
+
     # declare objects
     root = Tk()
     
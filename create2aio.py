@@ -0,0 +1,404 @@
+"""
+An asyncio version of create2api.Create2. Needs Python 3.5 or newer.
+
+The serial port's file descriptor is put into non-blocking mode and watched by the event loop,
+so commands, get_packet() and the sensor stream are coroutines and nothing blocks the loop.
+That lets one process drive the robot, serve a network API and log telemetry without threads.
+
+    import asyncio
+    import create2aio
+
+    async def main():
+        bot = create2aio.Create2Async()
+        await bot.connect()
+        await bot.start()
+        await bot.safe()
+        await bot.drive_straight(100)
+        await bot.get_packet(100)
+        print(bot.sensor_state['voltage'])
+        await bot.drive_straight(0)
+        bot.close()
+
+    asyncio.get_event_loop().run_until_complete(main())
+
+Commands are encoded and range checked by the same code as create2api, so they behave the same.
+"""
+
+import asyncio
+import functools
+import os
+import time
+
+import serial
+
+import create2api
+
+
+class AsyncSerialInterface(object):
+    """A non-blocking reader/writer pair on the serial port's file descriptor.
+
+        write() and send() have the same signature as SerialCommandInterface's, so create2api's
+        command code can write to this directly. They never block: whatever the port won't take
+        straight away is written when the loop sees the port is writable again.
+    """
+
+    def __init__(self, port='/dev/ttyUSB0', baudrate=115200):
+        self.port = port
+        self.baudrate = baudrate
+        self.ser = None
+        self.fd = None
+        self.loop = None
+        self.read_buffer = bytearray()
+        self.read_waiter = None
+        self.write_buffer = bytearray()
+        self.drain_waiters = []
+
+    def open(self, loop):
+        self.loop = loop
+        self.ser = serial.Serial(self.port, self.baudrate, timeout=0)
+        self.fd = self.ser.fileno()
+        os.set_blocking(self.fd, False)
+        self.loop.add_reader(self.fd, self.on_readable)
+        print('opened port ' + self.port)
+
+    def close(self):
+        if self.ser is None:
+            return
+        self.loop.remove_reader(self.fd)
+        self.loop.remove_writer(self.fd)
+        self.ser.close()
+        self.ser = None
+        self.wake(self.read_waiter, create2api.ROIFailedToReceiveError('Serial port closed.'))
+        for waiter in self.drain_waiters:
+            self.wake(waiter)
+        self.drain_waiters = []
+
+    def wake(self, waiter, error=None):
+        if waiter is not None and not waiter.done():
+            if error is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(error)
+
+    def on_readable(self):
+        try:
+            data = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            # The device went away
+            self.loop.remove_reader(self.fd)
+            self.wake(self.read_waiter, create2api.ROIFailedToReceiveError(str(e)))
+            return
+        self.read_buffer.extend(data)
+        self.wake(self.read_waiter)
+
+    def on_writable(self):
+        try:
+            written = os.write(self.fd, self.write_buffer)
+        except BlockingIOError:
+            return
+        del self.write_buffer[:written]
+        if not self.write_buffer:
+            self.loop.remove_writer(self.fd)
+            for waiter in self.drain_waiters:
+                self.wake(waiter)
+            self.drain_waiters = []
+
+    def send(self, opcode, data):
+        if data == None:
+            self.write(create2api.command_struct(0).pack(opcode))
+        else:
+            self.write(create2api.command_struct(len(data)).pack(opcode, *data))
+
+    def write(self, command_bytes):
+        """Writes an encoded command, or queues it if the port can't take it right now.
+        """
+        if self.ser is None:
+            raise create2api.ROIFailedToSendError('Serial port is not open.')
+        if self.write_buffer:
+            # Keep the order, everything goes out behind what's already waiting
+            self.write_buffer.extend(command_bytes)
+            return
+        try:
+            written = os.write(self.fd, command_bytes)
+        except BlockingIOError:
+            written = 0
+        if written < len(command_bytes):
+            self.write_buffer.extend(command_bytes[written:])
+            self.loop.add_writer(self.fd, self.on_writable)
+
+    async def drain(self):
+        """Waits until everything that was written has gone out to the port.
+        """
+        while self.write_buffer and self.ser is not None:
+            waiter = self.loop.create_future()
+            self.drain_waiters.append(waiter)
+            await waiter
+
+    async def read_exactly(self, num_bytes, timeout=None):
+        """Reads 'num_bytes' bytes from the robot.
+
+            Arguments:
+                num_bytes: The number of bytes we expect to read.
+                timeout: Seconds to wait for them. None waits forever.
+
+            Returns: The bytes. Raises ROIFailedToReceiveError if they didn't all arrive in time.
+        """
+        if timeout is None:
+            await self.fill(num_bytes)
+        else:
+            try:
+                await asyncio.wait_for(self.fill(num_bytes), timeout)
+            except asyncio.TimeoutError:
+                if self.read_buffer:
+                    raise create2api.ROIFailedToReceiveError('Error reading from SCI port. Wrong data length.')
+                raise create2api.ROIFailedToReceiveError('Error reading from SCI port. No data.')
+        data = bytes(self.read_buffer[:num_bytes])
+        del self.read_buffer[:num_bytes]
+        return data
+
+    async def fill(self, num_bytes):
+        while len(self.read_buffer) < num_bytes:
+            if self.ser is None:
+                raise create2api.ROIFailedToReceiveError('Serial port is not open.')
+            self.read_waiter = self.loop.create_future()
+            await self.read_waiter
+
+    def discard_input(self):
+        """Throws away anything that has been received but not read.
+        """
+        del self.read_buffer[:]
+
+
+def command(method):
+    """Wraps one of create2api.Create2's command methods as a coroutine that returns once the
+        command has been written to the port.
+    """
+    @functools.wraps(method)
+    async def send_command(self, *args):
+        method(self, *args)
+        await self.SCI.drain()
+    return send_command
+
+
+class Create2Async(object):
+    """The asyncio counterpart of create2api.Create2.
+
+        Call (and await) connect() before anything else. Every command is a coroutine. Sensor
+        packets are read with get_packet() or query_list(), or streamed with stream(), which
+        decodes each frame into sensor_state in the background. wait_frame() waits for the next one.
+    """
+
+    def __init__(self, port='/dev/ttyUSB0', baudrate=115200):
+        self.SCI = AsyncSerialInterface(port, baudrate)
+        self.config = create2api.Config()
+        self.config.load()
+        self.decoder = create2api.sensorPacketDecoder(dict(self.config.data['sensor group packet lengths']))
+        self.encoder = create2api.CommandEncoder(self.config.data['opcodes'])
+        self.packet_lengths = self.config.packet_lengths
+        self.sensor_state = create2api.SensorState(self.config.data['sensor data']) # None of these values are correct until a packet is read.
+        self.sensor_events = create2api.SensorEvents() # Subscribers to sensor_state changes
+        self.sleep_timer = .5
+        self.read_timeout = 1     # Seconds get_packet() and query_list() wait for the robot to answer
+        self.request_lock = None  # Lets one request at a time wait for its answer
+        self.stream_task = None
+        self.frame_waiters = []
+        self.stream_sync = create2api.StreamFrameSync(self.packet_lengths)
+        self.frame_count = 0
+        self.last_frame_time = None
+
+    async def connect(self):
+        """Opens the serial port and starts watching it on the running event loop.
+        """
+        self.request_lock = asyncio.Lock()
+        self.SCI.open(asyncio.get_event_loop())
+
+    def close(self):
+        """Closes the serial port. Use stop_stream() first to stop a stream cleanly.
+        """
+        if self.stream_task is not None:
+            self.stream_task.cancel()
+            self.stream_task = None
+        self.SCI.close()
+        print('Disconnected')
+
+    # create2api's command code only needs these, so it's shared rather than copied
+    def queue_command(self, slot, command_bytes):
+        self.SCI.write(command_bytes)
+
+    def send_safety(self, command_bytes):
+        self.SCI.write(command_bytes)
+
+    packet_length = create2api.Create2.packet_length
+
+    """ START OF OPEN INTERFACE COMMANDS
+    """
+    start = command(create2api.Create2.start)
+    reset = command(create2api.Create2.reset)
+    stop = command(create2api.Create2.stop)
+    clean = command(create2api.Create2.clean)
+    max = command(create2api.Create2.max)
+    spot = command(create2api.Create2.spot)
+    seek_dock = command(create2api.Create2.seek_dock)
+    power = command(create2api.Create2.power)
+    set_day_time = command(create2api.Create2.set_day_time)
+    drive = command(create2api.Create2.drive)
+    drive_direct = command(create2api.Create2.drive_direct)
+    motors_pwm = command(create2api.Create2.motors_pwm)
+    led = command(create2api.Create2.led)
+    buttons = command(create2api.Create2.buttons)
+    digit_led_ascii = command(create2api.Create2.digit_led_ascii)
+    create_song = command(create2api.Create2.create_song)
+    play = command(create2api.Create2.play)
+
+    async def safe(self):
+        """Puts the Create 2 into safe mode, then gives it a short (<.5 sec) time to change modes.
+        """
+        self.send_safety(self.encoder.simple['safe'])
+        await self.SCI.drain()
+        await asyncio.sleep(self.sleep_timer)
+
+    async def full(self):
+        """Puts the Create 2 into full mode, then gives it a short (<.5 sec) time to change modes.
+        """
+        self.send_safety(self.encoder.simple['full'])
+        await self.SCI.drain()
+        await asyncio.sleep(self.sleep_timer)
+
+    async def drive_straight(self, velocity):
+        await self.drive(velocity, 32767)
+
+    async def turn_clockwise(self, velocity):
+        await self.drive(velocity, -1)
+
+    async def turn_counter_clockwise(self, velocity):
+        await self.drive(velocity, 1)
+
+    async def get_packet(self, packet_id):
+        """Requests and reads a packet from the Create 2, and decodes it into sensor_state.
+
+            Arguments:
+                packet_id: The id of the packet you wish to collect.
+
+            Returns: True if the packet successfully came through. Raises ROIFailedToReceiveError
+                if it didn't arrive within read_timeout.
+        """
+        packet_size = self.packet_length(packet_id)
+        if packet_size is None:
+            raise create2api.ROIDataByteError("Invalid packet ID")
+        return await self.request([int(packet_id)], [packet_size], self.encoder.encode('sensors', (int(packet_id),)))
+
+    async def query_list(self, packet_ids):
+        """Requests several sensor packets in one go and decodes them into sensor_state.
+
+            Arguments:
+                packet_ids: A list of the packet ids to request.
+
+            Returns: True if the packets successfully came through.
+        """
+        packet_ids = [int(packet_id) for packet_id in packet_ids]
+        packet_sizes = []
+        for packet_id in packet_ids:
+            packet_size = self.packet_length(packet_id)
+            if packet_size is None:
+                raise create2api.ROIDataByteError("Invalid packet ID")
+            packet_sizes.append(packet_size)
+        if len(packet_ids) == 0 or len(packet_ids) > 255:
+            raise create2api.ROIDataByteError("Invalid number of packets")
+        return await self.request(packet_ids, packet_sizes, self.encoder.encode('query_list', [len(packet_ids)] + packet_ids))
+
+    async def request(self, packet_ids, packet_sizes, command_bytes):
+        if self.stream_task is not None:
+            raise create2api.ROIFailedToSendError("Can't request packets while streaming, use wait_frame()")
+        async with self.request_lock:
+            self.SCI.discard_input()
+            self.SCI.write(command_bytes)
+            packet_byte_data = await self.SCI.read_exactly(sum(packet_sizes), self.read_timeout)
+        offset = 0
+        for packet_id, packet_size in zip(packet_ids, packet_sizes):
+            self.sensor_state = self.decoder.decode_packet(packet_id, packet_byte_data, self.sensor_state, offset)
+            offset += packet_size
+        self.sensor_events.publish(self.sensor_state)
+        return True
+
+    async def stream(self, packet_ids):
+        """Starts a stream of sensor data. The Create 2 sends the requested packets every 15ms and a
+            task decodes each frame into sensor_state as it arrives.
+
+            Arguments:
+                packet_ids: A list of the packet ids that should be included in the stream.
+        """
+        packet_ids = [int(packet_id) for packet_id in packet_ids]
+        for packet_id in packet_ids:
+            if self.packet_length(packet_id) is None:
+                raise create2api.ROIDataByteError("Invalid packet id, failed to send")
+        if len(packet_ids) == 0 or len(packet_ids) > 255:
+            raise create2api.ROIDataByteError("Invalid number of stream packets")
+
+        if self.stream_task is None:
+            self.stream_sync.reset()
+            self.stream_task = asyncio.ensure_future(self.read_stream())
+        self.stream_sync.expected_length = sum(self.packet_length(packet_id) + 1 for packet_id in packet_ids)
+        self.SCI.write(self.encoder.encode('stream', [len(packet_ids)] + packet_ids))
+        await self.SCI.drain()
+
+    async def pause_resume_stream(self, resume):
+        """Pauses or resumes a stream that was started with stream().
+        """
+        self.SCI.write(self.encoder.encode('pause_resume_stream', (1 if resume else 0,)))
+        await self.SCI.drain()
+
+    async def stop_stream(self):
+        """Pauses the stream and stops decoding frames. get_packet() can be used again once this returns.
+        """
+        if self.stream_task is not None:
+            await self.pause_resume_stream(False)
+            self.stream_task.cancel()
+            try:
+                await self.stream_task
+            except asyncio.CancelledError:
+                pass
+            self.stream_task = None
+            self.SCI.discard_input()
+
+    async def wait_frame(self, timeout=None):
+        """Waits for the next stream frame to be decoded.
+
+            Returns: sensor_state. Raises ROIFailedToReceiveError if no frame came within timeout.
+        """
+        waiter = asyncio.get_event_loop().create_future()
+        self.frame_waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            raise create2api.ROIFailedToReceiveError('Timed out waiting for a stream frame.')
+        finally:
+            if waiter in self.frame_waiters:
+                self.frame_waiters.remove(waiter)
+        return self.sensor_state
+
+    async def read_stream(self):
+        """Reads and decodes stream frames until it's cancelled. A create2api.StreamFrameSync finds
+            the frames and drops bad ones.
+        """
+        sync = self.stream_sync
+        while True:
+            await self.SCI.fill(1)
+            sync.feed(self.SCI.read_buffer)
+            self.SCI.discard_input()
+            frame_count = self.frame_count
+            packets = sync.next_frame()
+            while packets is not None:
+                for packet_id, offset in packets:
+                    self.sensor_state = self.decoder.decode_packet(packet_id, sync.buffer, self.sensor_state, offset)
+                self.sensor_events.publish(self.sensor_state)
+                self.frame_count += 1
+                packets = sync.next_frame()
+            if self.frame_count == frame_count:
+                continue
+            self.last_frame_time = time.time()
+            waiters, self.frame_waiters = self.frame_waiters, []
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
@@ -24,6 +24,7 @@
 
 
 
+from __future__ import print_function
 
 import json
 import serial
@@ -31,6 +32,21 @@ import struct
 import os
 import warnings
 import time
+import threading
+import itertools
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+try:
+    import create2config # Written by configGenerator.py, the same config as config.json
+except ImportError:
+    create2config = None
+
+
+# Big enough for any single packet (group packet 100 is 80 bytes) or a typical query list.
+# The buffer grows if a read needs more.
+READ_BUFFER_SIZE = 256
 
 
 class Error(Exception):
@@ -80,24 +96,56 @@ class Config(object):
     def __init__(self):
         self.fname = 'config.json'
         self.data = None
+        self.packet_lengths = None # Packet id -> number of data bytes, None if the id isn't valid
+        self.ascii_codes = None    # Character code -> 7 segment display code, None if it can't be shown
     
     def load(self):
         """ Loads a Create2 config file, that holds various dicts of opcodes.
-        
-        """
-        if os.path.isfile(self.fname):
+            
+            The create2config module is used if configGenerator.py has written one, otherwise
+            config.json is parsed. Either way this only happens once per process, later calls
+            get the same config back.
+        """
+        if create2config is not None:
+            self.data = create2config.CONFIG
+            self.packet_lengths = create2config.PACKET_LENGTHS
+            self.ascii_codes = create2config.ASCII_CODES
+            print('Loaded config and opcodes')
+        elif self.fname in _loaded_configs:
+            self.data, self.packet_lengths, self.ascii_codes = _loaded_configs[self.fname]
+            print('Loaded config and opcodes')
+        elif os.path.isfile(self.fname):
             #file exists, load it
             with open(self.fname) as fileData:
                 try:
                     self.data = json.load(fileData)
-                    print 'Loaded config and opcodes'
-                except ValueError, e:
-                    print 'Could not load config'
+                    self.build_tables()
+                    _loaded_configs[self.fname] = (self.data, self.packet_lengths, self.ascii_codes)
+                    print('Loaded config and opcodes')
+                except ValueError as e:
+                    print('Could not load config')
         else:
             #couldn't find file
-            print "No config file found"
+            print("No config file found")
             raise ValueError('Could not find config')
     
+    def build_tables(self):
+        """ Builds the integer indexed lookup tables from the config dicts, the same way
+            configGenerator.py does for create2config.
+        """
+        packet_lengths = [None] * 256
+        for packet_id, length in self.data['sensor group packet lengths'].items():
+            packet_lengths[int(packet_id)] = length
+        ascii_codes = [None] * 256
+        for char, code in self.data['ascii table'].items():
+            ascii_codes[ord(char)] = code
+        self.packet_lengths = tuple(packet_lengths)
+        self.ascii_codes = tuple(ascii_codes)
+
+
+# Configs that have already been parsed, keyed on file name
+_loaded_configs = {}
+    
     
 
         
@@ -106,35 +154,56 @@ class SerialCommandInterface(object):
     
     """
 
-    def __init__(self):
-        com = '/dev/ttyUSB0'  #This should not be hard coded...
-        #com = '/dev/ttyAMA0'  #This should not be hard coded...
-        baud = 115200
+    def __init__(self, port=None, baud=115200, capture=None):
+        """
+            Arguments:
+                port: The serial port the Create 2 is on. Defaults to /dev/ttyUSB0 (use /dev/ttyAMA0
+                    for the Pi's own UART), or the pseudo-terminal of a create2sim.Create2Simulator.
+                    pyserial URLs work too, e.g. loop:// or socket://host:port, and so does an
+                    already made port object such as a create2replay.ReplaySerial.
+                baud: The OI's baud rate.
+                capture: A file to record everything sent and received in, see start_capture().
+        """
+        com = port or '/dev/ttyUSB0'
         
-        self.ser = serial.Serial()
-        self.ser.port = com
+        if hasattr(com, 'read'):
+            self.ser = com
+        elif '://' in com:
+            self.ser = serial.serial_for_url(com, do_not_open=True)
+        else:
+            self.ser = serial.Serial()
+            self.ser.port = com
         self.ser.baudrate = baud
-        print self.ser.name
+        self.ser.timeout = 1  # Seconds. Reads give up instead of blocking forever if the robot has gone to sleep
+        # Reads are done into this buffer, so receiving a packet doesn't allocate a new string each time
+        self.read_buffer = bytearray(READ_BUFFER_SIZE)
+        self.read_view = memoryview(self.read_buffer)
+        self.read_slices = {}
+        self.write_lock = threading.Lock() # Commands can be sent from more than one thread
+        self.capture = None
+        if capture is not None:
+            self.start_capture(capture)
+        print(self.ser.name)
         if self.ser.isOpen(): 
-            print "port was open"
+            print("port was open")
             self.ser.close()
         self.ser.open()
-        print "opened port"
+        print("opened port")
     
     def send(self, opcode, data):
-        #First thing to do is convert the opcode to a tuple.
-        temp_opcode = (opcode,)
-        bytes = None
-        
         if data == None:
-            #Sometimes opcodes don't need data. Since we can't add
-            # a None type to a tuple, we have to make this check.
-            bytes = temp_opcode
+            #Sometimes opcodes don't need data.
+            self.write(command_struct(0).pack(opcode))
         else:
-            #Add the opcodes and data together
-            bytes = temp_opcode + data
-        #print bytes
-        self.ser.write(struct.pack('B' * len(bytes), *bytes))
+            self.write(command_struct(len(data)).pack(opcode, *data))
+    
+    def write(self, command_bytes):
+        """Writes a command that has already been encoded, e.g. by a CommandEncoder.
+        """
+        with self.write_lock:
+            self.ser.write(command_bytes)
+            if self.capture is not None:
+                self.capture.record(CAPTURE_WRITE, command_bytes)
     
     def Read(self, num_bytes):
         """Read a string of 'num_bytes' bytes from the robot.
@@ -147,51 +216,512 @@ class SerialCommandInterface(object):
         #logging.debug('Read %d bytes from SCI port.' % len(data))
         if not data:
             raise ROIFailedToReceiveError('Error reading from SCI port. No data.')
+        if self.capture is not None:
+            self.capture.record(CAPTURE_READ, data)
         if len(data) != num_bytes:
             raise ROIFailedToReceiveError('Error reading from SCI port. Wrong data length.')
         return data
     
+    def ReadInto(self, num_bytes):
+        """Read 'num_bytes' bytes from the robot into the reusable read buffer.
+        
+            Arguments:
+                num_bytes: The number of bytes we expect to read.
+            
+            Returns: The read buffer. Only the first 'num_bytes' bytes are valid and they are
+                overwritten by the next read, so decode them before reading again.
+        """
+        if num_bytes > len(self.read_buffer):
+            self.read_slices = {}
+            self.read_buffer = bytearray(num_bytes)
+            self.read_view = memoryview(self.read_buffer)
+        view = self.read_slices.get(num_bytes)
+        if view is None:
+            view = self.read_slices[num_bytes] = self.read_view[:num_bytes]
+        received = self.ser.readinto(view)
+        if self.capture is not None and received:
+            self.capture.record(CAPTURE_READ, view[:received])
+        if not received:
+            raise ROIFailedToReceiveError('Error reading from SCI port. No data.')
+        if received != num_bytes:
+            raise ROIFailedToReceiveError('Error reading from SCI port. Wrong data length.')
+        return self.read_buffer
+    
+    def start_capture(self, fname):
+        """Records every byte sent and received from now on, appended to the file fname.
+            create2replay.py plays captures back.
+        """
+        self.stop_capture()
+        self.capture = SerialCapture(fname)
+    
+    def stop_capture(self):
+        if self.capture is not None:
+            capture, self.capture = self.capture, None
+            capture.close()
+    
     def Close(self):
         """Closes the serial connection.
         """
+        self.stop_capture()
         self.ser.close()
 
+
+# Directions of the records in a capture file
+CAPTURE_WRITE = 0
+CAPTURE_READ = 1
+# Start of every capture file
+CAPTURE_MAGIC = b'C2CAP1\n'
+
+# Seconds from a clock that doesn't jump when the Pi sets its time (Python 3 only)
+monotonic = getattr(time, 'monotonic', time.time)
+
+
+class SerialCapture(object):
+    """Appends the bytes going over a SerialCommandInterface to a file, with timestamps.
+    
+        The file starts with CAPTURE_MAGIC, followed by a record for each write or read:
+            [timestamp: little endian double, seconds] [direction: 1 byte] [N: 2 bytes] [N bytes of data]
+        The file is unbuffered and only ever appended to, so a capture survives the script crashing.
+    """
+    
+    record_struct = struct.Struct('<dBH')
+    
+    def __init__(self, fname):
+        self.fname = fname
+        self.lock = threading.Lock() # The stream reader records from its own thread
+        self.file = open(fname, 'ab', 0)
+        self.file.seek(0, os.SEEK_END)
+        if self.file.tell() == 0:
+            self.file.write(CAPTURE_MAGIC)
+        self.records = 0
+    
+    def record(self, direction, data):
+        data = memoryview(data).tobytes()
+        timestamp = monotonic()
+        with self.lock:
+            if self.file is None:
+                return
+            for start in range(0, len(data), 0xffff):
+                chunk = data[start:start + 0xffff]
+                self.file.write(self.record_struct.pack(timestamp, direction, len(chunk)) + chunk)
+                self.records += 1
+    
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def read_capture(fname):
+    """Yields (timestamp, direction, data) for every record in a capture file. A record cut short
+        by a crash ends the capture.
+    """
+    record_struct = SerialCapture.record_struct
+    with open(fname, 'rb') as f:
+        if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(fname + ' is not a capture file')
+        while True:
+            header = f.read(record_struct.size)
+            if len(header) < record_struct.size:
+                return
+            timestamp, direction, length = record_struct.unpack(header)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            yield timestamp, direction, data
+
+    
+        
+
+
+# Struct for an opcode followed by n unsigned data bytes, keyed on n
+_command_structs = {}
+
+def command_struct(num_data_bytes):
+    """ Returns the (cached) struct.Struct for an opcode followed by num_data_bytes unsigned bytes
+    """
+    packer = _command_structs.get(num_data_bytes)
+    if packer is None:
+        packer = _command_structs[num_data_bytes] = struct.Struct('B' * (num_data_bytes + 1))
+    return packer
+
+
+# Commands that are only an opcode
+SIMPLE_COMMANDS = ('start', 'reset', 'stop', 'safe', 'full', 'clean', 'max', 'spot', 'seek_dock', 'power')
+
+# Data bytes that follow each opcode. Song (140), stream (148) and query list (149) say how many
+# with their first data bytes, see command_length().
+COMMAND_DATA_LENGTHS = {
+    7: 0, 128: 0, 129: 1, 131: 0, 132: 0, 133: 0, 134: 0, 135: 0, 136: 0, 137: 4, 138: 1,
+    139: 3, 141: 1, 142: 1, 143: 0, 144: 3, 145: 4, 146: 4, 147: 1, 150: 1, 162: 2, 163: 4,
+    164: 4, 165: 1, 167: 15, 168: 3, 173: 0
+    }
+
+def command_length(command_bytes, start=0):
+    """ Returns the length of the command at command_bytes[start], opcode included. Returns None
+        if more bytes are needed to tell, and 0 if command_bytes[start] isn't an opcode.
+        command_bytes is a bytearray.
+    """
+    available = len(command_bytes) - start
+    opcode = command_bytes[start]
+    if opcode == 140:
+        # [140] [Song number] [Song length] [Note 1] [Duration 1] ...
+        return 3 + 2 * command_bytes[start + 2] if available >= 3 else None
+    if opcode in (148, 149):
+        # [Opcode] [Number of packets] [Packet ID 1] ...
+        return 2 + command_bytes[start + 1] if available >= 2 else None
+    length = COMMAND_DATA_LENGTHS.get(opcode)
+    if length is None:
+        return 0
+    return length + 1
+
+
+class CommandEncoder(object):
+    """ Turns commands into the bytes sent to the Create 2.
+        
+        Opcode-only commands are encoded once up front, and commands with data have a
+        precompiled struct.Struct each, so sending a command doesn't rebuild a format string.
+    """
+    
+    def __init__(self, opcodes):
+        self.opcodes = opcodes
+        self.simple = {}
+        for name in SIMPLE_COMMANDS:
+            self.simple[name] = struct.pack('B', opcodes[name])
+        # [Opcode] [High byte] [Low byte] [High byte] [Low byte]
+        self.drive_struct = struct.Struct('>Bhh')
+        self.drive_opcode = opcodes['drive']
+        self.drive_direct_opcode = opcodes['drive_direct']
+        # [Opcode] [Main Brush PWM] [Side Brush PWM] [Vacuum PWM]
+        self.motors_pwm_struct = struct.Struct('Bbbb')
+        self.motors_pwm_opcode = opcodes['motors_pwm']
+    
+    def encode(self, name, data=()):
+        """ Encodes any command
+        
+            Arguments:
+                name: The command's name in the opcodes dict
+                data: A sequence of unsigned data bytes
+        """
+        return command_struct(len(data)).pack(self.opcodes[name], *data)
+    
+    def drive(self, velocity, radius):
+        """ Encodes a drive command. velocity and radius are not range checked here.
+        """
+        return self.drive_struct.pack(self.drive_opcode, int(velocity), int(radius))
+    
+    def drive_direct(self, right_velocity, left_velocity):
+        """ Encodes a drive direct command. The velocities are not range checked here.
+        """
+        return self.drive_struct.pack(self.drive_direct_opcode, int(right_velocity), int(left_velocity))
+    
+    def motors_pwm(self, main_pwm, side_pwm, vacuum_pwm):
+        """ Encodes a PWM motors command. The duty cycles are not range checked here.
+        """
+        return self.motors_pwm_struct.pack(self.motors_pwm_opcode, int(main_pwm), int(side_pwm), int(vacuum_pwm))
+
+
+
+class CommandFuture(object):
+    """The pending result of a call that was queued on a SerialWorker.
+    
+    """
+    
+    def __init__(self):
+        self.finished = threading.Event()
+        self.value = None
+        self.error = None
+    
+    def set_result(self, value):
+        self.value = value
+        self.finished.set()
+    
+    def set_exception(self, error):
+        self.error = error
+        self.finished.set()
+    
+    def done(self):
+        return self.finished.is_set()
+    
+    def result(self, timeout=None):
+        """Waits for the call to finish and returns its result.
+        
+            Arguments:
+                timeout: Seconds to wait. None waits forever.
+            
+            Returns: Whatever the call returned. Raises the call's exception if it failed,
+                or ROIFailedToReceiveError if it didn't finish within timeout.
+        """
+        if not self.finished.wait(timeout):
+            raise ROIFailedToReceiveError('Timed out waiting for the Create 2.')
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+
+class SerialWorker(threading.Thread):
+    """A single long lived thread that runs serial calls one at a time from a queue.
+    
+        Calls are queued with submit(), which returns a CommandFuture. A call that hangs on a read
+        is bounded by the serial port's read timeout rather than being left behind on its own thread.
+    """
+    
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.requests = queue.Queue()
     
+    def run(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            future, func, args, kwargs = request
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+    
+    def submit(self, func, *args, **kwargs):
+        """Queues func(*args, **kwargs) to run on the worker thread.
+        
+            Returns: A CommandFuture for the result.
+        """
+        future = CommandFuture()
+        self.requests.put((future, func, args, kwargs))
+        return future
+    
+    def stop(self):
+        """Lets the queued calls finish, then ends the thread.
+        """
+        self.requests.put(None)
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
+
+
+def timelimit(timeout, func, args=(), kwargs={}):
+    """ Run func on a Create2's serial worker with the given timeout.
         
+        Arguments:
+            timeout: Seconds to wait for func to finish.
+            func: The function to run, usually a Create2 method such as bot.get_packet
         
+        Returns: True if func finished within the timeout, False if it timed out or failed
+            (e.g. the robot went to sleep and the read deadline expired).
+    """
+    bot = getattr(func, '__self__', None)
+    if isinstance(bot, Create2):
+        future = bot.submit(func, *args, **kwargs)
+    else:
+        future = default_worker().submit(func, *args, **kwargs)
+    try:
+        future.result(timeout)
+        return True
+    except Exception:
+        return False
+
+
+_default_worker = None
+
+def default_worker():
+    """Returns the SerialWorker used for calls that don't belong to a Create2.
+    """
+    global _default_worker
+    if _default_worker is None:
+        _default_worker = SerialWorker()
+        _default_worker.start()
+    return _default_worker
+
+
+
+class CommandScheduler(threading.Thread):
+    """A thread that sends drive, LED and display commands at a fixed rate.
+    
+        Each kind of command has one slot that only holds the latest command, so a burst of
+        drive commands from the UI collapses into the one that was sent last. Every flush
+        writes all the pending slots in a single write(). Safety commands (stop, mode changes)
+        don't wait for a flush, they are written straight away through send_now().
+    """
+    
+    # Order the slots are written in
+    SLOTS = ('drive', 'led', 'display')
+    
+    def __init__(self, SCI, rate=20):
+        """
+            Arguments:
+                SCI: The SerialCommandInterface to write to.
+                rate: Flushes per second. The Create 2 only updates every 15ms, so there's
+                    no point going above ~66.
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.SCI = SCI
+        self.period = 1.0 / rate
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.running = threading.Event()
+        self.flush_count = 0
+    
+    def put(self, slot, command_bytes):
+        """Replaces whatever command was waiting in slot. Sent on the next flush.
+        """
+        with self.lock:
+            self.pending[slot] = command_bytes
+    
+    def send_now(self, command_bytes, clear=('drive',)):
+        """Writes a safety command ahead of everything waiting to be flushed.
+        
+            Arguments:
+                command_bytes: The encoded command.
+                clear: Slots to throw away, so a stale drive command can't follow a stop.
+        """
+        with self.lock:
+            for slot in clear:
+                self.pending.pop(slot, None)
+            self.SCI.write(command_bytes)
+    
+    def flush(self):
+        """Writes every pending command in one go.
+        """
+        with self.lock:
+            if not self.pending:
+                return
+            command_bytes = b''.join([self.pending[slot] for slot in self.SLOTS if slot in self.pending])
+            self.pending.clear()
+            self.SCI.write(command_bytes)
+        self.flush_count += 1
+    
+    def run(self):
+        self.running.set()
+        next_flush = time.time()
+        try:
+            while self.running.is_set():
+                next_flush += self.period
+                delay = next_flush - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # Fell behind, don't try to catch up with a burst of flushes
+                    next_flush = time.time()
+                self.flush()
+        except (serial.SerialException, ValueError, OSError):
+            # The port was closed underneath us
+            pass
+        finally:
+            self.running.clear()
+    
+    def stop(self):
+        """Sends what's still pending and ends the thread.
+        """
+        self.running.clear()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
+        try:
+            self.flush()
+        except (serial.SerialException, ValueError, OSError):
+            pass
+
+
 class Create2(object):
     """The top level class for controlling a Create2.
         This is the only class that outside scripts should be interacting with.    
     
     """
     
-    def __init__(self):
-        
-        self.SCI = SerialCommandInterface()
+    def __init__(self, port=None, baud=115200, capture=None):
+        """
+            Arguments:
+                port: The serial port the Create 2 is on, see SerialCommandInterface.
+                baud: The OI's baud rate.
+                capture: A file to record the serial traffic in, see SerialCommandInterface.
+        """
+        self.SCI = SerialCommandInterface(port, baud, capture)
         self.config = Config()
         self.config.load()
         self.decoder = sensorPacketDecoder(dict(self.config.data['sensor group packet lengths']))
-        self.sensor_state = dict(self.config.data['sensor data']) # Load a raw sensor dict. None of these values are correct.
+        self.encoder = CommandEncoder(self.config.data['opcodes'])
+        self.packet_lengths = self.config.packet_lengths
+        self.sensor_state = SensorState(self.config.data['sensor data']) # None of these values are correct until a packet is read.
+        self.sensor_lock = threading.Lock() # Held while a packet is decoded into sensor_state
+        self.sensor_events = SensorEvents() # Subscribers to sensor_state changes
+        self.stream_reader = None
+        self.worker = None
+        self.scheduler = None
         self.sleep_timer = .5
         
     
     def destroy(self):
         """Closes up serial ports and terminates connection to the Create2
         """
+        self.stop_stream()
+        self.stop_scheduler()
+        if self.worker is not None:
+            # Waits at most one read timeout for a call that is still talking to the robot
+            self.worker.stop()
+            self.worker = None
         self.SCI.Close()
-        print 'Disconnected'
+        print('Disconnected')
+    
+    
+    def submit(self, func, *args, **kwargs):
+        """Queues a call on this Create2's serial worker thread, so that serial reads and
+            writes happen one at a time on a single long lived thread.
+            
+            Arguments:
+                func: The function to run, e.g. bot.get_packet
+            
+            Returns: A CommandFuture for the result of the call.
+        """
+        if self.worker is None:
+            self.worker = SerialWorker()
+            self.worker.start()
+        return self.worker.submit(func, *args, **kwargs)
+    
+    def start_scheduler(self, rate=20):
+        """Starts sending drive, LED and display commands through a CommandScheduler, so that
+            only the latest of each is sent, rate times a second, in a single write.
+            Safety commands (stop, mode changes) are still sent straight away.
+        """
+        if self.scheduler is None:
+            self.scheduler = CommandScheduler(self.SCI, rate)
+            self.scheduler.start()
+    
+    def stop_scheduler(self):
+        """Flushes any pending commands and goes back to sending every command straight away.
+        """
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
+    
+    def queue_command(self, slot, command_bytes):
+        """Sends a drive/LED/display command, through the scheduler if one is running.
+        """
+        if self.scheduler is None:
+            self.SCI.write(command_bytes)
+        else:
+            self.scheduler.put(slot, command_bytes)
+    
+    def send_safety(self, command_bytes):
+        """Sends a stop or mode change command ahead of any queued drive command.
+        """
+        if self.scheduler is None:
+            self.SCI.write(command_bytes)
+        else:
+            self.scheduler.send_now(command_bytes)
     
     
     """ START OF OPEN INTERFACE COMMANDS
     """
     def start(self):
-        self.SCI.send(self.config.data['opcodes']['start'], None)
+        self.send_safety(self.encoder.simple['start'])
         
     def reset(self):
-        self.SCI.send(self.config.data['opcodes']['reset'], None)
+        self.send_safety(self.encoder.simple['reset'])
         
     def stop(self):
-        self.SCI.send(self.config.data['opcodes']['stop'], None)
+        self.send_safety(self.encoder.simple['stop'])
         
     def baud(self, baudRate):
         baud_dict = {
@@ -218,30 +748,30 @@ class Create2(object):
         """Puts the Create 2 into safe mode. Blocks for a short (<.5 sec) amount of time so the
             bot has time to change modes.
         """
-        self.SCI.send(self.config.data['opcodes']['safe'], None)
+        self.send_safety(self.encoder.simple['safe'])
         time.sleep(self.sleep_timer)
     
     def full(self):
         """Puts the Create 2 into full mode. Blocks for a short (<.5 sec) amount of time so the
             bot has time to change modes.
         """
-        self.SCI.send(self.config.data['opcodes']['full'], None)
+        self.send_safety(self.encoder.simple['full'])
         time.sleep(self.sleep_timer)
     
     def clean(self):
-        self.SCI.send(self.config.data['opcodes']['clean'], None)
+        self.send_safety(self.encoder.simple['clean'])
     
     def max(self):
-        self.SCI.send(self.config.data['opcodes']['max'], None)
+        self.send_safety(self.encoder.simple['max'])
     
     def spot(self):
-        self.SCI.send(self.config.data['opcodes']['spot'], None)
+        self.send_safety(self.encoder.simple['spot'])
     
     def seek_dock(self):
-        self.SCI.send(self.config.data['opcodes']['seek_dock'], None)
+        self.send_safety(self.encoder.simple['seek_dock'])
     
     def power(self):
-        self.SCI.send(self.config.data['opcodes']['power'], None)
+        self.send_safety(self.encoder.simple['power'])
     
     def schedule(self):
         """Not implementing this for now.
@@ -303,55 +833,38 @@ class Create2(object):
                     Turn in place clockwise: -1
                     Turn in place counterclockwise: 1
         """
-        noError = True
-        data = []
-        v = None
-        r = None
-
         #Check to make sure we are getting sent valid velocity/radius.
-        
-
-        if velocity >= -500 and velocity <= 500:
-            v = int(velocity) & 0xffff
-            #Convert 16bit velocity to Hex
-        else:
-            noError = False
+        if not -500 <= velocity <= 500:
             raise ROIDataByteError("Invalid velocity input")
-        
-        if radius == 32767 or radius == -1 or radius == 1:
-            #Special case radius
-            r = int(radius) & 0xffff
-            #Convert 16bit radius to Hex
-        else:
-            if radius >= -2000 and radius <= 2000:
-                r = int(radius) & 0xffff
-                #Convert 16bit radius to Hex
-            else:
-                noError = False
-                raise ROIDataByteError("Invalid radius input")
-
-        if noError:
-            data = struct.unpack('4B', struct.pack('>2H', v, r))
-            #An example of what data looks like:
-            #print data >> (255, 56, 1, 244)
-            
-            #data[0] = Velocity high byte
-            #data[1] = Velocity low byte
-            #data[2] = Radius high byte
-            #data[3] = Radius low byte
-            
-            #Normally we would convert data to a tuple before sending it to SCI
-            #   But struct.unpack already returns a tuple.
-            
-            self.SCI.send(self.config.data['opcodes']['drive'], data)
+        if not (-2000 <= radius <= 2000 or radius == 32767):
+            #Turning in place (-1, 1) is inside the normal range, drive straight (32767) isn't
+            raise ROIDataByteError("Invalid radius input")
+        
+        #Velocity and radius go out as signed 16 bit, high byte first:
+        #   [137] [Velocity high byte] [Velocity low byte] [Radius high byte] [Radius low byte]
+        if velocity == 0:
+            # Stopping doesn't wait for the scheduler
+            self.send_safety(self.encoder.drive(velocity, radius))
         else:
-            raise ROIFailedToSendError("Invalid data, failed to send")
-        
+            self.queue_command('drive', self.encoder.drive(velocity, radius))
     
-    def drive_direct(self):
-        """Not implementing this for now.
+    def drive_direct(self, right_velocity, left_velocity):
+        """Controls each drive wheel's velocity independently.
+        
+            Args:
+                right_velocity: A number between -500 and 500. Units are mm/s.
+                left_velocity: A number between -500 and 500. Units are mm/s.
         """
-        #self.SCI.send(self.config.data['opcodes']['start'],0)
+        if not -500 <= right_velocity <= 500:
+            raise ROIDataByteError("Invalid right velocity input")
+        if not -500 <= left_velocity <= 500:
+            raise ROIDataByteError("Invalid left velocity input")
+        
+        #   [145] [Right velocity high byte] [Right velocity low byte] [Left velocity high byte] [Left velocity low byte]
+        if right_velocity == 0 and left_velocity == 0:
+            self.send_safety(self.encoder.drive_direct(right_velocity, left_velocity))
+        else:
+            self.queue_command('drive', self.encoder.drive_direct(right_velocity, left_velocity))
     
     def drive_pwm(self):
         """Not implementing this for now.
@@ -371,31 +884,16 @@ class Create2(object):
                 side_pwm: Duty cycle for Side Brush. Value from -127 to 127. Positive speeds spin counterclockwise.
                 vacuum_pwm: Duty cycle for Vacuum. Value from 0-127. No negative speeds allowed.
         """
-        noError = True
-        data = []
-        
         #First check that our data is within bounds
-        if main_pwm >= -127 and main_pwm <= 127:
-            data[0] = main_pwm
-        else:
-            noError = False
+        if not -127 <= main_pwm <= 127:
             raise ROIDataByteError("Invalid Main Brush input")
-        if side_pwm >= -127 and side_pwm <= 127:
-            data[1] = side_pwm
-        else:
-            noError = False
+        if not -127 <= side_pwm <= 127:
             raise ROIDataByteError("Invalid Side Brush input")
-        if vacuum_pwm >= 0 and vacuum_pwm <= 127:
-            data[2] = vacuum_pwm
-        else:
-            noError = False
+        if not 0 <= vacuum_pwm <= 127:
             raise ROIDataByteError("Invalid Vacuum input")
         
-        #Send it off if there were no errors.
-        if noError:
-            self.SCI.send(self.config.data['opcodes']['motors_pwm'], tuple(data))
-        else:
-            raise ROIFailedToSendError("Invalid data, failed to send")
+        #Send it off. The brush duty cycles are signed bytes.
+        self.SCI.write(self.encoder.motors_pwm(main_pwm, side_pwm, vacuum_pwm))
         
     
     def led(self, LED_bits, Power_colour, Power_intensity):
@@ -404,7 +902,7 @@ class Create2(object):
         noError = True
 
         if noError:
-           self.SCI.send(self.config.data['opcodes']['led'], tuple([LED_bits, Power_colour, Power_intensity]))
+           self.queue_command('led', self.encoder.encode('led', (LED_bits, Power_colour, Power_intensity)))
         else:
             raise ROIFailedToSendError("Invalid data, failed to send")
     
@@ -452,17 +950,18 @@ class Create2(object):
             #Need to map ascii to numbers from the dict.
             for i in range (0,4):
                 #Check that the character is in the list, if it is, add it.
-                if display_string[i] in self.config.data['ascii table']:
-                    display_list.append(self.config.data['ascii table'][display_string[i]])
+                code = ord(display_string[i])
+                if code < 256 and self.config.ascii_codes[code] is not None:
+                    display_list.append(self.config.ascii_codes[code])
                 else:
                     # Char was not available. Just print a blank space
                     # Raise an error so the software knows that the input was bad
-                    display_list.append(self.config.data['ascii table'][' '])
+                    display_list.append(self.config.ascii_codes[32])
                     warnings.formatwarning = custom_format_warning
                     warnings.warn("Warning: Char '" + display_string[i] + "' was not found in ascii table")
                 
             #print display_list
-            self.SCI.send(self.config.data['opcodes']['digit_led_ascii'], tuple(display_list))
+            self.queue_command('display', self.encoder.encode('digit_led_ascii', display_list))
         else:
             raise ROIFailedToSendError("Invalid data, failed to send")
         
@@ -517,7 +1016,7 @@ class Create2(object):
         noError = True
         
         #the length of the song is the length of the array divided by 2
-        song_setup = [song_number,len(play_list)/2]
+        song_setup = [song_number,len(play_list)//2]
         play_list = [song_setup + play_list]
         play_list = [val for sublist in play_list for val in sublist]
 
@@ -571,7 +1070,7 @@ class Create2(object):
         #creates a list for serial codes
         play_list = []
         #convert the durations to integers
-        duration_list = map(int, duration_list)
+        duration_list = [int(duration) for duration in duration_list]
         noError = True
         
         if noError:
@@ -601,31 +1100,96 @@ class Create2(object):
             Arguments:
                 packet_id: Identifies which of the 58 sensor data packets should be sent back by the OI. 
         """
-        # Need to make sure the packet_id is a string
-        packet_id = str(packet_id)
         # Check to make sure that the packet ID is valid.
-        if packet_id in self.config.data['sensor group packet lengths']:
-            # Valid packet, send request (But convert it back to an int in a list first)
-            packet_id = [int(packet_id)]
-            self.SCI.send(self.config.data['opcodes']['sensors'], tuple(packet_id))
+        if self.packet_length(packet_id) is not None:
+            # Valid packet, send request
+            self.SCI.write(self.encoder.encode('sensors', (int(packet_id),)))
         else:
             raise ROIFailedToSendError("Invalid packet id, failed to send")
         
     
-    def query_list(self):
-        """Not implementing this for now.
-        """
-        #self.SCI.send(self.config.data['opcodes']['start'],0)
+    def query_list(self, packet_ids):
+        """Requests several sensor packets in one go. The Create 2 sends the packets back to back
+            in the order they were requested, so they are read with a single read and decoded
+            into sensor_state in one pass.
+            
+            Arguments:
+                packet_ids: A list of the packet ids to request.
+            
+            Returns: True if the packets successfully came through.
+        """
+        packet_ids = [int(packet_id) for packet_id in packet_ids]
+        packet_sizes = []
+        for packet_id in packet_ids:
+            packet_size = self.packet_length(packet_id)
+            if packet_size is None:
+                raise ROIDataByteError("Invalid packet ID")
+            packet_sizes.append(packet_size)
+        if len(packet_ids) == 0 or len(packet_ids) > 255:
+            raise ROIDataByteError("Invalid number of packets")
+        
+        self.SCI.write(self.encoder.encode('query_list', [len(packet_ids)] + packet_ids))
+        packet_byte_data = self.SCI.ReadInto(sum(packet_sizes))
+        with self.sensor_lock:
+            offset = 0
+            for packet_id, packet_size in zip(packet_ids, packet_sizes):
+                self.sensor_state = self.decoder.decode_packet(packet_id, packet_byte_data, self.sensor_state, offset)
+                offset += packet_size
+        self.sensor_events.publish(self.sensor_state)
+        return True
     
-    def stream(self):
-        """Not implementing this for now.
+    def stream(self, packet_ids):
+        """Starts a stream of sensor data. The Create 2 sends the requested packets every 15ms
+            and a background thread decodes each frame into sensor_state as it arrives.
+            
+            Arguments:
+                packet_ids: A list of the packet ids that should be included in the stream.
+        """
+        packet_ids = [int(packet_id) for packet_id in packet_ids]
+        for packet_id in packet_ids:
+            if self.packet_length(packet_id) is None:
+                raise ROIDataByteError("Invalid packet id, failed to send")
+        if len(packet_ids) == 0 or len(packet_ids) > 255:
+            raise ROIDataByteError("Invalid number of stream packets")
+        
+        if self.stream_reader is None:
+            self.stream_reader = SensorStreamReader(self)
+            self.stream_reader.start()
+        # Every frame has an id byte and the data of each packet, so anything else is noise
+        self.stream_reader.sync.expected_length = sum(self.packet_length(packet_id) + 1 for packet_id in packet_ids)
+        self.SCI.write(self.encoder.encode('stream', [len(packet_ids)] + packet_ids))
+    
+    def pause_resume_stream(self, resume):
+        """Pauses or resumes a stream that was started with stream(), without clearing the
+            list of requested packets.
+            
+            Arguments:
+                resume: True to resume the stream, False to pause it.
         """
-        #self.SCI.send(self.config.data['opcodes']['start'],0)
+        if resume:
+            self.SCI.send(self.config.data['opcodes']['pause_resume_stream'], (1,))
+        else:
+            self.SCI.send(self.config.data['opcodes']['pause_resume_stream'], (0,))
     
-    def pause_resume_stream(self):
-        """Not implementing this for now.
+    def stream_stats(self):
+        """ Returns a dict of the stream reader's good/bad frame, resync and skipped byte counts,
+            or None if there's no stream.
         """
-        #self.SCI.send(self.config.data['opcodes']['start'],0)
+        if self.stream_reader is None:
+            return None
+        return self.stream_reader.sync.stats()
+    
+    def stop_stream(self):
+        """Pauses the stream and waits for the stream reader thread to finish.
+            get_packet() can be used again once this returns.
+        """
+        if self.stream_reader is not None:
+            try:
+                self.pause_resume_stream(False)
+            except (serial.SerialException, OSError):
+                pass  # The port has gone away, there's no stream to pause
+            self.stream_reader.stop()
+            self.stream_reader = None
 
     """ END OF OPEN INTERFACE COMMANDS
     """
@@ -666,1045 +1230,666 @@ class Create2(object):
             
             Returns: False if there was an error, True if the packet successfully came through.
         """
-        packet_id = str(packet_id)
-        packet_size = None
+        packet_size = self.packet_length(packet_id)
         packet_byte_data = None
-        if packet_id in self.config.data['sensor group packet lengths']:
-            # If a packet is in this dict, that means it is valid
-            packet_size = self.config.data['sensor group packet lengths'][packet_id]
+        if packet_size is not None:
+            # If a packet has a length, that means it is valid
+            packet_id = int(packet_id)
             #Let the robot know that we want some sensor data!
             self.sensors(packet_id)
             #Read the data
-            packet_byte_data = list(self.SCI.Read(packet_size))
+            packet_byte_data = self.SCI.ReadInto(packet_size)
             # Once we have the byte data, we need to decode the packet and save the new sensor state
-            self.sensor_state = self.decoder.decode_packet(packet_id, packet_byte_data, self.sensor_state)
+            with self.sensor_lock:
+                self.sensor_state = self.decoder.decode_packet(packet_id, packet_byte_data, self.sensor_state)
+            self.sensor_events.publish(self.sensor_state)
             return True
         else:
             #The packet was invalid, raise an error
             raise ROIDataByteError("Invalid packet ID")
             return False
+    
+    def sensor_snapshot(self):
+        """ Returns a copy of sensor_state that won't change while it's being used, e.g. by a
+            stream reader decoding the next frame.
+        """
+        with self.sensor_lock:
+            return self.sensor_state.snapshot()
+    
+    def packet_length(self, packet_id):
+        """ Returns the number of data bytes in a packet, or None if packet_id isn't a valid packet.
+        """
+        packet_id = int(packet_id)
+        if 0 <= packet_id <= 255:
+            return self.packet_lengths[packet_id]
+        return None
 
 
 
-class sensorPacketDecoder(object):
-    """ A class that handles sensor packet decoding. 
-        
-        This class may, in the future, become a private class. Users shouldn't be interacting with
-        this class directly -- scripts should use Create2.get_packet() instead.
+class StreamFrameSync(object):
+    """ Finds stream frames in the bytes coming from the Create 2, and gets back in step after
+        line noise or a partial frame.
     
+        A frame looks like: [19] [N-bytes] [Packet ID 1] [Packet 1 data...] [Packet ID 2] ... [Checksum]
+        The low byte of the sum of every byte in the frame, checksum included, is 0.
+        
+        Bytes are read into a fixed buffer. Anything before a 19 header is skipped. A frame that
+        fails the checksum, or whose packets don't add up to N, is dropped, and the search for the
+        next header starts one byte after the header of the frame that was dropped, so the real
+        frame is found even when it starts inside a bad one. That means sync is back within one
+        frame, without a reconnect.
+        
+        Counters:
+            good_frames: Frames that passed every check
+            bad_frames: Candidate frames that were dropped
+            resyncs: Times a good frame was found again after sync was lost
+            skipped_bytes: Bytes that weren't part of any good frame
     """
     
-    def __init__(self, sensor_packet_lengths):
-        self.lengths = sensor_packet_lengths
+    def __init__(self, packet_lengths, size=1024):
+        """
+            Arguments:
+                packet_lengths: Packet id -> number of data bytes, e.g. Create2.packet_lengths
+                size: Buffer size. Must hold at least a whole frame (258 bytes).
+        """
+        self.packet_lengths = packet_lengths
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0   # First byte that hasn't been looked at
+        self.end = 0     # End of the bytes that have been read
+        self.expected_length = None  # N of the frames we asked for, if we know it
+        self.synced = True
+        self.good_frames = 0
+        self.bad_frames = 0
+        self.resyncs = 0
+        self.skipped_bytes = 0
     
-    def decode_packet(self, packet_id, byte_data, sensor_data):
-        """ Decodes an OI packet
-            
-            Arguments:
-                packet_id: The id of the packet. Duh.
-                byte_data: The bytes that the Create 2 sent over serial
-                sensor_data: A dict containing the sensor states of the Create 2
-            Returns:
-                A dict containing the updated sensor states of the Create 2
-        """
-        return_dict = None
-        id = int(packet_id)  # Convert the packet id from a string to an int
-        
-        # Depending on the packet id, we will need to do different decoding.
-        # Packets 1-6 and 100, 101, 106, and 107 are special cases where they
-        #   contain groups of packets.
-        #
-        # Other packets (7-58) are single packets, but some of them have two byte
-        #   data, and also need special treatment.
-        
-        # Hold onto your hats. This is gonna get long fast.
-        if id == 0:
-            # Size 26, contains packet 7-26
-            # We decode the data in reverse order to make pop() simpler
-            sensor_data['battery capacity'] = self.decode_packet_26(byte_data.pop(), byte_data.pop())
-            sensor_data['battery charge'] = self.decode_packet_25(byte_data.pop(), byte_data.pop())
-            sensor_data['temperature'] = self.decode_packet_24(byte_data.pop())
-            sensor_data['current'] = self.decode_packet_23(byte_data.pop(), byte_data.pop())
-            sensor_data['voltage'] = self.decode_packet_22(byte_data.pop(), byte_data.pop())
-            sensor_data['charging state'] = self.decode_packet_21(byte_data.pop())
-            sensor_data['angle'] = self.decode_packet_20(byte_data.pop(), byte_data.pop())
-            sensor_data['distance'] = self.decode_packet_19(byte_data.pop(), byte_data.pop())
-            sensor_data['buttons'] = self.decode_packet_18(byte_data.pop())
-            sensor_data['infared char omni'] = self.decode_packet_17(byte_data.pop())
-            temp = self.decode_packet_16(byte_data.pop())
-            sensor_data['dirt detect'] = self.decode_packet_15(byte_data.pop())
-            sensor_data['wheel overcurrents'] = self.decode_packet_14(byte_data.pop())
-            sensor_data['virtual wall'] = self.decode_packet_13(byte_data.pop())
-            sensor_data['cliff right'] = self.decode_packet_12(byte_data.pop())
-            sensor_data['cliff front right'] = self.decode_packet_11(byte_data.pop())
-            sensor_data['cliff front left'] = self.decode_packet_10(byte_data.pop())
-            sensor_data['cliff left'] = self.decode_packet_9(byte_data.pop())
-            sensor_data['wall seen'] = self.decode_packet_8(byte_data.pop())
-            sensor_data['wheel drop and bumps'] = self.decode_packet_7(byte_data.pop())
-            
-        elif id == 1:
-            # Size 10, contains 7-16
-            temp = self.decode_packet_16(byte_data.pop())
-            sensor_data['dirt detect'] = self.decode_packet_15(byte_data.pop())
-            sensor_data['wheel overcurrents'] = self.decode_packet_14(byte_data.pop())
-            sensor_data['virtual wall'] = self.decode_packet_13(byte_data.pop())
-            sensor_data['cliff right'] = self.decode_packet_12(byte_data.pop())
-            sensor_data['cliff front right'] = self.decode_packet_11(byte_data.pop())
-            sensor_data['cliff front left'] = self.decode_packet_10(byte_data.pop())
-            sensor_data['cliff left'] = self.decode_packet_9(byte_data.pop())
-            sensor_data['wall seen'] = self.decode_packet_8(byte_data.pop())
-            sensor_data['wheel drop and bumps'] = self.decode_packet_7(byte_data.pop())
-            
-        elif id == 2:
-            # size 6, contains 17-20
-            sensor_data['angle'] = self.decode_packet_20(byte_data.pop(), byte_data.pop())
-            sensor_data['distance'] = self.decode_packet_19(byte_data.pop(), byte_data.pop())
-            sensor_data['buttons'] = self.decode_packet_18(byte_data.pop())
-            sensor_data['infared char left'] = self.decode_packet_17(byte_data.pop())
-            
-        elif id == 3:
-            # size 10, contains 21-26
-            sensor_data['battery capacity'] = self.decode_packet_26(byte_data.pop(), byte_data.pop())
-            sensor_data['battery charge'] = self.decode_packet_25(byte_data.pop(), byte_data.pop())
-            sensor_data['temperature'] = self.decode_packet_24(byte_data.pop())
-            sensor_data['current'] = self.decode_packet_23(byte_data.pop(), byte_data.pop())
-            sensor_data['voltage'] = self.decode_packet_22(byte_data.pop(), byte_data.pop())
-            sensor_data['charging state'] = self.decode_packet_21(byte_data.pop())
-            
-        elif id == 4:
-            # size 14, contains 27-34
-            sensor_data['charging sources available'] = self.decode_packet_34(byte_data.pop())
-            temp1 = self.decode_packet_33(byte_data.pop(), byte_data.pop())
-            temp = self.decode_packet_32(byte_data.pop())
-            sensor_data['cliff right signal'] = self.decode_packet_31(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff front right signal'] = self.decode_packet_30(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff front left signal'] = self.decode_packet_29(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff left signal'] = self.decode_packet_28(byte_data.pop(), byte_data.pop())
-            sensor_data['wall signal'] = self.decode_packet_27(byte_data.pop(), byte_data.pop())
-            
-        elif id == 5:
-            # size 12, contains 35-42
-            sensor_data['requested left velocity'] = self.decode_packet_42(byte_data.pop(), byte_data.pop())
-            sensor_data['requested right velocity'] = self.decode_packet_41(byte_data.pop(), byte_data.pop())
-            sensor_data['requested radius'] = self.decode_packet_40(byte_data.pop(), byte_data.pop())
-            sensor_data['requested velocity'] = self.decode_packet_39(byte_data.pop(), byte_data.pop())
-            sensor_data['number of stream packets'] = self.decode_packet_38(byte_data.pop())
-            sensor_data['song playing'] = self.decode_packet_37(byte_data.pop())
-            sensor_data['song number'] = self.decode_packet_36(byte_data.pop())
-            sensor_data['oi mode'] = self.decode_packet_35(byte_data.pop())
-            
-        elif id == 6:
-            # size 52, contains 7-42
-            sensor_data['requested left velocity'] = self.decode_packet_42(byte_data.pop(), byte_data.pop())
-            sensor_data['requested right velocity'] = self.decode_packet_41(byte_data.pop(), byte_data.pop())
-            sensor_data['requested radius'] = self.decode_packet_40(byte_data.pop(), byte_data.pop())
-            sensor_data['requested velocity'] = self.decode_packet_39(byte_data.pop(), byte_data.pop())
-            sensor_data['number of stream packets'] = self.decode_packet_38(byte_data.pop())
-            sensor_data['song playing'] = self.decode_packet_37(byte_data.pop())
-            sensor_data['song number'] = self.decode_packet_36(byte_data.pop())
-            sensor_data['oi mode'] = self.decode_packet_35(byte_data.pop())
-            sensor_data['charging sources available'] = self.decode_packet_34(byte_data.pop())
-            temp2 = self.decode_packet_33(byte_data.pop(), byte_data.pop())
-            temp1 = self.decode_packet_32(byte_data.pop())
-            sensor_data['cliff right signal'] = self.decode_packet_31(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff front right signal'] = self.decode_packet_30(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff front left signal'] = self.decode_packet_29(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff left signal'] = self.decode_packet_28(byte_data.pop(), byte_data.pop())
-            sensor_data['wall signal'] = self.decode_packet_27(byte_data.pop(), byte_data.pop())
-            sensor_data['battery capacity'] = self.decode_packet_26(byte_data.pop(), byte_data.pop())
-            sensor_data['battery charge'] = self.decode_packet_25(byte_data.pop(), byte_data.pop())
-            sensor_data['temperature'] = self.decode_packet_24(byte_data.pop())
-            sensor_data['current'] = self.decode_packet_23(byte_data.pop(), byte_data.pop())
-            sensor_data['voltage'] = self.decode_packet_22(byte_data.pop(), byte_data.pop())
-            sensor_data['charging state'] = self.decode_packet_21(byte_data.pop())
-            sensor_data['angle'] = self.decode_packet_20(byte_data.pop(), byte_data.pop())
-            sensor_data['distance'] = self.decode_packet_19(byte_data.pop(), byte_data.pop())
-            sensor_data['buttons'] = self.decode_packet_18(byte_data.pop())
-            sensor_data['infared char omni'] = self.decode_packet_17(byte_data.pop())
-            temp = self.decode_packet_16(byte_data.pop())
-            sensor_data['dirt detect'] = self.decode_packet_15(byte_data.pop())
-            sensor_data['wheel overcurrents'] = self.decode_packet_14(byte_data.pop())
-            sensor_data['virtual wall'] = self.decode_packet_13(byte_data.pop())
-            sensor_data['cliff right'] = self.decode_packet_12(byte_data.pop())
-            sensor_data['cliff front right'] = self.decode_packet_11(byte_data.pop())
-            sensor_data['cliff front left'] = self.decode_packet_10(byte_data.pop())
-            sensor_data['cliff left'] = self.decode_packet_9(byte_data.pop())
-            sensor_data['wall seen'] = self.decode_packet_8(byte_data.pop())
-            sensor_data['wheel drop and bumps'] = self.decode_packet_7(byte_data.pop())
-            
-        elif id == 7:
-            sensor_data['wheel drop and bumps'] = self.decode_packet_7(byte_data.pop())
-        elif id == 8:
-            sensor_data['wall seen'] = self.decode_packet_8(byte_data.pop())
-        elif id == 9:
-            sensor_data['cliff left'] = self.decode_packet_9(byte_data.pop())
-        elif id == 10:
-            sensor_data['cliff front left'] = self.decode_packet_10(byte_data.pop())
-        elif id == 11:
-            sensor_data['cliff front right'] = self.decode_packet_11(byte_data.pop())
-        elif id == 12:
-            sensor_data['cliff right'] = self.decode_packet_12(byte_data.pop())
-        elif id == 13:
-            sensor_data['virtual wall'] = self.decode_packet_13(byte_data.pop())
-        elif id == 14:
-            sensor_data['wheel overcurrents'] = self.decode_packet_14(byte_data.pop())
-        elif id == 15:
-            sensor_data['dirt detect'] = self.decode_packet_15(byte_data.pop())
-        elif id == 16:
-            #unused
-            temp = self.decode_packet_16(byte_data.pop())
-        elif id == 17:
-            sensor_data['infared char omni'] = self.decode_packet_17(byte_data.pop())
-        elif id == 18:
-            sensor_data['buttons'] = self.decode_packet_18(byte_data.pop())
-        elif id == 19:
-            #2
-            sensor_data['distance'] = self.decode_packet_19(byte_data.pop(), byte_data.pop())
-        elif id == 20:
-            #2
-            sensor_data['angle'] = self.decode_packet_20(byte_data.pop(), byte_data.pop())
-        elif id == 21:
-            sensor_data['charging state'] = self.decode_packet_21(byte_data.pop())
-        elif id == 22:
-            #2
-            sensor_data['voltage'] = self.decode_packet_22(byte_data.pop(), byte_data.pop())
-        elif id == 23:
-            #2
-            sensor_data['current'] = self.decode_packet_23(byte_data.pop(), byte_data.pop())
-        elif id == 24:
-            sensor_data['temperature'] = self.decode_packet_24(byte_data.pop())
-        elif id == 25:
-            #2
-            sensor_data['battery charge'] = self.decode_packet_25(byte_data.pop(), byte_data.pop())
-        elif id == 26:
-            #2
-            sensor_data['battery capacity'] = self.decode_packet_26(byte_data.pop(), byte_data.pop())
-        elif id == 27:
-            #2
-            sensor_data['wall signal'] = self.decode_packet_27(byte_data.pop(), byte_data.pop())
-        elif id == 28:
-            #2
-            sensor_data['cliff left signal'] = self.decode_packet_28(byte_data.pop(), byte_data.pop())
-        elif id == 29:
-            #2
-            sensor_data['cliff front left signal'] = self.decode_packet_29(byte_data.pop(), byte_data.pop())
-        elif id == 30:
-            #2
-            sensor_data['cliff front right signal'] = self.decode_packet_30(byte_data.pop(), byte_data.pop())
-        elif id == 31:
-            #2
-            sensor_data['cliff right signal'] = self.decode_packet_31(byte_data.pop(), byte_data.pop())
-        elif id == 32:
-            temp = self.decode_packet_32(byte_data.pop())
-        elif id == 33:
-            #2
-            temp = self.decode_packet_33(byte_data.pop(), byte_data.pop())
-        elif id == 34:
-            sensor_data['charging sources available'] = self.decode_packet_34(byte_data.pop())
-        elif id == 35:
-            sensor_data['oi mode'] = self.decode_packet_35(byte_data.pop())
-        elif id == 36:
-            sensor_data['song number'] = self.decode_packet_36(byte_data.pop())
-        elif id == 37:
-            sensor_data['song playing'] = self.decode_packet_37(byte_data.pop())
-        elif id == 38:
-            sensor_data['number of stream packets'] = self.decode_packet_38(byte_data.pop())
-        elif id == 39:
-            #2
-            sensor_data['requested velocity'] = self.decode_packet_39(byte_data.pop(), byte_data.pop())
-        elif id == 40:
-            #2
-            sensor_data['requested radius'] = self.decode_packet_40(byte_data.pop(), byte_data.pop())
-        elif id == 41:
-            #2
-            sensor_data['requested right velocity'] = self.decode_packet_41(byte_data.pop(), byte_data.pop())
-        elif id == 42:
-            #2
-            sensor_data['requested left velocity'] = self.decode_packet_42(byte_data.pop(), byte_data.pop())
-        elif id == 43:
-            #2
-            sensor_data['left encoder counts'] = self.decode_packet_43(byte_data.pop(), byte_data.pop())
-        elif id == 44:
-            #2
-            sensor_data['right encoder counts'] = self.decode_packet_44(byte_data.pop(), byte_data.pop())
-        elif id == 45:
-            sensor_data['light bumper'] = self.decode_packet_45(byte_data.pop())
-        elif id == 46:
-            #2
-            sensor_data['light bump left signal'] = self.decode_packet_46(byte_data.pop(), byte_data.pop())
-        elif id == 47:
-            #2
-            sensor_data['light bump front left signal'] = self.decode_packet_47(byte_data.pop(), byte_data.pop())
-        elif id == 48:
-            #2
-            sensor_data['light bump center left signal'] = self.decode_packet_48(byte_data.pop(), byte_data.pop())
-        elif id == 49:
-            #2
-            sensor_data['light bump center right signal'] = self.decode_packet_49(byte_data.pop(), byte_data.pop())
-        elif id == 50:
-            #2
-            sensor_data['light bump front right signal'] = self.decode_packet_50(byte_data.pop(), byte_data.pop())
-        elif id == 51:
-            #2
-            sensor_data['light bump right signal'] = self.decode_packet_51(byte_data.pop(), byte_data.pop())
-        elif id == 52:
-            sensor_data['infared char left'] = self.decode_packet_52(byte_data.pop())
-        elif id == 53:
-            sensor_data['infared char right'] = self.decode_packet_53(byte_data.pop())
-        elif id == 54:
-            #2
-            sensor_data['left motor current'] = self.decode_packet_54(byte_data.pop(), byte_data.pop())
-        elif id == 55:
-            #2
-            sensor_data['right motor current'] = self.decode_packet_55(byte_data.pop(), byte_data.pop())
-        elif id == 56:
-            #2
-            sensor_data['main brush motor current'] = self.decode_packet_56(byte_data.pop(), byte_data.pop())
-        elif id == 57:
-            #2
-            sensor_data['side brush motor current'] = self.decode_packet_57(byte_data.pop(), byte_data.pop())
-        elif id == 58:
-            sensor_data['stasis'] = self.decode_packet_58(byte_data.pop())
-            ##### Single Packets END
-        elif id == 100:
-            # size 80, contains 7-58 (ALL)
-            sensor_data['stasis'] = self.decode_packet_58(byte_data.pop())
-            sensor_data['side brush motor current'] = self.decode_packet_57(byte_data.pop(), byte_data.pop())
-            sensor_data['main brush motor current'] = self.decode_packet_56(byte_data.pop(), byte_data.pop())
-            sensor_data['right motor current'] = self.decode_packet_55(byte_data.pop(), byte_data.pop())
-            sensor_data['left motor current'] = self.decode_packet_54(byte_data.pop(), byte_data.pop())
-            sensor_data['infared char right'] = self.decode_packet_53(byte_data.pop())
-            sensor_data['infared char left'] = self.decode_packet_52(byte_data.pop())
-            sensor_data['light bump right signal'] = self.decode_packet_51(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump front right signal'] = self.decode_packet_50(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump center right signal'] = self.decode_packet_49(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump center left signal'] = self.decode_packet_48(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump front left signal'] = self.decode_packet_47(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump left signal'] = self.decode_packet_46(byte_data.pop(), byte_data.pop())
-            sensor_data['light bumper'] = self.decode_packet_45(byte_data.pop())
-            sensor_data['right encoder counts'] = self.decode_packet_44(byte_data.pop(), byte_data.pop())
-            sensor_data['left encoder counts'] = self.decode_packet_43(byte_data.pop(), byte_data.pop())
-            sensor_data['requested left velocity'] = self.decode_packet_42(byte_data.pop(), byte_data.pop())
-            sensor_data['requested right velocity'] = self.decode_packet_41(byte_data.pop(), byte_data.pop())
-            sensor_data['requested radius'] = self.decode_packet_40(byte_data.pop(), byte_data.pop())
-            sensor_data['requested velocity'] = self.decode_packet_39(byte_data.pop(), byte_data.pop())
-            sensor_data['number of stream packets'] = self.decode_packet_38(byte_data.pop())
-            sensor_data['song playing'] = self.decode_packet_37(byte_data.pop())
-            sensor_data['song number'] = self.decode_packet_36(byte_data.pop())
-            sensor_data['oi mode'] = self.decode_packet_35(byte_data.pop())
-            sensor_data['charging sources available'] = self.decode_packet_34(byte_data.pop())
-            temp2 = self.decode_packet_33(byte_data.pop(), byte_data.pop())
-            temp1 = self.decode_packet_32(byte_data.pop())
-            sensor_data['cliff right signal'] = self.decode_packet_31(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff front right signal'] = self.decode_packet_30(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff front left signal'] = self.decode_packet_29(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff left signal'] = self.decode_packet_28(byte_data.pop(), byte_data.pop())
-            sensor_data['wall signal'] = self.decode_packet_27(byte_data.pop(), byte_data.pop())
-            sensor_data['battery capacity'] = self.decode_packet_26(byte_data.pop(), byte_data.pop())
-            sensor_data['battery charge'] = self.decode_packet_25(byte_data.pop(), byte_data.pop())
-            sensor_data['temperature'] = self.decode_packet_24(byte_data.pop())
-            sensor_data['current'] = self.decode_packet_23(byte_data.pop(), byte_data.pop())
-            sensor_data['voltage'] = self.decode_packet_22(byte_data.pop(), byte_data.pop())
-            sensor_data['charging state'] = self.decode_packet_21(byte_data.pop())
-            sensor_data['angle'] = self.decode_packet_20(byte_data.pop(), byte_data.pop())
-            sensor_data['distance'] = self.decode_packet_19(byte_data.pop(), byte_data.pop())
-            sensor_data['buttons'] = self.decode_packet_18(byte_data.pop())
-            sensor_data['infared char omni'] = self.decode_packet_17(byte_data.pop())
-            temp = self.decode_packet_16(byte_data.pop())
-            sensor_data['dirt detect'] = self.decode_packet_15(byte_data.pop())
-            sensor_data['wheel overcurrents'] = self.decode_packet_14(byte_data.pop())
-            sensor_data['virtual wall'] = self.decode_packet_13(byte_data.pop())
-            sensor_data['cliff right'] = self.decode_packet_12(byte_data.pop())
-            sensor_data['cliff front right'] = self.decode_packet_11(byte_data.pop())
-            sensor_data['cliff front left'] = self.decode_packet_10(byte_data.pop())
-            sensor_data['cliff left'] = self.decode_packet_9(byte_data.pop())
-            sensor_data['wall seen'] = self.decode_packet_8(byte_data.pop())
-            sensor_data['wheel drop and bumps'] = self.decode_packet_7(byte_data.pop())
-            
-        elif id == 101:
-            # size 28, contains 43-58
-            sensor_data['stasis'] = self.decode_packet_58(byte_data.pop())
-            sensor_data['side brush motor current'] = self.decode_packet_57(byte_data.pop(), byte_data.pop())
-            sensor_data['main brush motor current'] = self.decode_packet_56(byte_data.pop(), byte_data.pop())
-            sensor_data['right motor current'] = self.decode_packet_55(byte_data.pop(), byte_data.pop())
-            sensor_data['left motor current'] = self.decode_packet_54(byte_data.pop(), byte_data.pop())
-            sensor_data['infared char right'] = self.decode_packet_53(byte_data.pop())
-            sensor_data['infared char left'] = self.decode_packet_52(byte_data.pop())
-            sensor_data['light bump right signal'] = self.decode_packet_51(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump front right signal'] = self.decode_packet_50(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump center right signal'] = self.decode_packet_49(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump center left signal'] = self.decode_packet_48(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump front left signal'] = self.decode_packet_47(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump left signal'] = self.decode_packet_46(byte_data.pop(), byte_data.pop())
-            sensor_data['light bumper'] = self.decode_packet_45(byte_data.pop())
-            sensor_data['right encoder counts'] = self.decode_packet_44(byte_data.pop(), byte_data.pop())
-            sensor_data['left encoder counts'] = self.decode_packet_43(byte_data.pop(), byte_data.pop())
-            
-        elif id == 106:
-            # size 12, contains 46-51
-            sensor_data['light bump right signal'] = self.decode_packet_51(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump front right signal'] = self.decode_packet_50(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump center right signal'] = self.decode_packet_49(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump center left signal'] = self.decode_packet_48(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump front left signal'] = self.decode_packet_47(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump left signal'] = self.decode_packet_46(byte_data.pop(), byte_data.pop())
-            
-        elif id == 107:
-            # size 9, contains 54-58
-            sensor_data['stasis'] = self.decode_packet_58(byte_data.pop())
-            sensor_data['side brush motor current'] = self.decode_packet_57(byte_data.pop(), byte_data.pop())
-            sensor_data['main brush motor current'] = self.decode_packet_56(byte_data.pop(), byte_data.pop())
-            sensor_data['right motor current'] = self.decode_packet_55(byte_data.pop(), byte_data.pop())
-            sensor_data['left motor current'] = self.decode_packet_54(byte_data.pop(), byte_data.pop())
-            
-        else:
-            warnings.formatwarning = custom_format_warning
-            warnings.warn("Warning: Packet '" + id + "' is not a valid packet!")
-            
-        
-        # No, Python doesn't need a switch case at all.
-        
-        return sensor_data
-        
-    def decode_packet_7(self, data):
-        """ Decode Packet 7 (wheel drop and bumps) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: A dict of 'wheel drop and bumps'
+    def reset(self):
+        """ Throws away everything in the buffer, e.g. after the stream has been paused.
         """
-        byte = struct.unpack('B', data)[0]
-        return_dict = {
-            'drop left': bool(byte & 0x08),
-            'drop right': bool(byte & 0x04),
-            'bump left': bool(byte & 0x02),
-            'bump right': bool(byte & 0x01)}
-        return return_dict
+        self.start = self.end = 0
+    
+    def make_room(self):
+        """ Moves the unread bytes to the front of the buffer. Only happens when the end is reached,
+            and frames are small next to the buffer, so there's very little to move.
+        """
+        if self.start == self.end:
+            self.start = self.end = 0
+        elif self.start > 0:
+            remaining = self.end - self.start
+            self.buffer[:remaining] = self.buffer[self.start:self.end]
+            self.start, self.end = 0, remaining
+    
+    def fill(self, ser):
+        """ Reads whatever the port has waiting (or waits up to the port's timeout for one byte)
+            into the buffer.
+        
+            Returns: The number of bytes read.
+        """
+        if self.end == len(self.buffer):
+            self.make_room()
+        room = len(self.buffer) - self.end
+        wanted = min(max(ser.inWaiting(), 1), room)  # inWaiting() is in pyserial 2 and 3
+        received = ser.readinto(self.view[self.end:self.end + wanted])
+        self.end += received
+        return received
+    
+    def feed(self, data):
+        """ Adds bytes that have already been read, e.g. by create2aio.
+        """
+        data = memoryview(data)
+        while len(data):
+            if self.end == len(self.buffer):
+                self.make_room()
+                if self.end == len(self.buffer):
+                    # Full and nothing to keep: no frame is that long, so it's all noise
+                    self.lost(self.end - self.start)
+                    self.start = self.end = 0
+            count = min(len(data), len(self.buffer) - self.end)
+            self.buffer[self.end:self.end + count] = data[:count]
+            self.end += count
+            data = data[count:]
+    
+    def lost(self, skipped):
+        if skipped:
+            self.skipped_bytes += skipped
+            self.synced = False
+    
+    def next_frame(self):
+        """ Looks for the next good frame in the buffer.
+        
+            Returns: A list of (packet id, offset of its data in self.buffer), or None if more bytes
+                are needed. The offsets are only good until the next fill() or feed().
+        """
+        buffer = self.buffer
+        while True:
+            header = buffer.find(b'\x13', self.start, self.end)
+            if header < 0:
+                self.lost(self.end - self.start)
+                self.start = self.end
+                return None
+            if header > self.start:
+                self.lost(header - self.start)
+                self.start = header
+            if self.end - header < 2:
+                return None
+            length = buffer[header + 1]
+            if self.expected_length is None or length == self.expected_length:
+                if self.end - header < length + 3:
+                    # Wait for the rest of the frame
+                    return None
+                if sum(itertools.islice(buffer, header, header + length + 3)) & 0xff == 0:
+                    packets = frame_packets(buffer, header + 2, header + 2 + length, self.packet_lengths)
+                    if packets is not None:
+                        self.start = header + length + 3
+                        self.good_frames += 1
+                        if not self.synced:
+                            self.resyncs += 1
+                            self.synced = True
+                        return packets
+            # Not a frame. The real header may be anywhere after this one
+            self.bad_frames += 1
+            self.lost(1)
+            self.start = header + 1
+    
+    def stats(self):
+        return {'good frames': self.good_frames, 'bad frames': self.bad_frames,
+                'resyncs': self.resyncs, 'skipped bytes': self.skipped_bytes}
 
-    def decode_packet_8(self, data):
-        """ Decode Packet 8 (wall seen) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: True or False
-        """
-        return self.decode_bool(data)
 
-    def decode_packet_9(self, data):
-        """ Decode Packet 9 (cliff left) and return its value
+class SensorStreamReader(threading.Thread):
+    """ A thread that reads stream frames sent by the Create 2 after a Stream command, and decodes
+        them into the bot's sensor_state. A StreamFrameSync finds the frames and drops bad ones.
+    """
+    
+    def __init__(self, bot, read_timeout=.1):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.bot = bot
+        self.read_timeout = read_timeout
+        self.running = threading.Event()
+        self.frame_count = 0
+        self.last_frame_time = None
+        self.sync = StreamFrameSync(bot.packet_lengths)
+    
+    def run(self):
+        ser = self.bot.SCI.ser
+        timeout = ser.timeout
+        # A short read timeout lets the thread notice when it has been asked to stop
+        ser.timeout = self.read_timeout
+        self.running.set()
+        try:
+            while self.running.is_set():
+                received = self.sync.fill(ser)
+                if received:
+                    capture = self.bot.SCI.capture
+                    if capture is not None:
+                        capture.record(CAPTURE_READ, self.sync.view[self.sync.end - received:self.sync.end])
+                    packets = self.sync.next_frame()
+                    while packets is not None:
+                        self.decode_packets(self.sync.buffer, packets)
+                        packets = self.sync.next_frame()
+        except (serial.SerialException, ValueError, OSError):
+            # The port was closed underneath us, nothing left to read
+            pass
+        finally:
+            self.running.clear()
+            try:
+                if ser.isOpen():
+                    ser.timeout = timeout
+            except (serial.SerialException, OSError):
+                pass  # The port has gone away
+    
+    def stop(self):
+        """Asks the thread to stop and waits for it to finish.
+        """
+        self.running.clear()
+        if self.is_alive():
+            self.join()
+    
+    def decode_frame(self, frame, start=0, end=None):
+        """ Decodes each [Packet ID] [Packet data] pair of a frame into the bot's sensor_state
         
             Arguments:
-                data: The bytes to decode
-        
-            Returns: True or False
+                frame: A bytearray holding the frame contents
+                start: Where the frame contents start in frame
+                end: Where the frame contents end in frame. Defaults to the end of frame.
         """
-        return self.decode_bool(data)   
+        if end is None:
+            end = len(frame)
+        packets = frame_packets(frame, start, end, self.bot.packet_lengths)
+        if packets is not None:
+            self.decode_packets(frame, packets)
+    
+    def decode_packets(self, frame, packets):
+        with self.bot.sensor_lock:
+            for packet_id, offset in packets:
+                self.bot.sensor_state = self.bot.decoder.decode_packet(packet_id, frame, self.bot.sensor_state, offset)
+        self.bot.sensor_events.publish(self.bot.sensor_state)
+        self.frame_count += 1
+        self.last_frame_time = time.time()
 
-    def decode_packet_10(self, data):
-        """ Decode Packet 10 (cliff front left) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: True or False
-        """
-        return self.decode_bool(data)
 
-    def decode_packet_11(self, data):
-        """ Decode Packet 11 (cliff front right) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: True or False
-        """
-        return self.decode_bool(data)
+def frame_packets(frame, start, end, packet_lengths):
+    """ Finds the packets in the contents of a stream frame
+    
+        Arguments:
+            frame: A bytearray holding the frame contents
+            start: Where the frame contents start in frame
+            end: Where the frame contents end in frame
+            packet_lengths: Packet id -> number of data bytes, e.g. Create2.packet_lengths
+        Returns:
+            A list of (packet id, offset of its data in frame), or None if the contents don't add up
+    """
+    packets = []
+    i = start
+    while i < end:
+        packet_id = frame[i]
+        packet_size = packet_lengths[packet_id]
+        if packet_size is None:
+            # Can't tell where the next packet starts, throw the frame away
+            return None
+        packets.append((packet_id, i + 1))
+        i += 1 + packet_size
+    if i != end:
+        return None
+    return packets
 
-    def decode_packet_12(self, data):
-        """ Decode Packet 12 (cliff right) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: True or False
-        """
-        return self.decode_bool(data)
 
-    def decode_packet_13(self, data):
-        """ Decode Packet 13 (virtual wall) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: True or False
-        """
-        return self.decode_bool(data)
-        
-    def decode_packet_14(self, data):
-        """ Decode Packet 14 (wheel overcurrents) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: A dict of 'wheel overcurrents'
-        """
-        byte = struct.unpack('B', data)[0]
-        return_dict = {
-            'left wheel': bool(byte & 0x10),
-            'right wheel': bool(byte & 0x08),
-            'main brush': bool(byte & 0x04),
-            'side brush': bool(byte & 0x01)}
-        return return_dict
-        
-    def decode_packet_15(self, data):
-        """ Decode Packet 15 (dirt detect) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: unsigned Byte (0-255)
-        """
-        return self.decode_unsigned_byte(data)        
 
-    def decode_packet_16(self, data):
-        """ Decode Packet 16 (unused byte) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: None
-        """
-        return None  
+def load_sensor_schema():
+    """ Loads the sensor packet schema that configGenerator.py writes, from create2config if there
+        is one, otherwise from config.json.
+        
+        Returns: (packets, bitfields, groups)
+            packets: Single packet id (7-58) -> (sensor_state key, struct format). The key is None
+                for unused bytes, which have an 'x' format.
+            bitfields: Flag byte key -> ((flag, bit), ...)
+            groups: Group packet id -> the single packet ids it contains, in order
+    """
+    if create2config is not None:
+        return create2config.SENSOR_PACKETS, create2config.SENSOR_BITFIELDS, create2config.SENSOR_GROUP_PACKETS
+    config = Config()
+    with open(config.fname) as fileData:
+        data = json.load(fileData)
+    # json has string keys and lists where configGenerator has ints and tuples
+    packets = dict((int(packet_id), tuple(packet)) for packet_id, packet in data['sensor packets'].items())
+    bitfields = dict((name, tuple(tuple(flag) for flag in flags)) for name, flags in data['sensor bitfields'].items())
+    groups = dict((int(packet_id), tuple(contents)) for packet_id, contents in data['sensor groups'].items())
+    return packets, bitfields, groups
 
-    def decode_packet_17(self, data):
-        """ Decode Packet 17 (infared char omni) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: unsigned Byte (0-255)
-        """
-        return self.decode_unsigned_byte(data)
 
-    def decode_packet_18(self, data):
-        """ Decode Packet 18 (buttons) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: a dict of 'buttons'
-        """
-        byte = struct.unpack('B', data)[0]
-        return_dict = {
-            'clock': bool(byte & 0x80),
-            'schedule': bool(byte & 0x40),
-            'day': bool(byte & 0x20),
-            'hour': bool(byte & 0x10),
-            'minute': bool(byte & 0x08),
-            'dock': bool(byte & 0x04),
-            'spot': bool(byte & 0x02),
-            'clean': bool(byte & 0x01)}
-        
-        return return_dict
+# Sensor packet schema, see configGenerator.py. The decoders below are compiled from it.
+SENSOR_PACKETS, SENSOR_BITFIELDS, SENSOR_GROUP_PACKETS = load_sensor_schema()
 
-    def decode_packet_19(self, low, high):
-        """ Decode Packet 19 (distance) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: signed 16bit short
-        """
-        return self.decode_short(low, high)
 
-    def decode_packet_20(self, low, high):
-        """ Decode Packet 20 (angle) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: signed 16 bit short. Represents difference between distance two wheels travelled
-        """
-        return self.decode_short(low, high)
-        
-    def decode_packet_21(self, data):
-        """ Decode Packet 21 (charging state) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: A value from 0-5, that describes the charging state
-        """
-        return self.decode_unsigned_byte(data)
+class BitfieldView(dict):
+    """ A read only view of a flag byte, such as 'wheel drop and bumps'.
+    
+        It is the dict of flags this used to be (view['bump left']), and flags can also be read as
+        attributes (view.bump_left). The byte itself is view.raw. There is one view for every
+        possible value of each flag byte, made up front, so reading a flag byte never allocates.
+        Use copy() for a dict that can be changed.
+    """
+    __slots__ = ('raw',)
+    flags = ()  # (flag name, bit) pairs, set on the subclass made for each flag byte
+    bits = {}
+    
+    def __init__(self, raw):
+        dict.__init__(self, ((flag, bool(raw & bit)) for flag, bit in self.flags))
+        self.raw = raw
+    
+    def __int__(self):
+        return self.raw
+    
+    def read_only(self, *args, **kwargs):
+        raise TypeError('Sensor flags are read only, use copy() for a dict that can be changed')
+    
+    __setitem__ = __delitem__ = update = pop = popitem = clear = setdefault = read_only
+    
+    def __repr__(self):
+        return dict.__repr__(self)
+    
+    def __reduce__(self):
+        return (dict, (dict(self),))
 
-    def decode_packet_22(self, low, high):
-        """ Decode Packet 22 (voltage) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short, battery voltage in mV
-        """
-        return self.decode_unsigned_short(low, high)
 
-    def decode_packet_23(self, low, high):
-        """ Decode Packet 23 (current) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: signed 16bit short. Positive currents is charging, negative is discharging
-        """
-        return self.decode_short(low, high)
-        
-    def decode_packet_24(self, data):
-        """ Decode Packet 24 (temperature) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: A signed byte, Create 2's battery temperature in Celsius
-        """
-        return self.decode_byte(data)
-        
-    def decode_packet_25(self, low, high):
-        """ Decode Packet 25 (battery charge) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Current charge of battery in milliAmp-hours
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_26(self, low, high):
-        """ Decode Packet 26 (battery capacity) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Estimated charge capacity of battery in milliAmp-hours
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_27(self, low, high):
-        """ Decode Packet 27 (wall signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of wall signal from 0-1023
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_28(self, low, high):
-        """ Decode Packet 28 (cliff left signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of cliff left signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_29(self, low, high):
-        """ Decode Packet 29 (cliff front left signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of cliff front left signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_30(self, low, high):
-        """ Decode Packet 30 (cliff front right signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of cliff front right signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_31(self, low, high):
-        """ Decode Packet 31 (cliff right signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of cliff right signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_32(self, data):
-        """ Decode Packet 32 (Unused) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: None
-        """
-        return None
-        
-    def decode_packet_33(self, low, high):
-        """ Decode Packet 33 (Unused) and return its value
-        
-            Arguments:
-                low: The bytes to ignore
-                high: The bytes to ignore
-        
-            Returns: None
-        """
-        return None
-        
-    def decode_packet_34(self, data):
-        """ Decode Packet 34 (charging sources available) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: A dict of 'charging sources available'
-        """
-        byte = struct.unpack('B', data)[0]
-        return_dict = {
-            'home base': bool(byte & 0x02),
-            'internal charger': bool(byte & 0x01)}
-        
-        return return_dict
+def bitfield_views(name, flags):
+    """ Makes the BitfieldView subclass for a flag byte and returns its 256 views, indexed by byte value
+    """
+    # Each flag is also a plain slot, filled in once, so reading one is as cheap as an attribute gets
+    slots = tuple(str(flag.replace(' ', '_')) for flag, bit in flags)
+    attributes = {'__slots__': slots, 'flags': flags, 'bits': dict(flags)}
+    view_class = type(str(name.title().replace(' ', '') + 'View'), (BitfieldView,), attributes)
+    views = []
+    for byte in range(256):
+        view = view_class(byte)
+        for slot, (flag, bit) in zip(slots, flags):
+            object.__setattr__(view, slot, bool(byte & bit))
+        views.append(view)
+    return tuple(views)
 
-    def decode_packet_35(self, data):
-        """ Decode Packet 35 (OI Mode) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: A unsigned byte, the current OI mode id from 0-3
-        """
-        return self.decode_unsigned_byte(data)
-        
-    def decode_packet_36(self, data):
-        """ Decode Packet 36 (Song number) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: An unsigned byte, the current song id playing (0-15)
-        """
-        return self.decode_unsigned_byte(data)
-        
-    def decode_packet_37(self, data):
-        """ Decode Packet 35 (Song playing) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: True or False, stating whether the song is playing
-        """
-        return self.decode_bool(data)
-        
-    def decode_packet_38(self, data):
-        """ Decode Packet 38 (Number of stream packets) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: An unsigned byte, the number of data stream packets
-        """
-        return self.decode_unsigned_byte(data)
-        
-    def decode_packet_39(self, low, high):
-        """ Decode Packet 39 (requested velocity) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Velocity most recently requested by Drive()
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_40(self, low, high):
-        """ Decode Packet 40 (requested radius) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Radius most recently requested by Drive()
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_41(self, low, high):
-        """ Decode Packet 41 (Requested right velocity) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Right wheel velocity recently requested by DriveDirect()
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_42(self, low, high):
-        """ Decode Packet 42 (Requested left velocity) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Left wheel velocity recently requested by DriveDirect()
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_43(self, low, high):
-        """ Decode Packet 41 (Left Encoder Counts) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Cumulative number of raw left encoder counts. Rolls over
-                        to 0 after it passes 65535
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_44(self, low, high):
-        """ Decode Packet 44 (Right Encoder Counts) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Cumulative number of raw right encoder counts. Rolls over
-                        to 0 after it passes 65535
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_45(self, data):
-        """ Decode Packet 45 (infared char left) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: A dict of 'light bumper'
-        """
-        byte = struct.unpack('B', data)[0]
-        return_dict = {
-            'right': bool(byte & 0x20),
-            'front right': bool(byte & 0x10),
-            'center right': bool(byte & 0x08),
-            'center left': bool(byte & 0x04),
-            'front left': bool(byte & 0x02),
-            'left': bool(byte & 0x01)}
-        return return_dict
 
-    def decode_packet_46(self, low, high):
-        """ Decode Packet 46 (Light Bump Left Signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of light bump left signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_47(self, low, high):
-        """ Decode Packet 47 (Light Bump Front Left Signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of light bump front left signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_48(self, low, high):
-        """ Decode Packet 48 (Light Bump Center Left Signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of light bump center left signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_49(self, low, high):
-        """ Decode Packet 49 (Light Bump Center Right Signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of light bump center right signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_50(self, low, high):
-        """ Decode Packet 50 (Light Bump Front Right Signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
+class SensorState(object):
+    """ The Create 2's sensor readings, as last decoded.
+    
+        Readings are kept in a flat list indexed by packet id, so decoding a packet is a single
+        slice assignment. Each reading is an attribute named after its sensor_state key with
+        underscores for spaces (state.distance, state.light_bumper.center_left), and flag bytes
+        come back as BitfieldViews.
         
-            Returns: unsigned 16bit short. Strength of light bump front right signal from 0-4095
+        For older code it also works like the nested dict it replaces:
+        state['light bumper']['center left'], keys(), items(), update() and so on.
+    """
+    __slots__ = ('readings',)
+    
+    # sensor_state key -> packet id, in packet order
+    fields = {}
+    names = ()
+    # packet id -> the 256 BitfieldViews of that flag byte
+    bitfields = {}
+    # sensor_state key -> (packet id, BitfieldViews or None)
+    lookup = {}
+    
+    def __init__(self, initial=None):
         """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_51(self, low, high):
-        """ Decode Packet 51 (Light Bump Right Signal) and return its value
-        
             Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of light bump right signal from 0-4095
+                initial: A dict of readings to start from, e.g. the 'sensor data' dict of the config
         """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_52(self, data):
-        """ Decode Packet 52 (infared char left) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: unsigned Byte (0-255)
+        self.readings = list(SENSOR_DEFAULTS)
+        if initial is not None:
+            self.update(initial)
+    
+    def snapshot(self):
+        """ Returns a copy of the readings that later decoding won't change.
         """
-        return self.decode_unsigned_byte(data)          
+        state = SensorState.__new__(SensorState)
+        state.readings = self.readings[:]
+        return state
+    
+    copy = snapshot
+    
+    def __getitem__(self, name):
+        packet_id, views = self.lookup[name]
+        if views is None:
+            return self.readings[packet_id]
+        return views[self.readings[packet_id]]
+    
+    def __setitem__(self, name, value):
+        packet_id = self.fields[name]
+        if packet_id in self.bitfields and not isinstance(value, int):
+            # A dict of flags, or a BitfieldView
+            bits = self.bitfields[packet_id][0].bits
+            value = sum(bits[flag] for flag in value if value[flag])
+        self.readings[packet_id] = value
+    
+    def get(self, name, default=None):
+        if name in self.fields:
+            return self[name]
+        return default
+    
+    def update(self, readings):
+        for name in readings:
+            self[name] = readings[name]
+    
+    def __contains__(self, name):
+        return name in self.fields
+    
+    def __iter__(self):
+        return iter(self.names)
+    
+    def __len__(self):
+        return len(self.names)
+    
+    def keys(self):
+        return list(self.names)
+    
+    def values(self):
+        return [self[name] for name in self.names]
+    
+    def items(self):
+        return [(name, self[name]) for name in self.names]
+    
+    def to_dict(self):
+        """ Returns the readings as plain nested dicts, e.g. for json.dumps()
+        """
+        state = {}
+        for name in self.names:
+            value = self[name]
+            if isinstance(value, BitfieldView):
+                value = dict(value)
+            state[name] = value
+        return state
+    
+    def __repr__(self):
+        return 'SensorState(%r)' % self.to_dict()
 
-    def decode_packet_53(self, data):
-        """ Decode Packet 53 (infared char right) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: unsigned Byte (0-255)
-        """
-        return self.decode_unsigned_byte(data)  
 
-    def decode_packet_54(self, low, high):
-        """ Decode Packet 54 (Left Motor Current) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: signed 16bit short. Strength of left motor current from -32768 - 32767 mA
-        """
-        return self.decode_short(low, high)
-        
+def sensor_attribute(packet_id):
+    views = SensorState.bitfields.get(packet_id)
+    if views is None:
+        def get(self):
+            return self.readings[packet_id]
+    else:
+        def get(self):
+            return views[self.readings[packet_id]]
+    def set(self, value):
+        self.readings[packet_id] = value
+    return property(get, set)
 
-    def decode_packet_55(self, low, high):
-        """ Decode Packet 55 (Right Motor Current) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: signed 16bit short. Strength of right motor current from -32768 - 32767 mA
-        """
-        return self.decode_short(low, high)
-        
+# Fill in SensorState's tables and attributes from the packet schema
+SENSOR_DEFAULTS = [0] * (max(SENSOR_PACKETS) + 1)
+for _packet_id, (_name, _code) in sorted(SENSOR_PACKETS.items()):
+    if _code == '?':
+        SENSOR_DEFAULTS[_packet_id] = False
+    if _name is None:
+        continue
+    SensorState.fields[_name] = _packet_id
+    SensorState.names += (_name,)
+    if _name in SENSOR_BITFIELDS:
+        SensorState.bitfields[_packet_id] = bitfield_views(_name, SENSOR_BITFIELDS[_name])
+for _packet_id, (_name, _code) in SENSOR_PACKETS.items():
+    if _name is not None:
+        SensorState.lookup[_name] = (_packet_id, SensorState.bitfields.get(_packet_id))
+        setattr(SensorState, _name.replace(' ', '_'), sensor_attribute(_packet_id))
+SENSOR_DEFAULTS = tuple(SENSOR_DEFAULTS)
+# Field name of each packet id, None if the id isn't a single packet with a name
+SENSOR_NAMES = tuple(SENSOR_PACKETS[i][0] if i in SENSOR_PACKETS else None for i in range(len(SENSOR_DEFAULTS)))
 
-    def decode_packet_56(self, low, high):
-        """ Decode Packet 54 (Main Brush Motor Current) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: signed 16bit short. Strength of main brush motor current from -32768 - 32767 mA
-        """
-        return self.decode_short(low, high)
-        
 
-    def decode_packet_57(self, low, high):
-        """ Decode Packet 57 (Side Brush Motor Current) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: signed 16bit short. Strength of side brush motor current from -32768 - 32767 mA
-        """
-        return self.decode_short(low, high)
-        
-    def decode_packet_58(self, data):
-        """ Decode Packet 58 (Stasis) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: True if robot is making forward progress, else False
+class SensorEvents(object):
+    """ Tells subscribers which sensor readings have changed.
+    
+        Create2 publishes its sensor_state after every get_packet(), query_list() and stream frame.
+        The readings are compared with the ones published last time, and each subscriber with a
+        changed field is called with a dict of just the changed fields it asked for, e.g.
+        {'battery charge': 2301}. Bitfields are given as their BitfieldView. Nothing is compared
+        while there are no subscribers.
+        
+        Callbacks run on the thread that decoded the packet: the one that called get_packet(), the
+        timelimit() worker or the stream reader. Tk widgets must only be used from the Tk thread, so
+        a GUI should gather changes with a ChangedFields and apply them in its own loop.
+    """
+    
+    def __init__(self):
+        self.subscribers = [] # (callback, packet ids or None for every field). Replaced, never changed.
+        self.previous = list(SENSOR_DEFAULTS)
+        self.lock = threading.Lock()
+    
+    def subscribe(self, callback, fields=None):
+        """ Calls callback(changes) whenever any of the fields change.
+        
+            Arguments:
+                callback: Called with a dict of field name -> new value
+                fields: A field name, e.g. 'light bumper', or a list of them. None for every field.
+            Returns: A handle for unsubscribe()
+        """
+        packet_ids = None
+        if fields is not None:
+            if not isinstance(fields, (list, tuple, set, frozenset)):
+                fields = [fields]
+            for name in fields:
+                if name not in SensorState.fields:
+                    raise ROIDataByteError("Unknown sensor field '" + str(name) + "'")
+            packet_ids = frozenset(SensorState.fields[name] for name in fields)
+        subscriber = (callback, packet_ids)
+        with self.lock:
+            self.subscribers = self.subscribers + [subscriber]
+        return subscriber
+    
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers = [s for s in self.subscribers if s is not subscriber]
+    
+    def publish(self, state):
+        """ Calls the subscribers of every field that is different from the last publish
+        """
+        subscribers = self.subscribers
+        if not subscribers:
+            return
+        readings = state.readings
+        with self.lock:
+            previous = self.previous
+            if readings == previous:
+                return
+            changed = [i for i, (new, old) in enumerate(zip(readings, previous)) if new != old]
+            self.previous = list(readings)
+        bitfields = SensorState.bitfields
+        for callback, packet_ids in subscribers:
+            wanted = changed if packet_ids is None else [i for i in changed if i in packet_ids]
+            if wanted:
+                changes = {}
+                for i in wanted:
+                    views = bitfields.get(i)
+                    changes[SENSOR_NAMES[i]] = readings[i] if views is None else views[readings[i]]
+                callback(changes)
+
+
+class ChangedFields(object):
+    """ Collects the names of the fields that have changed, for a loop to pick up when it's ready
+        instead of being called back from another thread.
+        
+            battery = create2api.ChangedFields(bot.sensor_events, ['battery charge', 'voltage'])
+            ...
+            if battery.take():
+                # update the battery widgets
+    """
+    
+    def __init__(self, events, fields=None):
+        self.events = events
+        # Everything counts as changed to start with, so the first take() fills the widgets in
+        if fields is None:
+            self.changed = set(SensorState.names)
+        elif isinstance(fields, (list, tuple, set, frozenset)):
+            self.changed = set(fields)
+        else:
+            self.changed = set([fields])
+        self.lock = threading.Lock()
+        self.subscriber = events.subscribe(self.add, fields)
+    
+    def add(self, changes):
+        with self.lock:
+            self.changed.update(changes)
+    
+    def take(self):
+        """ Returns the set of field names that have changed since the last take()
         """
-        return self.decode_bool(data)  
+        with self.lock:
+            changed, self.changed = self.changed, set()
+        return changed
+    
+    def close(self):
+        self.events.unsubscribe(self.subscriber)
+
 
+class sensorPacketDecoder(object):
+    """ A class that handles sensor packet decoding. 
         
-    def decode_bool(self, byte):
-        """ Decode a byte and return the value
+        Every packet is compiled from SENSOR_PACKETS into a single struct.Struct, so decoding a
+        packet (even group packet 100) is one unpack_from() call.
+        
+        This class may, in the future, become a private class. Users shouldn't be interacting with
+        this class directly -- scripts should use Create2.get_packet() instead.
+    
+    """
+    
+    def __init__(self, sensor_packet_lengths):
+        self.lengths = sensor_packet_lengths
+        self.packets = {}
+        for packet_id in SENSOR_PACKETS:
+            self.packets[packet_id] = self.compile_packet([packet_id])
+        for packet_id, contents in SENSOR_GROUP_PACKETS.items():
+            self.packets[packet_id] = self.compile_packet(contents)
+        # Every possible value of each flag byte, decoded ahead of time
+        self.bitfields = {}
+        for name, flags in SENSOR_BITFIELDS.items():
+            self.bitfields[name] = tuple(dict((flag, bool(byte & bit)) for flag, bit in flags) for byte in range(256))
+    
+    def compile_packet(self, contents):
+        """ Builds the decoder for a packet
         
             Arguments:
-                byte: The byte to be decoded
-            Returns: True or False
+                contents: A list of the single packet ids that make up the packet, in the order
+                    they are sent
+            Returns:
+                A tuple of (struct.Struct, first packet id, last packet id + 1) for decoding into a
+                SensorState, then (struct.Struct, tuple of sensor_state keys, tuple of flag byte keys)
+                for decoding into a dict
+        """
+        fmt = '>'
+        state_fmt = '>'
+        names = []
+        bitfields = []
+        for packet_id in contents:
+            name, code = SENSOR_PACKETS[packet_id]
+            fmt += code
+            # A SensorState has room for unused bytes too, so its struct doesn't skip them
+            state_fmt += {'x': 'B', '2x': 'H'}.get(code, code)
+            if name is not None:
+                names.append(name)
+                if name in SENSOR_BITFIELDS:
+                    bitfields.append(name)
+        if list(contents) != list(range(contents[0], contents[-1] + 1)):
+            raise ValueError('Packet contents must be consecutive packet ids')
+        return (struct.Struct(state_fmt), contents[0], contents[-1] + 1,
+                struct.Struct(fmt), tuple(names), tuple(bitfields))
+    
+    def packet_size(self, packet_id):
+        """ Returns the number of data bytes in a packet
         """
-        return bool(struct.unpack('B', byte)[0])
+        return self.packets[int(packet_id)][0].size
     
-
-    def decode_unsigned_short(self, low, high):
-        """ Decode an 16 bit unsigned short from two bytes. 
-        
+    def decode_packet(self, packet_id, byte_data, sensor_data, offset=0):
+        """ Decodes an OI packet
+            
             Arguments:
-                low: The low byte of the 2's complement. This is specified first
-                    to make it easier when popping bytes off a list.
-                high: The high byte o the 2's complement.
-            Returns: 16bit unsigned short
+                packet_id: The id of the packet. Duh.
+                byte_data: The bytes that the Create 2 sent over serial
+                sensor_data: A SensorState (or a dict) containing the sensor states of the Create 2
+                offset: Where the packet starts in byte_data
+            Returns:
+                sensor_data, updated with the new sensor states of the Create 2
         """
-        return struct.unpack('>H', high + low)[0]
+        id = int(packet_id)  # Convert the packet id from a string to an int
         
-    def decode_short(self, low, high):
-        """ Decode an 16 bit short from two bytes. 
+        if id not in self.packets:
+            warnings.formatwarning = custom_format_warning
+            warnings.warn("Warning: Packet '" + str(id) + "' is not a valid packet!")
+            return sensor_data
         
-            Arguments:
-                low: The low byte of the 2's complement. This is specified first
-                    to make it easier when popping bytes off a list.
-                high: The high byte of the 2's complement.
-            Returns: 16bit short
-        """
-        return struct.unpack('>h', high + low)[0]
+        if isinstance(byte_data, list):
+            # A list of single bytes
+            byte_data = b''.join(byte_data)
         
-    def decode_byte(self, byte):
-        """ Decode a signed byte into a signed char 
+        state_packet, start, stop, packet, names, bitfields = self.packets[id]
+        if isinstance(sensor_data, SensorState):
+            sensor_data.readings[start:stop] = state_packet.unpack_from(byte_data, offset)
+            return sensor_data
         
-            Arguments:
-                byte: The byte to be decoded
-            Returns: A signed int
-        """
-        return struct.unpack('b', byte)[0]
-    
-    def decode_unsigned_byte(self, byte):
-        """ Decode an unsigned byte into an unsigned char 
+        sensor_data.update(zip(names, packet.unpack_from(byte_data, offset)))
+        for name in bitfields:
+            sensor_data[name] = dict(self.bitfields[name][sensor_data[name]])
         
-            Arguments:
-                byte: The byte to be decoded
-            Returns: An unsigned int
-        """
-        return struct.unpack('B', byte)[0]
-    
+        return sensor_data
 
 
@@ -0,0 +1,188 @@
+"""
+Benchmarks for create2api: packet decoding, command encoding and get_packet round trips.
+
+    python create2bench.py                      # against a create2sim.Create2Simulator
+    python create2bench.py --port /dev/ttyUSB0  # against a real robot
+    python create2bench.py --output new.json --compare old.json
+
+The results are written as JSON (create2bench.json by default) with the python version and
+platform, so runs on different Pis or before and after a change can be compared. --compare
+prints how each number has changed from an earlier run.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+import create2api
+
+timer = getattr(time, 'perf_counter', time.time)
+
+# Packets that are decoded a lot, also timed decoding into a plain dict
+DICT_PACKETS = (6, 100)
+# Packets timed over get_packet round trips
+LATENCY_PACKETS = (7, 19, 6, 100)
+
+
+def rate(func, args=(), seconds=.5, batch=1000):
+    """ Calls func(*args) over and over for about 'seconds' seconds.
+
+        Returns: Calls per second
+    """
+    calls = 0
+    start = timer()
+    elapsed = 0
+    while elapsed < seconds:
+        for i in range(batch):
+            func(*args)
+        calls += batch
+        elapsed = timer() - start
+    return calls / elapsed
+
+
+def packet_data(size):
+    """ Some repeatable, non-zero packet bytes
+    """
+    return bytes(bytearray((i * 37 + 11) & 0xff for i in range(size)))
+
+
+def bench_decode(seconds):
+    """ Decodes every packet id through sensorPacketDecoder into a SensorState
+    """
+    config = create2api.Config()
+    config.load()
+    decoder = create2api.sensorPacketDecoder(dict(config.data['sensor group packet lengths']))
+    state = create2api.SensorState(config.data['sensor data'])
+    results = {}
+    for packet_id in sorted(decoder.packets):
+        size = decoder.packet_size(packet_id)
+        data = packet_data(size)
+        decodes = rate(decoder.decode_packet, (packet_id, data, state), seconds)
+        result = {'bytes': size, 'decodes per second': decodes, 'MB per second': decodes * size / 1e6}
+        if packet_id in DICT_PACKETS:
+            result['dict decodes per second'] = rate(decoder.decode_packet, (packet_id, data, dict(config.data['sensor data'])), seconds)
+        results[str(packet_id)] = result
+    return results
+
+
+def bench_encode(seconds):
+    """ Times the Create2 command methods, writing to a loop:// port that is emptied between
+        batches, and the CommandEncoder methods on their own
+    """
+    bot = create2api.Create2('loop://')
+    ser = bot.SCI.ser
+    def drain(func):
+        def call(*args):
+            func(*args)
+            if ser.in_waiting > 1024:   # loop:// has a 4k buffer and blocks when it is full
+                ser.reset_input_buffer()
+        return call
+    results = {
+        'drive': rate(drain(bot.drive), (200, 500), seconds),
+        'drive_direct': rate(drain(bot.drive_direct), (200, 150), seconds),
+        'digit_led_ascii': rate(drain(bot.digit_led_ascii), ('IDLE',), seconds),
+        'play_song': rate(drain(bot.play_song), (0, 'G5,16,G3,16,A#4,30'), seconds),
+        'motors_pwm': rate(drain(bot.motors_pwm), (50, -50, 50), seconds),
+        'encoder.drive': rate(bot.encoder.drive, (200, 500), seconds),
+        'encoder.motors_pwm': rate(bot.encoder.motors_pwm, (50, -50, 50), seconds),
+        }
+    bot.SCI.Close()
+    return dict((name, {'calls per second': calls}) for name, calls in results.items())
+
+
+def bench_latency(port, count):
+    """ Times get_packet round trips. Starts a simulator if no port is given.
+    """
+    sim = None
+    if port is None:
+        import create2sim
+        sim = create2sim.Create2Simulator()
+        port = sim.start()
+    bot = create2api.Create2(port)
+    try:
+        bot.start()
+        time.sleep(bot.sleep_timer)
+        results = {'port': 'simulator' if sim else port}
+        for packet_id in LATENCY_PACKETS:
+            bot.get_packet(packet_id)
+            times = []
+            for i in range(count):
+                start = timer()
+                bot.get_packet(packet_id)
+                times.append((timer() - start) * 1000)
+            times.sort()
+            results[str(packet_id)] = {
+                'min ms': times[0], 'median ms': times[len(times) // 2],
+                'mean ms': sum(times) / len(times), '95th percentile ms': times[int(len(times) * .95)],
+                'max ms': times[-1]
+                }
+    finally:
+        bot.destroy()
+        if sim:
+            sim.stop()
+    return results
+
+
+def flatten(results, prefix=''):
+    """ {'a': {'b': 1}} -> {'a/b': 1}, for comparing runs
+    """
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix + key + '/'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(old, new):
+    """ Prints each number in new next to the same number in old
+    """
+    old = flatten(old)
+    new = flatten(new)
+    for key in sorted(new):
+        if key in old and old[key]:
+            print('%-55s %14.3f %14.3f %+8.1f%%' % (key, old[key], new[key], (new[key] - old[key]) * 100.0 / old[key]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark create2api')
+    parser.add_argument('--port', help='Serial port for the get_packet round trips. Default: a create2sim simulator')
+    parser.add_argument('--seconds', type=float, default=.5, help='Seconds to time each decode/encode for')
+    parser.add_argument('--count', type=int, default=200, help='get_packet round trips per packet')
+    parser.add_argument('--output', default='create2bench.json', help='Where to write the results')
+    parser.add_argument('--compare', help='An earlier results file to compare against')
+    parser.add_argument('--skip-latency', action='store_true', help="Don't time get_packet")
+    args = parser.parse_args()
+
+    results = {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'decode': bench_decode(args.seconds),
+        'encode': bench_encode(args.seconds),
+        }
+    if not args.skip_latency:
+        results['get_packet'] = bench_latency(args.port, args.count)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print('Results written to ' + args.output)
+    for packet_id in DICT_PACKETS:
+        print('Packet %d: %.0f decodes per second' % (packet_id, results['decode'][str(packet_id)]['decodes per second']))
+    for name in ('drive', 'digit_led_ascii', 'play_song', 'motors_pwm'):
+        print('%s: %.0f calls per second' % (name, results['encode'][name]['calls per second']))
+    if 'get_packet' in results:
+        for packet_id in LATENCY_PACKETS:
+            print('get_packet(%d): %.2f ms median' % (packet_id, results['get_packet'][str(packet_id)]['median ms']))
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
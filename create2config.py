@@ -0,0 +1,1677 @@
+"""
+Generated by configGenerator.py from the same dicts as config.json. Don't edit by hand.
+
+"""
+
+CONFIG = {'ascii table': {' ': 32,
+                 '!': 33,
+                 '"': 34,
+                 '#': 35,
+                 '%': 37,
+                 '&': 38,
+                 "'": 39,
+                 ',': 44,
+                 '-': 45,
+                 '.': 46,
+                 '/': 47,
+                 '0': 48,
+                 '1': 49,
+                 '2': 50,
+                 '3': 51,
+                 '4': 52,
+                 '5': 53,
+                 '6': 54,
+                 '7': 55,
+                 '8': 56,
+                 '9': 57,
+                 ':': 58,
+                 ';': 59,
+                 '<': 60,
+                 '=': 61,
+                 '>': 62,
+                 '?': 63,
+                 'A': 65,
+                 'B': 66,
+                 'C': 67,
+                 'D': 68,
+                 'E': 69,
+                 'F': 70,
+                 'G': 71,
+                 'H': 72,
+                 'I': 73,
+                 'J': 74,
+                 'K': 75,
+                 'L': 76,
+                 'M': 77,
+                 'N': 78,
+                 'O': 79,
+                 'P': 80,
+                 'Q': 81,
+                 'R': 82,
+                 'S': 83,
+                 'T': 84,
+                 'U': 85,
+                 'V': 86,
+                 'W': 87,
+                 'X': 88,
+                 'Y': 89,
+                 'Z': 90,
+                 '[': 40,
+                 '\\': 92,
+                 ']': 41,
+                 '^': 94,
+                 '_': 95,
+                 '`': 96,
+                 '{': 123,
+                 '|': 124,
+                 '}': 125,
+                 '~': 126},
+ 'charging states': ['not-charging',
+                     'charging-recovery',
+                     'charging',
+                     'trickle-charging',
+                     'waiting',
+                     'charging-error'],
+ 'midi table': {'A#1': 34,
+                'A#2': 46,
+                'A#3': 58,
+                'A#4': 70,
+                'A#5': 82,
+                'A#6': 94,
+                'A#7': 106,
+                'A#8': 118,
+                'A1': 33,
+                'A2': 45,
+                'A3': 57,
+                'A4': 69,
+                'A5': 81,
+                'A6': 93,
+                'A7': 105,
+                'A8': 117,
+                'B1': 35,
+                'B2': 47,
+                'B3': 59,
+                'B4': 71,
+                'B5': 83,
+                'B6': 95,
+                'B7': 107,
+                'B8': 119,
+                'C#2': 37,
+                'C#3': 49,
+                'C#4': 61,
+                'C#5': 73,
+                'C#6': 85,
+                'C#7': 97,
+                'C#8': 109,
+                'C#9': 121,
+                'C2': 36,
+                'C3': 48,
+                'C4': 60,
+                'C5': 72,
+                'C6': 84,
+                'C7': 96,
+                'C8': 108,
+                'C9': 120,
+                'D#2': 39,
+                'D#3': 51,
+                'D#4': 63,
+                'D#5': 75,
+                'D#6': 87,
+                'D#7': 99,
+                'D#8': 111,
+                'D#9': 123,
+                'D2': 38,
+                'D3': 50,
+                'D4': 62,
+                'D5': 74,
+                'D6': 86,
+                'D7': 98,
+                'D8': 110,
+                'D9': 122,
+                'E2': 40,
+                'E3': 52,
+                'E4': 64,
+                'E5': 76,
+                'E6': 88,
+                'E7': 100,
+                'E8': 112,
+                'E9': 124,
+                'F#2': 42,
+                'F#3': 54,
+                'F#4': 66,
+                'F#5': 78,
+                'F#6': 90,
+                'F#7': 102,
+                'F#8': 114,
+                'F#9': 126,
+                'F2': 41,
+                'F3': 53,
+                'F4': 65,
+                'F5': 77,
+                'F6': 89,
+                'F7': 101,
+                'F8': 113,
+                'F9': 125,
+                'G#1': 32,
+                'G#2': 44,
+                'G#3': 56,
+                'G#4': 68,
+                'G#5': 80,
+                'G#6': 92,
+                'G#7': 104,
+                'G#8': 116,
+                'G1': 31,
+                'G2': 43,
+                'G3': 55,
+                'G4': 67,
+                'G5': 79,
+                'G6': 91,
+                'G7': 103,
+                'G8': 115,
+                'G9': 127,
+                'R': 0,
+                'pause': 0,
+                'rest': 0},
+ 'oi modes': ['off', 'passive', 'safe', 'full'],
+ 'opcodes': {'baud': 129,
+             'buttons': 165,
+             'clean': 135,
+             'digit_led_ascii': 164,
+             'digit_led_raw': 163,
+             'drive': 137,
+             'drive_direct': 145,
+             'drive_pwm': 146,
+             'full': 132,
+             'led': 139,
+             'max': 136,
+             'motors': 138,
+             'motors_pwm': 144,
+             'pause_resume_stream': 150,
+             'play': 141,
+             'power': 133,
+             'query_list': 149,
+             'reset': 7,
+             'safe': 131,
+             'schedule': 167,
+             'scheduling_led': 162,
+             'seek_dock': 143,
+             'sensors': 142,
+             'set_day_time': 168,
+             'song': 140,
+             'spot': 134,
+             'start': 128,
+             'stop': 173,
+             'stream': 148},
+ 'remote opcodes': {'0': 'none',
+                    '129': 'left',
+                    '130': 'forward',
+                    '131': 'right',
+                    '132': 'spot',
+                    '133': 'max',
+                    '134': 'small',
+                    '135': 'medium',
+                    '136': 'clean',
+                    '137': 'pause',
+                    '138': 'power',
+                    '139': 'arc-left',
+                    '140': 'arc-right',
+                    '141': 'drive-stop',
+                    '142': 'send-all',
+                    '143': 'seek-dock',
+                    '160': 'reserved',
+                    '161': 'force-field',
+                    '162': 'virtual-wall',
+                    '164': 'green-buoy',
+                    '165': 'green-buoy-and-force-field',
+                    '168': 'red-buoy',
+                    '169': 'red-buoy-and-force-field',
+                    '172': 'red-buoy-and-green-buoy',
+                    '173': 'red-buoy-and-green-buoy-and-force-field',
+                    '240': 'reserved',
+                    '242': 'force-field',
+                    '244': 'green-buoy',
+                    '246': 'green-buoy-and-force-field',
+                    '248': 'red-buoy',
+                    '250': 'red-buoy-and-force-field',
+                    '252': 'red-buoy-and-green-buoy',
+                    '254': 'red-buoy-and-green-buoy-and-force-field',
+                    '255': 'none'},
+ 'sensor bitfields': {'buttons': [['clock', 128],
+                                  ['schedule', 64],
+                                  ['day', 32],
+                                  ['hour', 16],
+                                  ['minute', 8],
+                                  ['dock', 4],
+                                  ['spot', 2],
+                                  ['clean', 1]],
+                      'charging sources available': [['home base', 2],
+                                                     ['internal charger', 1]],
+                      'light bumper': [['right', 32],
+                                       ['front right', 16],
+                                       ['center right', 8],
+                                       ['center left', 4],
+                                       ['front left', 2],
+                                       ['left', 1]],
+                      'wheel drop and bumps': [['drop left', 8],
+                                               ['drop right', 4],
+                                               ['bump left', 2],
+                                               ['bump right', 1]],
+                      'wheel overcurrents': [['left wheel', 16],
+                                             ['right wheel', 8],
+                                             ['main brush', 4],
+                                             ['side brush', 1]]},
+ 'sensor data': {'angle': 0,
+                 'battery capacity': 0,
+                 'battery charge': 0,
+                 'buttons': {'clean': False,
+                             'clock': False,
+                             'day': False,
+                             'dock': False,
+                             'hour': False,
+                             'minute': False,
+                             'schedule': False,
+                             'spot': False},
+                 'charging sources available': {'home base': False,
+                                                'internal charger': False},
+                 'charging state': 0,
+                 'cliff front left': False,
+                 'cliff front left signal': 0,
+                 'cliff front right': False,
+                 'cliff front right signal': 0,
+                 'cliff left': False,
+                 'cliff left signal': 0,
+                 'cliff right': False,
+                 'cliff right signal': 0,
+                 'current': 0,
+                 'dirt detect': 0,
+                 'distance': 0,
+                 'infared char left': 0,
+                 'infared char omni': 0,
+                 'infared char right': 0,
+                 'left encoder counts': 0,
+                 'left motor current': 0,
+                 'light bump center left signal': 0,
+                 'light bump center right signal': 0,
+                 'light bump front left signal': 0,
+                 'light bump front right signal': 0,
+                 'light bump left signal': 0,
+                 'light bump right signal': 0,
+                 'light bumper': {'center left': False,
+                                  'center right': False,
+                                  'front left': False,
+                                  'front right': False,
+                                  'left': False,
+                                  'right': False},
+                 'main brush motor current': 0,
+                 'number of stream packets': 0,
+                 'oi mode': 0,
+                 'requested left velocity': 0,
+                 'requested radius': 0,
+                 'requested right velocity': 0,
+                 'requested velocity': 0,
+                 'right encoder counts': 0,
+                 'right motor current': 0,
+                 'side brush motor current': 0,
+                 'song number': 0,
+                 'song playing': False,
+                 'stasis': False,
+                 'temperature': 0,
+                 'virtual wall': False,
+                 'voltage': 0,
+                 'wall seen': False,
+                 'wall signal': 0,
+                 'wheel drop and bumps': {'bump left': False,
+                                          'bump right': False,
+                                          'drop left': False,
+                                          'drop right': False},
+                 'wheel overcurrents': {'left wheel': False,
+                                        'main brush': False,
+                                        'right wheel': False,
+                                        'side brush': False}},
+ 'sensor group packet lengths': {'0': 26,
+                                 '1': 10,
+                                 '10': 1,
+                                 '100': 80,
+                                 '101': 28,
+                                 '106': 12,
+                                 '107': 9,
+                                 '11': 1,
+                                 '12': 1,
+                                 '13': 1,
+                                 '14': 1,
+                                 '15': 1,
+                                 '16': 1,
+                                 '17': 1,
+                                 '18': 1,
+                                 '19': 2,
+                                 '2': 6,
+                                 '20': 2,
+                                 '21': 1,
+                                 '22': 2,
+                                 '23': 2,
+                                 '24': 1,
+                                 '25': 2,
+                                 '26': 2,
+                                 '27': 2,
+                                 '28': 2,
+                                 '29': 2,
+                                 '3': 10,
+                                 '30': 2,
+                                 '31': 2,
+                                 '32': 1,
+                                 '33': 2,
+                                 '34': 1,
+                                 '35': 1,
+                                 '36': 1,
+                                 '37': 1,
+                                 '38': 1,
+                                 '39': 2,
+                                 '4': 14,
+                                 '40': 2,
+                                 '41': 2,
+                                 '42': 2,
+                                 '43': 2,
+                                 '44': 2,
+                                 '45': 1,
+                                 '46': 2,
+                                 '47': 2,
+                                 '48': 2,
+                                 '49': 2,
+                                 '5': 12,
+                                 '50': 2,
+                                 '51': 2,
+                                 '52': 1,
+                                 '53': 1,
+                                 '54': 2,
+                                 '55': 2,
+                                 '56': 2,
+                                 '57': 2,
+                                 '58': 1,
+                                 '6': 52,
+                                 '7': 1,
+                                 '8': 1,
+                                 '9': 1},
+ 'sensor groups': {'0': [7,
+                         8,
+                         9,
+                         10,
+                         11,
+                         12,
+                         13,
+                         14,
+                         15,
+                         16,
+                         17,
+                         18,
+                         19,
+                         20,
+                         21,
+                         22,
+                         23,
+                         24,
+                         25,
+                         26],
+                   '1': [7, 8, 9, 10, 11, 12, 13, 14, 15, 16],
+                   '100': [7,
+                           8,
+                           9,
+                           10,
+                           11,
+                           12,
+                           13,
+                           14,
+                           15,
+                           16,
+                           17,
+                           18,
+                           19,
+                           20,
+                           21,
+                           22,
+                           23,
+                           24,
+                           25,
+                           26,
+                           27,
+                           28,
+                           29,
+                           30,
+                           31,
+                           32,
+                           33,
+                           34,
+                           35,
+                           36,
+                           37,
+                           38,
+                           39,
+                           40,
+                           41,
+                           42,
+                           43,
+                           44,
+                           45,
+                           46,
+                           47,
+                           48,
+                           49,
+                           50,
+                           51,
+                           52,
+                           53,
+                           54,
+                           55,
+                           56,
+                           57,
+                           58],
+                   '101': [43,
+                           44,
+                           45,
+                           46,
+                           47,
+                           48,
+                           49,
+                           50,
+                           51,
+                           52,
+                           53,
+                           54,
+                           55,
+                           56,
+                           57,
+                           58],
+                   '106': [46, 47, 48, 49, 50, 51],
+                   '107': [54, 55, 56, 57, 58],
+                   '2': [17, 18, 19, 20],
+                   '3': [21, 22, 23, 24, 25, 26],
+                   '4': [27, 28, 29, 30, 31, 32, 33, 34],
+                   '5': [35, 36, 37, 38, 39, 40, 41, 42],
+                   '6': [7,
+                         8,
+                         9,
+                         10,
+                         11,
+                         12,
+                         13,
+                         14,
+                         15,
+                         16,
+                         17,
+                         18,
+                         19,
+                         20,
+                         21,
+                         22,
+                         23,
+                         24,
+                         25,
+                         26,
+                         27,
+                         28,
+                         29,
+                         30,
+                         31,
+                         32,
+                         33,
+                         34,
+                         35,
+                         36,
+                         37,
+                         38,
+                         39,
+                         40,
+                         41,
+                         42]},
+ 'sensor packets': {'10': ['cliff front left', '?'],
+                    '11': ['cliff front right', '?'],
+                    '12': ['cliff right', '?'],
+                    '13': ['virtual wall', '?'],
+                    '14': ['wheel overcurrents', 'B'],
+                    '15': ['dirt detect', 'B'],
+                    '16': [None, 'x'],
+                    '17': ['infared char omni', 'B'],
+                    '18': ['buttons', 'B'],
+                    '19': ['distance', 'h'],
+                    '20': ['angle', 'h'],
+                    '21': ['charging state', 'B'],
+                    '22': ['voltage', 'H'],
+                    '23': ['current', 'h'],
+                    '24': ['temperature', 'b'],
+                    '25': ['battery charge', 'H'],
+                    '26': ['battery capacity', 'H'],
+                    '27': ['wall signal', 'H'],
+                    '28': ['cliff left signal', 'H'],
+                    '29': ['cliff front left signal', 'H'],
+                    '30': ['cliff front right signal', 'H'],
+                    '31': ['cliff right signal', 'H'],
+                    '32': [None, 'x'],
+                    '33': [None, '2x'],
+                    '34': ['charging sources available', 'B'],
+                    '35': ['oi mode', 'B'],
+                    '36': ['song number', 'B'],
+                    '37': ['song playing', '?'],
+                    '38': ['number of stream packets', 'B'],
+                    '39': ['requested velocity', 'H'],
+                    '40': ['requested radius', 'H'],
+                    '41': ['requested right velocity', 'H'],
+                    '42': ['requested left velocity', 'H'],
+                    '43': ['left encoder counts', 'H'],
+                    '44': ['right encoder counts', 'H'],
+                    '45': ['light bumper', 'B'],
+                    '46': ['light bump left signal', 'H'],
+                    '47': ['light bump front left signal', 'H'],
+                    '48': ['light bump center left signal', 'H'],
+                    '49': ['light bump center right signal', 'H'],
+                    '50': ['light bump front right signal', 'H'],
+                    '51': ['light bump right signal', 'H'],
+                    '52': ['infared char left', 'B'],
+                    '53': ['infared char right', 'B'],
+                    '54': ['left motor current', 'h'],
+                    '55': ['right motor current', 'h'],
+                    '56': ['main brush motor current', 'h'],
+                    '57': ['side brush motor current', 'h'],
+                    '58': ['stasis', '?'],
+                    '7': ['wheel drop and bumps', 'B'],
+                    '8': ['wall seen', '?'],
+                    '9': ['cliff left', '?']}}
+
+# Opcode -> command name
+OPCODE_NAMES = (None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ 'reset',
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ 'start',
+ 'baud',
+ None,
+ 'safe',
+ 'full',
+ 'power',
+ 'spot',
+ 'clean',
+ 'max',
+ 'drive',
+ 'motors',
+ 'led',
+ 'song',
+ 'play',
+ 'sensors',
+ 'seek_dock',
+ 'motors_pwm',
+ 'drive_direct',
+ 'drive_pwm',
+ None,
+ 'stream',
+ 'query_list',
+ 'pause_resume_stream',
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ 'scheduling_led',
+ 'digit_led_raw',
+ 'digit_led_ascii',
+ 'buttons',
+ None,
+ 'schedule',
+ 'set_day_time',
+ None,
+ None,
+ None,
+ None,
+ 'stop',
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None)
+
+# Packet id -> number of data bytes
+PACKET_LENGTHS = (26,
+ 10,
+ 6,
+ 10,
+ 14,
+ 12,
+ 52,
+ 1,
+ 1,
+ 1,
+ 1,
+ 1,
+ 1,
+ 1,
+ 1,
+ 1,
+ 1,
+ 1,
+ 1,
+ 2,
+ 2,
+ 1,
+ 2,
+ 2,
+ 1,
+ 2,
+ 2,
+ 2,
+ 2,
+ 2,
+ 2,
+ 2,
+ 1,
+ 2,
+ 1,
+ 1,
+ 1,
+ 1,
+ 1,
+ 2,
+ 2,
+ 2,
+ 2,
+ 2,
+ 2,
+ 1,
+ 2,
+ 2,
+ 2,
+ 2,
+ 2,
+ 2,
+ 1,
+ 1,
+ 2,
+ 2,
+ 2,
+ 2,
+ 1,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ 80,
+ 28,
+ None,
+ None,
+ None,
+ None,
+ 12,
+ 9,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None)
+
+# Character code -> 7 segment display code
+ASCII_CODES = (None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ 32,
+ 33,
+ 34,
+ 35,
+ None,
+ 37,
+ 38,
+ 39,
+ None,
+ None,
+ None,
+ None,
+ 44,
+ 45,
+ 46,
+ 47,
+ 48,
+ 49,
+ 50,
+ 51,
+ 52,
+ 53,
+ 54,
+ 55,
+ 56,
+ 57,
+ 58,
+ 59,
+ 60,
+ 61,
+ 62,
+ 63,
+ None,
+ 65,
+ 66,
+ 67,
+ 68,
+ 69,
+ 70,
+ 71,
+ 72,
+ 73,
+ 74,
+ 75,
+ 76,
+ 77,
+ 78,
+ 79,
+ 80,
+ 81,
+ 82,
+ 83,
+ 84,
+ 85,
+ 86,
+ 87,
+ 88,
+ 89,
+ 90,
+ 40,
+ 92,
+ 41,
+ 94,
+ 95,
+ 96,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ 123,
+ 124,
+ 125,
+ 126,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None)
+
+# Midi note number -> note name
+MIDI_NAMES = ('R',
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ None,
+ 'G1',
+ 'G#1',
+ 'A1',
+ 'A#1',
+ 'B1',
+ 'C2',
+ 'C#2',
+ 'D2',
+ 'D#2',
+ 'E2',
+ 'F2',
+ 'F#2',
+ 'G2',
+ 'G#2',
+ 'A2',
+ 'A#2',
+ 'B2',
+ 'C3',
+ 'C#3',
+ 'D3',
+ 'D#3',
+ 'E3',
+ 'F3',
+ 'F#3',
+ 'G3',
+ 'G#3',
+ 'A3',
+ 'A#3',
+ 'B3',
+ 'C4',
+ 'C#4',
+ 'D4',
+ 'D#4',
+ 'E4',
+ 'F4',
+ 'F#4',
+ 'G4',
+ 'G#4',
+ 'A4',
+ 'A#4',
+ 'B4',
+ 'C5',
+ 'C#5',
+ 'D5',
+ 'D#5',
+ 'E5',
+ 'F5',
+ 'F#5',
+ 'G5',
+ 'G#5',
+ 'A5',
+ 'A#5',
+ 'B5',
+ 'C6',
+ 'C#6',
+ 'D6',
+ 'D#6',
+ 'E6',
+ 'F6',
+ 'F#6',
+ 'G6',
+ 'G#6',
+ 'A6',
+ 'A#6',
+ 'B6',
+ 'C7',
+ 'C#7',
+ 'D7',
+ 'D#7',
+ 'E7',
+ 'F7',
+ 'F#7',
+ 'G7',
+ 'G#7',
+ 'A7',
+ 'A#7',
+ 'B7',
+ 'C8',
+ 'C#8',
+ 'D8',
+ 'D#8',
+ 'E8',
+ 'F8',
+ 'F#8',
+ 'G8',
+ 'G#8',
+ 'A8',
+ 'A#8',
+ 'B8',
+ 'C9',
+ 'C#9',
+ 'D9',
+ 'D#9',
+ 'E9',
+ 'F9',
+ 'F#9',
+ 'G9')
+
+# Sensor packet schema: packet id -> (sensor data key, struct format)
+SENSOR_PACKETS = {7: ('wheel drop and bumps', 'B'),
+ 8: ('wall seen', '?'),
+ 9: ('cliff left', '?'),
+ 10: ('cliff front left', '?'),
+ 11: ('cliff front right', '?'),
+ 12: ('cliff right', '?'),
+ 13: ('virtual wall', '?'),
+ 14: ('wheel overcurrents', 'B'),
+ 15: ('dirt detect', 'B'),
+ 16: (None, 'x'),
+ 17: ('infared char omni', 'B'),
+ 18: ('buttons', 'B'),
+ 19: ('distance', 'h'),
+ 20: ('angle', 'h'),
+ 21: ('charging state', 'B'),
+ 22: ('voltage', 'H'),
+ 23: ('current', 'h'),
+ 24: ('temperature', 'b'),
+ 25: ('battery charge', 'H'),
+ 26: ('battery capacity', 'H'),
+ 27: ('wall signal', 'H'),
+ 28: ('cliff left signal', 'H'),
+ 29: ('cliff front left signal', 'H'),
+ 30: ('cliff front right signal', 'H'),
+ 31: ('cliff right signal', 'H'),
+ 32: (None, 'x'),
+ 33: (None, '2x'),
+ 34: ('charging sources available', 'B'),
+ 35: ('oi mode', 'B'),
+ 36: ('song number', 'B'),
+ 37: ('song playing', '?'),
+ 38: ('number of stream packets', 'B'),
+ 39: ('requested velocity', 'H'),
+ 40: ('requested radius', 'H'),
+ 41: ('requested right velocity', 'H'),
+ 42: ('requested left velocity', 'H'),
+ 43: ('left encoder counts', 'H'),
+ 44: ('right encoder counts', 'H'),
+ 45: ('light bumper', 'B'),
+ 46: ('light bump left signal', 'H'),
+ 47: ('light bump front left signal', 'H'),
+ 48: ('light bump center left signal', 'H'),
+ 49: ('light bump center right signal', 'H'),
+ 50: ('light bump front right signal', 'H'),
+ 51: ('light bump right signal', 'H'),
+ 52: ('infared char left', 'B'),
+ 53: ('infared char right', 'B'),
+ 54: ('left motor current', 'h'),
+ 55: ('right motor current', 'h'),
+ 56: ('main brush motor current', 'h'),
+ 57: ('side brush motor current', 'h'),
+ 58: ('stasis', '?')}
+
+# Flag byte -> (flag, bit) pairs
+SENSOR_BITFIELDS = {'buttons': (('clock', 128),
+             ('schedule', 64),
+             ('day', 32),
+             ('hour', 16),
+             ('minute', 8),
+             ('dock', 4),
+             ('spot', 2),
+             ('clean', 1)),
+ 'charging sources available': (('home base', 2), ('internal charger', 1)),
+ 'light bumper': (('right', 32),
+                  ('front right', 16),
+                  ('center right', 8),
+                  ('center left', 4),
+                  ('front left', 2),
+                  ('left', 1)),
+ 'wheel drop and bumps': (('drop left', 8),
+                          ('drop right', 4),
+                          ('bump left', 2),
+                          ('bump right', 1)),
+ 'wheel overcurrents': (('left wheel', 16),
+                        ('right wheel', 8),
+                        ('main brush', 4),
+                        ('side brush', 1))}
+
+# Group packet id -> the single packet ids it contains
+SENSOR_GROUP_PACKETS = {0: (7,
+     8,
+     9,
+     10,
+     11,
+     12,
+     13,
+     14,
+     15,
+     16,
+     17,
+     18,
+     19,
+     20,
+     21,
+     22,
+     23,
+     24,
+     25,
+     26),
+ 1: (7, 8, 9, 10, 11, 12, 13, 14, 15, 16),
+ 2: (17, 18, 19, 20),
+ 3: (21, 22, 23, 24, 25, 26),
+ 4: (27, 28, 29, 30, 31, 32, 33, 34),
+ 5: (35, 36, 37, 38, 39, 40, 41, 42),
+ 6: (7,
+     8,
+     9,
+     10,
+     11,
+     12,
+     13,
+     14,
+     15,
+     16,
+     17,
+     18,
+     19,
+     20,
+     21,
+     22,
+     23,
+     24,
+     25,
+     26,
+     27,
+     28,
+     29,
+     30,
+     31,
+     32,
+     33,
+     34,
+     35,
+     36,
+     37,
+     38,
+     39,
+     40,
+     41,
+     42),
+ 100: (7,
+       8,
+       9,
+       10,
+       11,
+       12,
+       13,
+       14,
+       15,
+       16,
+       17,
+       18,
+       19,
+       20,
+       21,
+       22,
+       23,
+       24,
+       25,
+       26,
+       27,
+       28,
+       29,
+       30,
+       31,
+       32,
+       33,
+       34,
+       35,
+       36,
+       37,
+       38,
+       39,
+       40,
+       41,
+       42,
+       43,
+       44,
+       45,
+       46,
+       47,
+       48,
+       49,
+       50,
+       51,
+       52,
+       53,
+       54,
+       55,
+       56,
+       57,
+       58),
+ 101: (43, 44, 45, 46, 47, 48, 49, 50, 51, 52, 53, 54, 55, 56, 57, 58),
+ 106: (46, 47, 48, 49, 50, 51),
+ 107: (54, 55, 56, 57, 58)}
@@ -0,0 +1,241 @@
+"""
+Several Create 2s from one process and one reader thread. Needs Python 3.4 or newer (selectors).
+
+Each robot gets a create2api.Create2 for its commands, but nothing else: no stream reader,
+worker or timelimit threads. Every robot's serial port is registered with one selector (epoll on
+Linux) and a single thread reads whatever arrives on any of them and decodes it into that robot's
+sensor_state. Commands are sent straight from the calling thread, addressed by robot id.
+
+    import create2fleet
+
+    fleet = create2fleet.Create2Fleet({'kitchen': '/dev/ttyUSB0', 'hall': '/dev/ttyUSB1'})
+    fleet.start()
+    fleet.command_all('start')
+    fleet.command_all('safe')
+    fleet.stream_all([7, 19, 20, 25, 45])
+    fleet.command('hall', 'drive_straight', 100)
+    print(fleet['kitchen'].sensor_state.battery_charge)
+    ...
+    fleet.close()
+
+Sensors come in through the stream. The fleet thread reads everything the robots send, so
+get_packet() and query_list() can't be used on a fleet robot.
+
+Run this file to watch some robots, or some create2sim simulators if no ports are given:
+
+    python3 create2fleet.py /dev/ttyUSB0 /dev/ttyUSB1
+"""
+
+import os
+import selectors
+import sys
+import threading
+import time
+
+import create2api
+
+
+class FleetRobot(object):
+    """ A robot in a Create2Fleet.
+
+        bot is its create2api.Create2. reader is a SensorStreamReader that is never started as a
+        thread: the fleet thread uses its StreamFrameSync and decode_packets().
+    """
+
+    def __init__(self, robot_id, bot):
+        self.robot_id = robot_id
+        self.bot = bot
+        self.reader = create2api.SensorStreamReader(bot)
+        self.fd = bot.SCI.ser.fileno()
+        self.connected = True
+
+    @property
+    def frame_count(self):
+        return self.reader.frame_count
+
+    @property
+    def last_frame_time(self):
+        return self.reader.last_frame_time
+
+
+class Create2Fleet(threading.Thread):
+    """ A thread that reads and decodes the sensor streams of many robots.
+    """
+
+    def __init__(self, ports, baud=115200):
+        """
+            Arguments:
+                ports: A dict of robot id -> serial port, or a list of ports (the robot ids are then
+                    0, 1, 2 ...)
+                baud: The OI's baud rate.
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+        if not isinstance(ports, dict):
+            ports = dict(enumerate(ports))
+        self.selector = selectors.DefaultSelector()
+        # Written to by close() to wake the thread up
+        self.wake_read, self.wake_write = os.pipe()
+        self.selector.register(self.wake_read, selectors.EVENT_READ, None)
+        self.running = threading.Event()
+        self.robots = {}
+        try:
+            for robot_id, port in ports.items():
+                robot = FleetRobot(robot_id, create2api.Create2(port, baud))
+                self.robots[robot_id] = robot
+                self.selector.register(robot.fd, selectors.EVENT_READ, robot)
+        except Exception:
+            self.close()
+            raise
+
+    def __getitem__(self, robot_id):
+        """ The Create2 of a robot
+        """
+        return self.robots[robot_id].bot
+
+    def __iter__(self):
+        return iter(self.robots)
+
+    def __len__(self):
+        return len(self.robots)
+
+    def start(self):
+        self.running.set()
+        threading.Thread.start(self)
+
+    def run(self):
+        while self.running.is_set():
+            for key, events in self.selector.select(1):
+                robot = key.data
+                if robot is None:
+                    os.read(self.wake_read, 64)
+                    continue
+                try:
+                    data = os.read(robot.fd, 4096)
+                except OSError:
+                    data = b''
+                if not data:
+                    # The port has gone away (unplugged, or the other end of a pty closed)
+                    self.disconnected(robot)
+                    continue
+                self.received(robot, data)
+
+    def received(self, robot, data):
+        """ Decodes every whole stream frame that has arrived from a robot
+        """
+        capture = robot.bot.SCI.capture
+        if capture is not None:
+            capture.record(create2api.CAPTURE_READ, data)
+        sync = robot.reader.sync
+        sync.feed(data)
+        packets = sync.next_frame()
+        while packets is not None:
+            robot.reader.decode_packets(sync.buffer, packets)
+            packets = sync.next_frame()
+
+    def disconnected(self, robot):
+        robot.connected = False
+        try:
+            self.selector.unregister(robot.fd)
+        except (KeyError, ValueError):
+            pass
+
+    def close(self):
+        """ Stops the thread, stops each robot's stream and closes every port.
+        """
+        self.running.clear()
+        os.write(self.wake_write, b'x')
+        if self.is_alive():
+            self.join()
+        for robot in self.robots.values():
+            if robot.connected:
+                try:
+                    robot.bot.pause_resume_stream(False)
+                except Exception:
+                    pass  # The robot may already be gone
+            robot.bot.stream_reader = None
+            robot.bot.destroy()
+        self.selector.close()
+        os.close(self.wake_read)
+        os.close(self.wake_write)
+
+    # Commands
+
+    def command(self, robot_id, name, *args):
+        """ Runs a Create2 command on one robot, e.g. fleet.command(2, 'drive', 100, 32767)
+        """
+        if name in ('get_packet', 'query_list', 'sensors'):
+            raise create2api.ROIFailedToSendError("Fleet robots can't be polled, use stream()")
+        return getattr(self.robots[robot_id].bot, name)(*args)
+
+    def command_all(self, name, *args):
+        """ Runs a Create2 command on every connected robot
+        """
+        for robot_id, robot in self.robots.items():
+            if robot.connected:
+                self.command(robot_id, name, *args)
+
+    def stream(self, robot_id, packet_ids):
+        """ Starts a robot's sensor stream. The fleet thread decodes it into the robot's sensor_state.
+        """
+        robot = self.robots[robot_id]
+        # The Create2 would start a reader thread of its own if it didn't have one
+        robot.bot.stream_reader = robot.reader
+        robot.reader.sync.reset()
+        robot.bot.stream(packet_ids)
+
+    def stream_all(self, packet_ids):
+        for robot_id, robot in self.robots.items():
+            if robot.connected:
+                self.stream(robot_id, packet_ids)
+
+    def pause_resume_stream(self, robot_id, resume):
+        self.robots[robot_id].bot.pause_resume_stream(resume)
+
+    # State
+
+    def sensor_snapshot(self, robot_id):
+        """ A copy of a robot's sensor_state, see Create2.sensor_snapshot()
+        """
+        return self.robots[robot_id].bot.sensor_snapshot()
+
+    def stats(self):
+        """ Robot id -> frames decoded, seconds since the last one, and the stream sync counters
+        """
+        now = time.time()
+        stats = {}
+        for robot_id, robot in self.robots.items():
+            robot_stats = robot.reader.sync.stats()
+            robot_stats['frames'] = robot.frame_count
+            robot_stats['connected'] = robot.connected
+            robot_stats['seconds since last frame'] = None if robot.last_frame_time is None else now - robot.last_frame_time
+            stats[robot_id] = robot_stats
+        return stats
+
+
+if __name__ == '__main__':
+    simulators = []
+    ports = sys.argv[1:]
+    if not ports:
+        import create2sim
+        for i in range(3):
+            simulators.append(create2sim.Create2Simulator(heading=90))
+            ports.append(simulators[-1].start())
+    fleet = Create2Fleet(ports)
+    fleet.start()
+    fleet.command_all('start')
+    fleet.stream_all([7, 19, 20, 25, 35, 45])
+    print('Ctrl-C to stop')
+    try:
+        while True:
+            time.sleep(1)
+            for robot_id in fleet:
+                state = fleet[robot_id].sensor_state
+                stats = fleet.stats()[robot_id]
+                print('%s: %d frames, battery %d mAh, OI mode %d, bumps %s' % (
+                    robot_id, stats['frames'], state.battery_charge, state.oi_mode, dict(state.wheel_drop_and_bumps)))
+    except KeyboardInterrupt:
+        pass
+    fleet.close()
+    for sim in simulators:
+        sim.stop()
@@ -0,0 +1,244 @@
+"""
+The dashboards' telemetry and logging without the GUI, for robots that have no display.
+
+    python irobot-dashboard.py --headless
+    python battery_info.py --headless --port /dev/ttyAMA0 --log /home/pi/telemetry.csv
+
+irobot-dashboard.py, irobot-navigate.py, Ubuntu-dashboard.py and battery_info.py all take
+--headless. Tkinter and RPi.GPIO are not imported at all: the serial port is opened and the
+sensor stream started straight away, and GPIO is only imported if the robot doesn't answer and
+has to be woken up with the BRC pin and the Clean button.
+
+Every sensor change is written to a CSV file (time, field, value) and a status line is printed
+every few seconds. The time from the process starting to the first sensor packet being decoded is
+measured and printed, and written to the log as 'first packet seconds'.
+"""
+
+from __future__ import print_function
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+import serial
+
+import create2api
+
+# Process start, or as near as we can tell without /proc
+IMPORT_TIME = time.time()
+
+# The packets the dashboards show, streamed every 15 ms
+STREAM_PACKETS = (7, 19, 20, 21, 22, 23, 24, 25, 26, 34, 35, 39, 40, 45, 46, 47, 48, 49, 50, 51, 54, 55)
+
+# Fields that are written to the log when they change. The odometry (distance, angle) changes
+# every frame while driving and is left to the capture file if it's wanted.
+LOG_FIELDS = ('wheel drop and bumps', 'charging state', 'voltage', 'current', 'temperature', 'battery charge',
+              'battery capacity', 'charging sources available', 'oi mode', 'light bumper',
+              'left motor current', 'right motor current')
+
+CLNpin = 17     # GPIO 17 to control CLEAN button
+BRCpin = 18     # GPIO 18 to negative pulse BRC pin on miniDIN port
+
+
+def process_start_time():
+    """ When this process started, from /proc on Linux. Falls back to when this module was imported.
+    """
+    try:
+        with open('/proc/self/stat') as f:
+            # Field 22 is the start time in clock ticks since boot. The command name (field 2) is
+            # in brackets and may have spaces, so count from the closing bracket.
+            start_ticks = float(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + start_ticks / os.sysconf('SC_CLK_TCK')
+    except (IOError, OSError, IndexError, ValueError, AttributeError):
+        return IMPORT_TIME
+
+
+def wake():
+    """ Pulses the BRC pin and presses the Clean button, as the dashboards do on start up.
+
+        Returns: False if RPi.GPIO can't be imported, e.g. when not running on a Pi
+    """
+    try:
+        import RPi.GPIO as GPIO
+    except ImportError:
+        print('RPi.GPIO is not available, can not wake the robot')
+        return False
+    GPIO.setmode(GPIO.BCM)
+    GPIO.setup(CLNpin, GPIO.OUT)
+    GPIO.setup(BRCpin, GPIO.OUT)
+    GPIO.output(CLNpin, GPIO.LOW)
+    GPIO.output(BRCpin, GPIO.LOW)    # pulse BRC pin LOW to wake up irobot if in Off mode and listen at 115200 baud
+    time.sleep(1)
+    GPIO.output(BRCpin, GPIO.HIGH)
+    GPIO.output(CLNpin, GPIO.HIGH)   # Single press of Clean button enters Passive mode
+    time.sleep(.2)
+    GPIO.output(CLNpin, GPIO.LOW)    # Clean button activates on button 'release'
+    return True
+
+
+class TelemetryLog(object):
+    """ Writes each change of the logged fields to a CSV file as time, field, value
+    """
+
+    def __init__(self, fname):
+        self.file = open(fname, 'a')
+        self.writer = csv.writer(self.file, lineterminator='\n')
+
+    def write(self, name, value):
+        self.writer.writerow(('%.3f' % time.time(), name, value))
+        self.file.flush()
+
+    def changed(self, changes):
+        for name, value in changes.items():
+            self.writer.writerow(('%.3f' % time.time(), name, int(value)))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class HeadlessTelemetry(object):
+    """ Streams the dashboards' sensors into a Create2's sensor_state and logs the changes.
+    """
+
+    def __init__(self, port=None, log='telemetry.csv', capture=None, started=None, subscribers=()):
+        """
+            Arguments:
+                port: The serial port, see create2api.SerialCommandInterface.
+                log: The CSV file to append changes to, or None for no log.
+                capture: A serial capture file, see create2api.SerialCommandInterface.start_capture().
+                started: When the clock for the first packet time started. Defaults to the process start.
+                subscribers: (callback, fields) pairs to subscribe to the bot's sensor_events, such
+                    as a dashboard's log_battery.
+        """
+        self.port = port
+        self.capture = capture
+        self.started = process_start_time() if started is None else started
+        self.subscribers = subscribers
+        self.log = TelemetryLog(log) if log else None
+        self.bot = None
+        self.first_packet_seconds = None
+
+    def connect(self, attempts=3, timeout=1):
+        """ Opens the port and starts the stream. Wakes the robot up with GPIO if no frame arrives
+            within the timeout.
+
+            Returns: True once the first frame has been decoded, False if the robot didn't answer
+                or the port couldn't be opened
+        """
+        for attempt in range(attempts):
+            try:
+                self.bot = create2api.Create2(self.port, capture=self.capture)
+            except (serial.SerialException, OSError) as e:
+                # e.g. the USB serial adapter has been unplugged, run() tries again later
+                print('Could not open the serial port: %s' % e)
+                self.bot = None
+                time.sleep(timeout)
+                continue
+            for callback, fields in self.subscribers:
+                self.bot.sensor_events.subscribe(callback, fields)
+            if self.log is not None:
+                self.bot.sensor_events.subscribe(self.log.changed, LOG_FIELDS)
+            self.bot.start()
+            self.bot.stream(STREAM_PACKETS)
+            reader = self.bot.stream_reader
+            deadline = time.time() + timeout
+            while reader.frame_count == 0 and time.time() < deadline:
+                time.sleep(.001)
+            if reader.frame_count:
+                if self.first_packet_seconds is None:
+                    self.first_packet_seconds = reader.last_frame_time - self.started
+                    print('First packet %.3f s after start' % self.first_packet_seconds)
+                    if self.log is not None:
+                        self.log.write('first packet seconds', '%.3f' % self.first_packet_seconds)
+                return True
+            print('No data from the robot, waking it up')
+            self.bot.destroy()
+            self.bot = None
+            if not wake():
+                return False
+        return False
+
+    def status(self):
+        state = self.bot.sensor_state
+        stats = self.bot.stream_stats()
+        return '%d frames, %d bad, battery %d/%d mAh, %d mA, OI mode %d' % (
+            self.bot.stream_reader.frame_count, stats['bad frames'], state.battery_charge,
+            state.battery_capacity, state.current, state.oi_mode)
+
+    def run(self, seconds=None, interval=5):
+        """ Prints a status line every interval seconds, presses the Dock button every 30 seconds
+            while docked so the robot doesn't sleep, and reconnects if the stream stops.
+
+            Arguments:
+                seconds: How long to run for, None for ever.
+        """
+        end = None if seconds is None else time.time() + seconds
+        dock_timer = time.time() + 30
+        while end is None or time.time() < end:
+            if self.bot is None and not self.connect():
+                time.sleep(30)
+                continue
+            time.sleep(interval if end is None else max(0, min(interval, end - time.time())))
+            reader = self.bot.stream_reader
+            if reader.last_frame_time is None or time.time() - reader.last_frame_time > 2:
+                print('Stream stopped, reconnecting')
+                self.bot.destroy()
+                self.bot = None
+                continue
+            if time.time() > dock_timer:
+                dock_timer = time.time() + 30
+                if self.bot.sensor_state['charging sources available']['home base']:
+                    self.bot.buttons(4) # 1=Clean 2=Spot 4=Dock 8=Minute 16=Hour 32=Day 64=Schedule 128=Clock
+            print(self.status())
+
+    def close(self):
+        if self.bot is not None:
+            try:
+                self.bot.pause_resume_stream(False)
+                self.bot.power()  # stops serial communication, the OI enters Passive mode
+            except (create2api.Error, OSError):
+                pass
+            self.bot.destroy()
+            self.bot = None
+        if self.log is not None:
+            self.log.close()
+
+
+def main(argv=None, subscribers=()):
+    """ The --headless entry point of the dashboards.
+
+        Arguments:
+            argv: The command line arguments. Defaults to sys.argv.
+            subscribers: (callback, fields) pairs for the bot's sensor_events
+    """
+    parser = argparse.ArgumentParser(description='Create 2 telemetry without the GUI')
+    parser.add_argument('--headless', action='store_true', help='Run without the GUI (always on here)')
+    parser.add_argument('--port', help='Serial port, default /dev/ttyUSB0')
+    parser.add_argument('--log', default='telemetry.csv', help='CSV file for the sensor changes, "" for none')
+    parser.add_argument('--capture', help='Record the serial traffic, see create2replay.py')
+    parser.add_argument('--seconds', type=float, help='Stop after this many seconds')
+    parser.add_argument('--interval', type=float, default=5, help='Seconds between status lines')
+    # The dashboards' own options, such as irobot-navigate.py's --planner, are left to them
+    args, others = parser.parse_known_args(argv)
+
+    telemetry = HeadlessTelemetry(args.port, args.log, args.capture, subscribers=subscribers)
+    try:
+        if telemetry.connect():
+            telemetry.run(args.seconds, args.interval)
+        else:
+            print('Could not connect to the robot')
+            return 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        telemetry.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Obstacles learned while driving, for irobot-navigate.py's floor map. Needs numpy.
+
+Each cell of the floor map has the log-odds of it being blocked, kept in a numpy array. Every
+sensor read while the robot drives moves its position on by the odometry (distance and angle)
+and adds to the cells the light bumper signals (packets 46-51) and bumpers point at: a strong
+signal or a bump makes the cell more likely blocked, a weak signal less likely. Every few
+seconds the cells that are almost certainly blocked are folded into the floor map as walls (999),
+and learned walls that have since been found clear are taken out again. The walls typed into the
+floor map are never changed.
+
+    grid = create2occupancy.OccupancyGrid(floormap, unitsize=347, fname='occupancy.npz')
+    grid.fold(floormap)                          # the walls learned on earlier runs
+    ...
+    grid.set_pose(row, col, heading)             # the robot is starting to drive out of a cell
+    bot.query_list(create2occupancy.SENSOR_PACKETS)
+    grid.update(bot.sensor_state)
+    if grid.fold_due() and grid.fold(floormap, keep=[robot, goal]):
+        floorplan.mapChanged()
+    ...
+    grid.save()
+
+The grid is saved to fname and loaded again next time, so runs don't repeat the same collisions.
+"""
+
+from __future__ import print_function
+
+import math
+import os
+import time
+
+import numpy
+
+# The packets update() reads: bumps, distance, angle and the light bumper signals
+SENSOR_PACKETS = (7, 19, 20, 46, 47, 48, 49, 50, 51)
+
+ROBOT_RADIUS = 165.0        # mm
+# Light bumper signals, left to right, and their bearings (degrees clockwise from straight ahead)
+LIGHT_BUMPERS = (('light bump left signal', -70.0), ('light bump front left signal', -40.0),
+                 ('light bump center left signal', -12.0), ('light bump center right signal', 12.0),
+                 ('light bump front right signal', 40.0), ('light bump right signal', 70.0))
+LIGHT_BUMPER_RANGE = 75.0   # mm past the edge of the robot an obstacle is taken to be when seen
+BUMP_RANGE = 30.0           # mm past the edge of the robot a bumped obstacle is taken to be
+# Bumper -> bearing of what it hit
+BUMPS = {'bump left': -45.0, 'bump right': 45.0}
+
+
+class OccupancyGrid(object):
+    """ The log-odds of each floor map cell being blocked.
+    """
+
+    hit = .85           # log-odds added for a strong light bumper signal
+    miss = -.4          # and for a weak one, or the cell the robot is in
+    bump = 2.0          # and for a bump
+    limit = 10.0        # log-odds are kept within +/- this, so a cell can change its mind
+    occupied = 3.0      # cells above this are folded into the map as walls
+    free = -2.0         # learned walls below this are taken out again
+
+    def __init__(self, floormap, unitsize=347, fname='occupancy.npz', light_hit=200, light_free=10,
+                 fold_interval=5):
+        """
+            Arguments:
+                floormap: The floor map, rows of cells with 999 for a wall. Its walls are never changed.
+                unitsize: The size of a cell in mm.
+                fname: Where the grid is saved, None to not save it. It's loaded from here if it
+                    was saved for a map of the same size.
+                light_hit: Light bumper signals this strong or more mean something is there. The
+                    signals go from 0 to 4095 and grow quickly as a wall gets closer.
+                light_free: Signals this weak or less mean nothing is there.
+                fold_interval: Seconds between fold_due() returning True.
+        """
+        self.rows, self.cols = len(floormap), len(floormap[0])
+        self.unitsize = float(unitsize)
+        self.fname = fname
+        self.light_hit = light_hit
+        self.light_free = light_free
+        self.fold_interval = fold_interval
+        self.next_fold = time.time() + fold_interval
+        self.fixed = numpy.array(floormap) == 999
+        self.log_odds = numpy.zeros((self.rows, self.cols), numpy.float32)
+        self.folded = numpy.zeros((self.rows, self.cols), bool)   # walls fold() has put in the map
+        self.bearings = numpy.radians([bearing for name, bearing in LIGHT_BUMPERS])
+        self.x = self.y = self.heading = 0.0
+        if fname and os.path.exists(fname):
+            self.load(fname)
+
+    def set_pose(self, row, col, heading):
+        """ Puts the robot in the middle of a cell, facing heading (degrees clockwise from up).
+        """
+        self.x = (col + .5) * self.unitsize
+        self.y = (row + .5) * self.unitsize
+        self.heading = float(heading)
+
+    def cells(self, bearings, reach):
+        """ The (rows, cols) of the points reach mm from the robot's centre at each bearing
+        """
+        angles = numpy.radians(self.heading) + bearings
+        rows = ((self.y - reach * numpy.cos(angles)) // self.unitsize).astype(int)
+        cols = ((self.x + reach * numpy.sin(angles)) // self.unitsize).astype(int)
+        return rows, cols
+
+    def add(self, rows, cols, log_odds):
+        """ Adds log_odds to the cells that are on the map and aren't the one the robot is in
+        """
+        row = int(self.y // self.unitsize)
+        col = int(self.x // self.unitsize)
+        wanted = (rows >= 0) & (rows < self.rows) & (cols >= 0) & (cols < self.cols) & \
+                 ((rows != row) | (cols != col))
+        numpy.add.at(self.log_odds, (rows[wanted], cols[wanted]), numpy.broadcast_to(log_odds, rows.shape)[wanted])
+
+    def update(self, state):
+        """ Moves the robot on by the distance and angle since the last read and adds what the
+            light bumper and bumpers found. Call after every read of SENSOR_PACKETS.
+
+            Arguments:
+                state: The bot's sensor_state
+        """
+        # angle is counter clockwise, heading clockwise
+        self.heading = (self.heading - state['angle']) % 360
+        distance = state['distance']
+        self.x += distance * math.sin(math.radians(self.heading))
+        self.y -= distance * math.cos(math.radians(self.heading))
+
+        row = int(self.y // self.unitsize)
+        col = int(self.x // self.unitsize)
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            self.log_odds[row, col] += self.miss
+
+        signals = numpy.array([state[name] for name, bearing in LIGHT_BUMPERS])
+        seen = (signals >= self.light_hit) | (signals <= self.light_free)
+        if seen.any():
+            rows, cols = self.cells(self.bearings[seen], ROBOT_RADIUS + LIGHT_BUMPER_RANGE)
+            self.add(rows, cols, numpy.where(signals[seen] >= self.light_hit, self.hit, self.miss))
+
+        bumps = state['wheel drop and bumps']
+        bumped = [bearing for name, bearing in BUMPS.items() if bumps[name]]
+        if len(bumped) == 2:
+            bumped = [0.0]   # head on
+        if bumped:
+            rows, cols = self.cells(numpy.radians(bumped), ROBOT_RADIUS + BUMP_RANGE)
+            self.add(rows, cols, self.bump)
+
+        numpy.clip(self.log_odds, -self.limit, self.limit, out=self.log_odds)
+
+    def fold_due(self):
+        """ True every fold_interval seconds
+        """
+        if time.time() < self.next_fold:
+            return False
+        self.next_fold = time.time() + self.fold_interval
+        return True
+
+    def fold(self, floormap, keep=()):
+        """ Makes the cells that are almost certainly blocked walls in floormap, and takes out the
+            learned walls that have been found clear. A learned wall stays until it's found clear,
+            so a cell doesn't flicker in and out of the map.
+
+            Arguments:
+                floormap: The floor map the planner uses, changed in place.
+                keep: (row, col) cells not to make walls, such as the robot's and the goal's.
+            Returns: The number of cells changed
+        """
+        walls = ((self.log_odds > self.occupied) | (self.folded & (self.log_odds >= self.free))) & ~self.fixed
+        changed = 0
+        for row, col in numpy.argwhere(walls):
+            if floormap[row][col] == 999:
+                continue
+            if floormap[row][col] != 1 and (row, col) not in keep:
+                floormap[row][col] = 999
+                changed += 1
+            else:
+                walls[row, col] = False
+        for row, col in numpy.argwhere(self.folded & ~walls):
+            if floormap[row][col] == 999:
+                floormap[row][col] = 0
+                changed += 1
+        self.folded = walls
+        return changed
+
+    def save(self, fname=None):
+        """ Saves the grid to fname, by default the one it was made with.
+        """
+        fname = fname or self.fname
+        if not fname:
+            return
+        # Written alongside and renamed, so a crash part way through doesn't lose the last one
+        with open(fname + '.tmp', 'wb') as f:
+            numpy.savez(f, log_odds=self.log_odds, folded=self.folded)
+        os.rename(fname + '.tmp', fname)
+
+    def load(self, fname):
+        data = numpy.load(fname)
+        if data['log_odds'].shape != self.log_odds.shape:
+            print('Occupancy grid %s is for a different floor map, starting again' % fname)
+            return
+        self.log_odds[:] = data['log_odds']
+        self.folded[:] = data['folded'] & ~self.fixed
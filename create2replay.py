@@ -0,0 +1,253 @@
+"""
+Plays back serial captures recorded by create2api, so a run can be reproduced without the robot.
+
+Record a capture by giving Create2 a file name:
+
+    bot = create2api.Create2(capture='bump-fail.c2cap')   # or bot.SCI.start_capture(...)
+
+There are two ways to play it back:
+
+ReplaySerial is a stand in for the serial port. Anything that drives a Create2 (a dashboard loop,
+the stream reader, navigate) gets the recorded bytes back when it reads, in the same order, as
+fast as it can read them or at a chosen speed:
+
+    bot = create2api.Create2(create2replay.ReplaySerial('bump-fail.c2cap'))
+
+replay_packets() decodes a capture on its own. It follows the commands that were sent to work out
+which packets the robot answered with, and decodes each one into a SensorState. Run this file to
+time it:
+
+    python create2replay.py bump-fail.c2cap
+"""
+
+from __future__ import print_function
+
+import collections
+import sys
+import threading
+import time
+
+import create2api
+
+
+class ReplaySerial(object):
+    """ Looks enough like a pyserial port for SerialCommandInterface and SensorStreamReader.
+
+        Reads return the bytes that were read in the capture, in order. Bytes that were read after
+        the script's n-th write are held back until the replaying script has made its n-th write
+        too, so replies line up with the requests that caused them whatever the speed. Writes are
+        compared with what was written in the capture, and 'mismatches' counts the ones that
+        differ, which means the script has gone a different way than the recorded run.
+    """
+
+    def __init__(self, fname, speed=None):
+        """
+            Arguments:
+                fname: The capture file
+                speed: None to replay as fast as the reads come, otherwise a multiple of real time
+                    (1 for real time, 10 for ten times faster)
+        """
+        self.name = self.port = fname
+        self.speed = speed
+        self.baudrate = 115200
+        self.timeout = 1
+        self.is_open = False
+        self.reads = collections.deque()   # (timestamp, writes before it, data)
+        self.writes = collections.deque()
+        self.first_timestamp = None
+        for timestamp, direction, data in create2api.read_capture(fname):
+            if self.first_timestamp is None:
+                self.first_timestamp = timestamp
+            if direction == create2api.CAPTURE_READ:
+                self.reads.append((timestamp, len(self.writes), data))
+            else:
+                self.writes.append(bytearray(data))
+        self.writes_done = 0
+        self.pending = bytearray()
+        self.unmatched = bytearray()
+        self.mismatches = 0
+        self.dropped_bytes = 0
+        self.bytes_read = 0
+        self.start_time = None
+        self.finished = threading.Event()  # Set once every recorded read has been returned
+        self.condition = threading.Condition()
+
+    def open(self):
+        self.is_open = True
+        self.start_time = time.time()
+
+    def isOpen(self):
+        return self.is_open
+
+    def close(self):
+        self.is_open = False
+
+    def due(self, timestamp):
+        """ Seconds until a record is due to arrive, at the replay speed
+        """
+        if self.speed is None:
+            return 0
+        return (timestamp - self.first_timestamp) / self.speed - (time.time() - self.start_time)
+
+    def arrived(self):
+        """ Moves every read record that's due into self.pending
+        """
+        while self.reads and self.reads[0][1] <= self.writes_done and self.due(self.reads[0][0]) <= 0:
+            self.pending.extend(self.reads.popleft()[2])
+        if not self.reads and not self.pending:
+            self.finished.set()
+
+    @property
+    def in_waiting(self):
+        with self.condition:
+            self.arrived()
+            return len(self.pending)
+
+    def inWaiting(self):
+        return self.in_waiting
+
+    def read(self, size=1):
+        """ Returns up to size bytes, waiting up to the timeout for them like a real port
+        """
+        deadline = None if self.timeout is None else time.time() + self.timeout
+        with self.condition:
+            while True:
+                self.arrived()
+                if len(self.pending) >= size or not self.reads:
+                    break
+                wait = None    # Until the script writes what comes before the next read
+                if self.reads[0][1] <= self.writes_done:
+                    wait = self.due(self.reads[0][0])
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    wait = remaining if wait is None else min(wait, remaining)
+                self.condition.wait(wait)
+            data = bytes(self.pending[:size])
+            del self.pending[:size]
+        self.bytes_read += len(data)
+        if not data and self.finished.is_set() and self.timeout:
+            # The end of the capture, behave like a robot that has stopped answering
+            time.sleep(min(self.timeout, .1))
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def write(self, data):
+        with self.condition:
+            if bytearray(data[:1]) in (b'\x8e', b'\x95'):
+                # A sensors or query list request, anything from before it that hasn't been
+                # read yet (e.g. the end of a stream) was read before the request in the capture
+                self.arrived()
+                self.dropped_bytes += len(self.pending)
+                del self.pending[:]
+            self.unmatched.extend(data)
+            while self.writes and len(self.unmatched) >= len(self.writes[0]):
+                expected = self.writes.popleft()
+                if self.unmatched[:len(expected)] != expected:
+                    self.mismatches += 1
+                del self.unmatched[:len(expected)]
+                self.writes_done += 1
+            self.condition.notify_all()
+        return len(data)
+
+    def reset_input_buffer(self):
+        with self.condition:
+            del self.pending[:]
+
+    def flush(self):
+        pass
+
+
+def replay_packets(fname, state=None):
+    """ Decodes every sensor packet and stream frame in a capture.
+
+        Arguments:
+            fname: The capture file
+            state: The SensorState to decode into. Defaults to a new one.
+        Yields: (timestamp, packet ids) after each packet, query list or frame is decoded into
+            state. The packet ids are a list.
+    """
+    config = create2api.Config()
+    config.load()
+    decoder = create2api.sensorPacketDecoder(dict(config.data['sensor group packet lengths']))
+    sync = create2api.StreamFrameSync(config.packet_lengths)
+    if state is None:
+        state = create2api.SensorState(config.data['sensor data'])
+    packet_lengths = config.packet_lengths
+    requests = collections.deque()  # Packet ids asked for with sensors or query list, in order
+    replies = bytearray()
+    streaming = False
+    sent = bytearray()
+
+    for timestamp, direction, data in create2api.read_capture(fname):
+        if direction == create2api.CAPTURE_WRITE:
+            sent.extend(data)
+            while sent:
+                length = create2api.command_length(sent)
+                if length is None or len(sent) < length:
+                    break
+                if length == 0:
+                    del sent[0]
+                    continue
+                opcode = sent[0]
+                if opcode == 142:
+                    requests.append([sent[1]])
+                elif opcode == 149:
+                    requests.append(list(sent[2:length]))
+                elif opcode == 148:
+                    streaming = True
+                    sync.expected_length = sum(packet_lengths[packet_id] + 1 for packet_id in sent[2:length])
+                elif opcode == 150:
+                    streaming = sent[1] == 1
+                elif opcode in (7, 173):
+                    streaming = False
+                del sent[:length]
+            continue
+
+        if streaming and not requests:
+            sync.feed(data)
+            packets = sync.next_frame()
+            while packets is not None:
+                for packet_id, offset in packets:
+                    decoder.decode_packet(packet_id, sync.buffer, state, offset)
+                yield timestamp, [packet_id for packet_id, offset in packets]
+                packets = sync.next_frame()
+            continue
+
+        replies.extend(data)
+        while requests:
+            packet_ids = requests[0]
+            size = sum(packet_lengths[packet_id] for packet_id in packet_ids)
+            if len(replies) < size:
+                break
+            requests.popleft()
+            offset = 0
+            for packet_id in packet_ids:
+                decoder.decode_packet(packet_id, replies, state, offset)
+                offset += packet_lengths[packet_id]
+            del replies[:size]
+            yield timestamp, packet_ids
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print('Usage: python create2replay.py CAPTURE')
+        sys.exit(1)
+    timer = getattr(time, 'perf_counter', time.time)
+    replies = 0
+    first = last = None
+    start = timer()
+    for timestamp, packet_ids in replay_packets(sys.argv[1]):
+        replies += 1
+        if first is None:
+            first = timestamp
+        last = timestamp
+    elapsed = timer() - start
+    print('%d packets and frames decoded in %.3f s' % (replies, elapsed))
+    if replies and last > first:
+        print('The capture covers %.1f s, replayed at %.0f times real time' % (last - first, (last - first) / elapsed))
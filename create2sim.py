@@ -0,0 +1,440 @@
+"""
+A virtual Create 2 on a pseudo-terminal, for testing and benchmarking without a robot.
+
+The simulator opens a pty and speaks the Open Interface on it. Point create2api at the pty
+instead of /dev/ttyUSB0:
+
+    import create2api, create2sim
+
+    sim = create2sim.Create2Simulator()
+    sim.start()
+    bot = create2api.Create2(sim.port)
+    bot.start()
+    bot.safe()
+    bot.drive_straight(200)
+    ...
+    bot.destroy()
+    sim.stop()
+
+or run it on its own with 'python create2sim.py' and give the printed port to a script.
+
+It handles start, safe, full, passive mode changes, drive, drive_direct, sensors, query_list,
+stream, pause_resume_stream, song, play, the LED and display commands and seek_dock. Other
+opcodes are read and ignored. Driving follows a kinematic model over a floormap in the same
+format as irobot-navigate.py's (999 is a wall, any other value is floor, 254 is where the robot
+starts), so distance, angle, encoder counts, bumps and the light bumper all behave sensibly.
+"""
+
+from __future__ import print_function
+
+import math
+import os
+import select
+import struct
+import sys
+import threading
+import time
+import tty
+
+import create2api
+
+
+# Default map, the same as irobot-navigate.py's
+FLOORMAP = [[999, 999, 999, 999, 999, 999, 999, 999, 0, 999, 999, 999],
+            [999, 999, 999, 999, 999, 999, 999, 999, 0, 999, 0, 0],
+            [999, 999, 999, 999, 999, 999, 999, 999, 0, 999, 999, 0],
+            [999, 254, 0, 0, 0, 0, 1, 999, 0, 999, 0, 0],
+            [999, 999, 999, 999, 999, 999, 999, 999, 0, 999, 999, 999],
+            [999, 999, 999, 999, 999, 999, 999, 999, 0, 0, 0, 0]]
+
+# OI modes
+OFF, PASSIVE, SAFE, FULL = 0, 1, 2, 3
+
+WHEEL_BASE = 235.0                              # mm between the wheels
+COUNTS_PER_MM = 508.8 / (72.0 * math.pi)        # encoder counts per mm of wheel travel
+ROBOT_RADIUS = 165.0                            # mm
+LIGHT_BUMPER_RANGE = 150.0                      # mm past the edge of the robot the light bumper sees
+LIGHT_BUMPER_DETECT = 60.0                      # mm, closer than this sets the light bumper flag
+LIGHT_SIGNAL_MAX = 4095                         # light bump signal (packets 46-51) of a wall touching the robot
+# Light bumper sensors, left to right: bit and bearing (degrees clockwise from straight ahead)
+LIGHT_BUMPERS = ((0x01, -70.0, 46), (0x02, -40.0, 47), (0x04, -12.0, 48),
+                 (0x08, 12.0, 49), (0x10, 40.0, 50), (0x20, 70.0, 51))
+TICK = .015                                     # The OI updates sensors and streams every 15ms
+
+
+class Create2Simulator(threading.Thread):
+    """ A thread that plays the part of a Create 2 on the master side of a pty.
+
+        The robot's pose is x, y in mm from the top left corner of the map and heading in degrees
+        clockwise from 'up' (towards row 0), the same way irobot-navigate.py orientates the robot.
+    """
+
+    def __init__(self, floormap=None, unitsize=347, start=None, heading=0.0, realtime=True):
+        """
+            Arguments:
+                floormap: A list of rows. 999 is a wall, 254 marks the start cell.
+                unitsize: The size of a map cell in mm.
+                start: (row, col) to start in. Defaults to the 254 cell, or the middle of the map.
+                heading: Degrees clockwise from up.
+                realtime: Advance the model in real time. If False, it only moves when step() is called.
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.floormap = [list(row) for row in (floormap or FLOORMAP)]
+        self.unitsize = float(unitsize)
+        if start is None:
+            start = (len(self.floormap) // 2, len(self.floormap[0]) // 2)
+            for row, cells in enumerate(self.floormap):
+                for col, cell in enumerate(cells):
+                    if cell == 254:
+                        start = (row, col)
+        self.x = (start[1] + .5) * self.unitsize
+        self.y = (start[0] + .5) * self.unitsize
+        self.heading = float(heading)
+        self.dock = (self.x, self.y)   # The robot starts on its home base
+        self.realtime = realtime
+
+        self.mode = OFF
+        self.right_velocity = 0        # mm/s, what the wheels are asked to do
+        self.left_velocity = 0
+        self.requested_velocity = 0
+        self.requested_radius = 0
+        self.seeking_dock = False
+        self.distance = 0.0            # mm and degrees since they were last sent
+        self.angle = 0.0
+        self.left_encoder = 0.0
+        self.right_encoder = 0.0
+        self.bumps = 0
+        self.light_bumper = 0
+        self.light_signals = [0] * 6
+        self.stasis = False
+        self.battery_charge = 2500
+        self.battery_capacity = 2696
+        self.songs = {}
+        self.song_number = 0
+        self.song_ends = 0
+        self.leds = (0, 0, 0)
+        self.display = '    '
+        self.stream_packets = []
+        self.streaming = False
+        self.command_count = 0
+
+        self.master = None
+        self.slave = None
+        self.port = None
+        self.input = bytearray()
+        self.running = threading.Event()
+        self.lock = threading.Lock()
+        self.last_step = None
+        self.packets = {}
+        for packet_id, contents in list(create2api.SENSOR_GROUP_PACKETS.items()) + [(i, [i]) for i in create2api.SENSOR_PACKETS]:
+            self.packets[packet_id] = (struct.Struct('>' + ''.join(create2api.SENSOR_PACKETS[i][1] for i in contents)),
+                                       [i for i in contents if create2api.SENSOR_PACKETS[i][0] is not None])
+
+    def start(self):
+        """ Opens the pty and starts the robot. self.port is the path to give create2api.
+        """
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.running.set()
+        threading.Thread.start(self)
+        return self.port
+
+    def stop(self):
+        self.running.clear()
+        if self.is_alive():
+            self.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def run(self):
+        self.last_step = time.time()
+        next_tick = self.last_step + TICK
+        while self.running.is_set():
+            ready = select.select([self.master], [], [], max(0, next_tick - time.time()))[0]
+            if ready:
+                try:
+                    self.input.extend(os.read(self.master, 4096))
+                except OSError:
+                    # Nothing has the slave side open
+                    time.sleep(TICK)
+                    continue
+                with self.lock:
+                    self.handle_input()
+            if time.time() >= next_tick:
+                next_tick += TICK
+                with self.lock:
+                    if self.realtime:
+                        self.step()
+                    if self.streaming:
+                        self.write(self.stream_frame())
+
+    def write(self, data):
+        os.write(self.master, data)
+
+    # Commands
+
+    def handle_input(self):
+        """ Runs every complete command in self.input.
+        """
+        while self.input:
+            length = create2api.command_length(self.input)
+            if length is None:
+                return
+            if length == 0:
+                # Not an opcode, skip it like the robot would
+                del self.input[0]
+                continue
+            if len(self.input) < length:
+                return
+            opcode = self.input[0]
+            data = bytearray(self.input[1:length])
+            del self.input[:length]
+            self.command(opcode, data)
+
+    def command(self, opcode, data):
+        self.command_count += 1
+        if self.realtime:
+            self.step()
+        if opcode == 128:                       # start
+            self.mode = PASSIVE
+        elif opcode in (7, 173):                # reset, stop
+            self.mode = OFF
+            self.streaming = False
+            self.halt()
+        elif opcode == 131:
+            self.mode = SAFE
+            self.seeking_dock = False
+        elif opcode == 132:
+            self.mode = FULL
+            self.seeking_dock = False
+        elif opcode in (133, 134, 135, 136):    # power, spot, clean, max
+            self.mode = PASSIVE
+            self.halt()
+        elif opcode == 143:                     # seek dock
+            self.mode = PASSIVE
+            self.seeking_dock = True
+        elif opcode == 137 and self.mode >= SAFE:
+            velocity, radius = struct.unpack('>hh', bytes(data))
+            self.set_drive(velocity, radius)
+        elif opcode == 145 and self.mode >= SAFE:
+            self.right_velocity, self.left_velocity = struct.unpack('>hh', bytes(data))
+            self.requested_velocity = (self.right_velocity + self.left_velocity) // 2
+            self.requested_radius = 0
+        elif opcode == 139:
+            self.leds = tuple(data)
+        elif opcode == 164:
+            self.display = bytes(data).decode('ascii', 'replace')
+        elif opcode == 140:
+            self.songs[data[0]] = [(data[i], data[i + 1]) for i in range(2, len(data), 2)]
+        elif opcode == 141 and self.mode >= PASSIVE:
+            notes = self.songs.get(data[0], [])
+            self.song_number = data[0]
+            self.song_ends = time.time() + sum(duration for note, duration in notes) / 64.0
+        elif opcode == 142:
+            self.write(self.encode_packets([data[0]]))
+        elif opcode == 149:
+            self.write(self.encode_packets(list(data[1:])))
+        elif opcode == 148:
+            self.stream_packets = list(data[1:])
+            self.streaming = len(self.stream_packets) > 0
+        elif opcode == 150:
+            self.streaming = data[0] == 1 and len(self.stream_packets) > 0
+
+    def set_drive(self, velocity, radius):
+        """ Sets the wheel velocities for a drive command
+        """
+        self.requested_velocity = velocity
+        self.requested_radius = radius
+        if radius in (32767, -32768):
+            self.right_velocity = self.left_velocity = velocity
+        elif radius == 1:                       # turn in place counter clockwise
+            self.right_velocity, self.left_velocity = velocity, -velocity
+        elif radius == -1:                      # turn in place clockwise
+            self.right_velocity, self.left_velocity = -velocity, velocity
+        else:
+            self.right_velocity = velocity * (radius + WHEEL_BASE / 2) / radius
+            self.left_velocity = velocity * (radius - WHEEL_BASE / 2) / radius
+
+    def halt(self):
+        self.right_velocity = self.left_velocity = 0
+        self.requested_velocity = self.requested_radius = 0
+
+    # Kinematics
+
+    def step(self, dt=None):
+        """ Moves the robot on by dt seconds (by default, the time since the last step).
+        """
+        now = time.time()
+        if dt is None:
+            dt = now - (self.last_step or now)
+        self.last_step = now
+        if self.seeking_dock:
+            self.seek_dock_step()
+        right = self.right_velocity * dt
+        left = self.left_velocity * dt
+        travel = (right + left) / 2
+        turn = math.degrees((right - left) / WHEEL_BASE)   # counter clockwise is positive
+        heading = (self.heading - turn) % 360
+        x = self.x + travel * math.sin(math.radians(heading))
+        y = self.y - travel * math.cos(math.radians(heading))
+
+        self.bumps = self.bump_flags(x, y, heading, travel)
+        if self.bumps and travel > 0:
+            # Pushing into a wall, the wheels slip and the robot stays put
+            self.stasis = False
+        elif self.collides(x, y):
+            self.stasis = False
+        else:
+            self.x, self.y, self.heading = x, y, heading
+            self.distance += travel
+            self.angle += turn
+            self.stasis = travel > 0
+        self.left_encoder += left * COUNTS_PER_MM
+        self.right_encoder += right * COUNTS_PER_MM
+        self.update_light_bumper()
+        if self.mode == PASSIVE and not self.seeking_dock and (self.right_velocity or self.left_velocity):
+            self.halt()
+        if self.right_velocity or self.left_velocity:
+            self.battery_charge = max(0, self.battery_charge - dt * .05)
+        elif self.on_dock():
+            self.battery_charge = min(self.battery_capacity, self.battery_charge + dt * .1)
+
+    def seek_dock_step(self):
+        """ Heads straight for the home base. Good enough to test the docking code.
+        """
+        dx = self.dock[0] - self.x
+        dy = self.dock[1] - self.y
+        if math.hypot(dx, dy) < 20:
+            self.seeking_dock = False
+            self.halt()
+            return
+        bearing = (math.degrees(math.atan2(dx, -dy)) - self.heading + 180) % 360 - 180
+        if abs(bearing) > 5:
+            self.set_drive(100, -1 if bearing > 0 else 1)
+        else:
+            self.set_drive(150, 32767)
+
+    def on_dock(self):
+        return math.hypot(self.dock[0] - self.x, self.dock[1] - self.y) < 20
+
+    def is_wall(self, x, y):
+        row = int(y // self.unitsize)
+        col = int(x // self.unitsize)
+        if row < 0 or col < 0 or row >= len(self.floormap) or col >= len(self.floormap[0]):
+            return True
+        return self.floormap[row][col] == 999
+
+    def wall_points(self, x, y, radius):
+        """ Yields the bearing (degrees, 0 is up) of every wall cell edge within radius of (x, y)
+        """
+        row = int(y // self.unitsize)
+        col = int(x // self.unitsize)
+        for r in range(row - 1, row + 2):
+            for c in range(col - 1, col + 2):
+                if not self.is_wall((c + .5) * self.unitsize, (r + .5) * self.unitsize):
+                    continue
+                # Closest point of the cell to the robot
+                px = min(max(x, c * self.unitsize), (c + 1) * self.unitsize)
+                py = min(max(y, r * self.unitsize), (r + 1) * self.unitsize)
+                if math.hypot(px - x, py - y) < radius:
+                    yield math.degrees(math.atan2(px - x, -(py - y)))
+
+    def collides(self, x, y):
+        return any(True for bearing in self.wall_points(x, y, ROBOT_RADIUS))
+
+    def bump_flags(self, x, y, heading, travel):
+        """ The bump bits for a robot at (x, y) facing heading, if it is moving forward
+        """
+        if travel <= 0:
+            return 0
+        flags = 0
+        for bearing in self.wall_points(x, y, ROBOT_RADIUS):
+            relative = (bearing - heading + 180) % 360 - 180
+            if -90 < relative <= 15:
+                flags |= 0x02               # bump left
+            if -15 <= relative < 90:
+                flags |= 0x01               # bump right
+        return flags
+
+    def update_light_bumper(self):
+        self.light_bumper = 0
+        for i, (bit, bearing, packet_id) in enumerate(LIGHT_BUMPERS):
+            angle = math.radians(self.heading + bearing)
+            distance = LIGHT_BUMPER_RANGE
+            step = 5.0
+            d = 0.0
+            while d < LIGHT_BUMPER_RANGE:
+                r = ROBOT_RADIUS + d
+                if self.is_wall(self.x + r * math.sin(angle), self.y - r * math.cos(angle)):
+                    distance = d
+                    break
+                d += step
+            # 0-4095 like the real robot's, falling away quickly as the wall gets further off
+            self.light_signals[i] = int(LIGHT_SIGNAL_MAX * (1 - distance / LIGHT_BUMPER_RANGE) ** 2)
+            if distance < LIGHT_BUMPER_DETECT:
+                self.light_bumper |= bit
+
+    # Sensors
+
+    def sensor_values(self):
+        """ Every single packet's value, by packet id. Distance and angle are reset.
+        """
+        values = {
+            7: self.bumps, 8: self.light_bumper & 0x20 != 0, 9: False, 10: False, 11: False, 12: False,
+            13: False, 14: 0, 15: 0, 17: 0, 18: 0,
+            19: self.clamp(self.distance), 20: self.clamp(self.angle),
+            21: 2 if self.on_dock() else 0, 22: 15200 if self.on_dock() else 14800,
+            23: 500 if self.on_dock() else -150 - int(abs(self.right_velocity) + abs(self.left_velocity)),
+            24: 25, 25: int(self.battery_charge), 26: self.battery_capacity,
+            27: self.light_signals[5], 28: 0, 29: 0, 30: 0, 31: 0,
+            34: 0x02 if self.on_dock() else 0, 35: self.mode, 36: self.song_number,
+            37: time.time() < self.song_ends, 38: len(self.stream_packets) if self.streaming else 0,
+            39: int(self.requested_velocity) & 0xffff, 40: int(self.requested_radius) & 0xffff,
+            41: int(self.right_velocity) & 0xffff, 42: int(self.left_velocity) & 0xffff,
+            43: int(self.left_encoder) & 0xffff, 44: int(self.right_encoder) & 0xffff,
+            45: self.light_bumper, 52: 0, 53: 0,
+            54: int(abs(self.left_velocity) / 2), 55: int(abs(self.right_velocity) / 2), 56: 0, 57: 0,
+            58: self.stasis
+            }
+        for i, (bit, bearing, packet_id) in enumerate(LIGHT_BUMPERS):
+            values[packet_id] = self.light_signals[i]
+        return values
+
+    def clamp(self, value):
+        return int(max(-32768, min(32767, round(value))))
+
+    def encode_packets(self, packet_ids):
+        """ The bytes the OI sends back for a list of packet ids, one after the other
+        """
+        values = self.sensor_values()
+        data = b''
+        for packet_id in packet_ids:
+            if packet_id not in self.packets:
+                continue
+            packer, contents = self.packets[packet_id]
+            data += packer.pack(*[values[i] for i in contents])
+            if 19 in contents or packet_id == 19:
+                self.distance = 0.0
+            if 20 in contents or packet_id == 20:
+                self.angle = 0.0
+        return data
+
+    def stream_frame(self):
+        body = b''
+        for packet_id in self.stream_packets:
+            body += struct.pack('B', packet_id) + self.encode_packets([packet_id])
+        frame = struct.pack('BB', 19, len(body)) + body
+        return frame + struct.pack('B', -sum(bytearray(frame)) & 0xff)
+
+
+if __name__ == '__main__':
+    sim = Create2Simulator()
+    print('Virtual Create 2 on ' + sim.start())
+    print('Ctrl-C to stop')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        sim.stop()
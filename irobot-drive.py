@@ -362,24 +362,10 @@ class Dashboard():
 
 
 def timelimit(timeout, func, args=(), kwargs={}):
-    """ Run func with the given timeout. If func didn't finish running
-        within the timeout, raise TimeLimitExpired
+    """ Run func on the Create2's serial worker thread with the given timeout.
+        Returns False if func didn't finish running within the timeout
     """
-    class FuncThread(threading.Thread):
-        def __init__(self):
-            threading.Thread.__init__(self)
-            self.result = None
-            
-        def run(self):
-            self.result = func(*args, **kwargs)
-
-    it = FuncThread()
-    it.start()
-    it.join(timeout)
-    if it.isAlive():
-        return False
-    else:
-        return True
+    return create2api.timelimit(timeout, func, args, kwargs)
 
        
 def RetrieveCreateTelemetrySensors(dashboard):
@@ -428,6 +414,7 @@ def RetrieveCreateTelemetrySensors(dashboard):
             dashboard.master.update()
             
             bot = create2api.Create2()
+            bot.start_scheduler()       # only the latest drive/display command goes out, one write per flush
             bot.digit_led_ascii('    ') # clear DSEG before Passive mode
             print "Issuing a Start()"
             bot.start()                 # issue passive mode command
@@ -1,20 +1,35 @@
-class TimeLimitExpired(Exception): pass 
+import threading
+import Queue
+
+class TimeLimitExpired(Exception): pass
+
+class Worker(threading.Thread):
+    """ One long lived thread that runs queued calls, instead of a new thread per call
+    """
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.requests = Queue.Queue()
+    def run(self):
+        while True:
+            done, result, func, args, kwargs = self.requests.get()
+            try:
+                result[0] = func(*args, **kwargs)
+            except Exception:
+                pass  # keep the worker alive, the caller just gets None
+            done.set()
+
+worker = Worker()
+worker.start()
 
 def timelimit(timeout, func, args=(), kwargs={}):
-    """ Run func with the given timeout. If func didn't finish running
+    """ Run func on the worker thread with the given timeout. If func didn't finish running
         within the timeout, raise TimeLimitExpired
     """
-    import threading
-    class FuncThread(threading.Thread):
-        def __init__(self):
-            threading.Thread.__init__(self)
-            self.result = None
-        def run(self):
-            self.result = func(*args, **kwargs)
-    it = FuncThread()
-    it.start()
-    it.join(timeout)
-    if it.isAlive():
+    done = threading.Event()
+    result = [None]
+    worker.requests.put((done, result, func, args, kwargs))
+    if not done.wait(timeout):
         raise TimeLimitExpired()
     else:
-        return it.result
+        return result[0]